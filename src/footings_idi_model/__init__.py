@@ -1,8 +1,22 @@
-from . import assumptions, extracts, models, outputs, scenarios
+from .lazy import lazy_imports
 
-try:
-    import importlib.metadata as importlib_metadata
-except ModuleNotFoundError:
-    import importlib_metadata
+# the subpackages are imported on first access (e.g., footings_idi_model.models) so
+# importing footings_idi_model does not import pandas, dask or the policy models
+_getattr, __dir__ = lazy_imports(
+    __name__,
+    {
+        "assumptions": ".assumptions",
+        "extracts": ".extracts",
+        "models": ".models",
+        "outputs": ".outputs",
+        "scenarios": ".scenarios",
+    },
+)
 
-__version__ = importlib_metadata.version(__name__)
+
+def __getattr__(name):
+    if name == "__version__":
+        from .metadata import get_model_version
+
+        return get_model_version()
+    return _getattr(name)
@@ -1,11 +1,401 @@
 import click
 
+from .models.executors import EXECUTORS
 
-@click.command()
+# the extract model and output data dictionary for each model name (imported on use)
+RUN_MODELS = {
+    "active-lives": ("ActiveLivesValEMD", "ActiveLivesValOutput"),
+    "disabled-lives": ("DisabledLivesValEMD", "DisabledLivesValOutput"),
+}
+
+
+@click.group()
 def main():
     """CLI tool to run footings IDI model."""
     pass
 
 
+@main.command()
+@click.argument("model", type=click.Choice(list(RUN_MODELS)))
+@click.argument("extract_base", type=click.Path(exists=True, dir_okay=False))
+@click.argument("extract_riders", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--valuation-dt", required=True, help="The valuation date (e.g., 2020-03-31)."
+)
+@click.option(
+    "--assumption-set",
+    default="STAT",
+    show_default=True,
+    help="The assumption set to use.",
+)
+@click.option(
+    "--net-benefit-method",
+    type=click.Choice(["NLP", "PT1", "PT2"]),
+    default="NLP",
+    show_default=True,
+    help="The net benefit method (active lives only).",
+)
+@click.option(
+    "--execution-mode",
+    type=click.Choice(["foreach", "batch", "factors"]),
+    default="foreach",
+    show_default=True,
+    help="The mode used to value the records (disabled lives only).",
+)
+@click.option(
+    "--reserve-factors",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="The reserve factors used by --execution-mode=factors (see "
+    "build-reserve-factors).",
+)
+@click.option(
+    "--executor",
+    type=click.Choice(list(EXECUTORS)),
+    default="dask",
+    show_default=True,
+    help="The executor used to run the chunks of records.",
+)
+@click.option(
+    "--workers", type=int, default=None, help="The number of workers [default: CPUs]."
+)
+@click.option(
+    "--chunk-size",
+    type=int,
+    default=None,
+    help="The average number of records per executor chunk.",
+)
+@click.option(
+    "--stream-chunk-size",
+    type=int,
+    default=100_000,
+    show_default=True,
+    help="The number of extract rows read and written at a time.",
+)
+@click.option(
+    "--output",
+    type=click.Path(file_okay=False),
+    required=True,
+    help="The directory to write the output to.",
+)
+@click.option(
+    "--sink",
+    type=click.Choice(["csv", "parquet"]),
+    default="csv",
+    show_default=True,
+    help="The output format (parquet requires pyarrow).",
+)
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="The path to a run manifest used to resume an interrupted run.",
+)
+@click.option(
+    "--assumption-bundle",
+    type=click.Path(exists=True, file_okay=False),
+    default=None,
+    help="Memory map the assumption tables from a bundle (see build-assumptions).",
+)
+@click.option(
+    "--profile",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write cProfile statistics of the run to this file.",
+)
+@click.option(
+    "--time-steps",
+    is_flag=True,
+    default=False,
+    help="Report the time of each policy model step at the end of the run.",
+)
+@click.option(
+    "--assumption-metrics",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the assumption lookup metrics to this file (CSV or .json).",
+)
+def run(
+    model,
+    extract_base,
+    extract_riders,
+    valuation_dt,
+    assumption_set,
+    net_benefit_method,
+    execution_mode,
+    reserve_factors,
+    executor,
+    workers,
+    chunk_size,
+    stream_chunk_size,
+    output,
+    sink,
+    checkpoint,
+    assumption_bundle,
+    profile,
+    time_steps,
+    assumption_metrics,
+):
+    """Run an extract model (MODEL) against the extract files.
+
+    EXTRACT_BASE is read in chunks of --stream-chunk-size rows (CSV or Parquet) and the
+    projected, time 0 and errors of each chunk are written to --output.
+    """
+    import pandas as pd
+
+    from . import models, outputs
+
+    if assumption_bundle is not None:
+        from .assumptions import use_bundle
+
+        use_bundle(assumption_bundle)
+
+    if assumption_metrics is not None:
+        from .assumptions import enable_metrics
+
+        enable_metrics()
+
+    model_name, output_name = RUN_MODELS[model]
+    parameters = {
+        "valuation_dt": pd.Timestamp(valuation_dt),
+        "assumption_set": assumption_set,
+        "executor": executor,
+        "n_workers": workers,
+        "chunk_size": chunk_size,
+    }
+    if time_steps:
+        parameters["time_steps"] = True
+    if model == "active-lives":
+        parameters["net_benefit_method"] = net_benefit_method
+    else:
+        parameters["execution_mode"] = execution_mode
+        if reserve_factors is not None:
+            parameters["reserve_factors"] = reserve_factors
+
+    if sink == "parquet":
+        output_sink = outputs.ParquetSink(output, output=getattr(outputs, output_name))
+    else:
+        output_sink = outputs.CSVSink(output)
+
+    def run_stream():
+        return models.run_extract_stream(
+            getattr(models, model_name),
+            extract_base,
+            extract_riders,
+            output_sink,
+            stream_chunk_size=stream_chunk_size,
+            checkpoint=checkpoint,
+            **parameters,
+        )
+
+    if profile is None:
+        summary = run_stream()
+    else:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        summary = profiler.runcall(run_stream)
+        profiler.dump_stats(profile)
+
+    click.echo(
+        f"Valued {summary['records']} records in {summary['chunks']} chunks "
+        f"with {summary['errors']} errors."
+    )
+    if "step_timings" in summary:
+        timings = summary["step_timings"].to_frame()
+        click.echo(timings.to_string(index=False, float_format="{:.4f}".format))
+    if assumption_metrics is not None:
+        from .assumptions import export_metrics
+
+        export_metrics(assumption_metrics)
+
+
+@main.command()
+@click.option("--host", default="127.0.0.1", show_default=True, help="The host to bind.")
+@click.option("--port", default=8765, show_default=True, help="The port to bind.")
+@click.option(
+    "--batch-wait",
+    default=0.005,
+    show_default=True,
+    help="The seconds to wait for more requests before valuing a batch.",
+)
+@click.option(
+    "--max-batch-size",
+    default=256,
+    show_default=True,
+    help="The maximum number of requests valued together.",
+)
+@click.option(
+    "--assumption-bundle",
+    type=click.Path(exists=True, file_okay=False),
+    default=None,
+    help="Memory map the assumption tables from a bundle (see build-assumptions).",
+)
+def serve(host, port, batch_wait, max_batch_size, assumption_bundle):
+    """Run the valuation service.
+
+    The assumption tables are loaded once at start up and policies are valued with
+    POST /active-lives or POST /disabled-lives.
+    """
+    if assumption_bundle is not None:
+        from .assumptions import use_bundle
+
+        use_bundle(assumption_bundle)
+
+    from .service import serve as serve_http
+
+    click.echo(f"Serving valuations on http://{host}:{port}")
+    serve_http(host=host, port=port, batch_wait=batch_wait, max_batch_size=max_batch_size)
+
+
+@main.command(name="build-assumptions")
+@click.argument("directory", type=click.Path(file_okay=False))
+def build_assumptions(directory):
+    """Compile the assumption tables into a bundle in DIRECTORY.
+
+    Pass the bundle to run or serve with --assumption-bundle (or set the
+    FOOTINGS_IDI_ASSUMPTION_BUNDLE environment variable) to memory map the tables
+    instead of reading them in every process.
+    """
+    from .assumptions import build_bundle
+
+    manifest = build_bundle(directory)
+    click.echo(f"Built assumption bundle {manifest['content_hash'][:12]} in {directory}")
+
+
+@main.command(name="build-reserve-factors")
+@click.argument("extract_base", type=click.Path(exists=True, dir_okay=False))
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option(
+    "--assumption-set",
+    default="STAT",
+    show_default=True,
+    help="The assumption set to use.",
+)
+def build_reserve_factors(extract_base, output, assumption_set):
+    """Build the reserve factor tables of the disabled lives in EXTRACT_BASE.
+
+    The tables are written to OUTPUT (a .npz file) and used by run with
+    --execution-mode=factors --reserve-factors=OUTPUT. The tables do not depend on the
+    valuation date so the file can be reused for later valuations.
+    """
+    import pandas as pd
+
+    from .extracts import DisabledLivesBaseExtract
+    from .models import read_extract
+    from .models.policy_models import build_reserve_factors as build
+    from .models.records import RecordBatch
+
+    frame = pd.concat(
+        read_extract(extract_base, extract=DisabledLivesBaseExtract), ignore_index=True
+    )
+    records = RecordBatch.from_extract(
+        frame, DisabledLivesBaseExtract, drop=("IDI_MARKET", "TOBACCO_USAGE")
+    )
+    factors = build(records, assumption_set=assumption_set)
+    factors.save(output)
+    click.echo(f"Built reserve factors for {len(factors)} cells in {output}")
+
+
+@main.command()
+@click.option(
+    "--model",
+    "models",
+    type=click.Choice(list(RUN_MODELS)),
+    multiple=True,
+    help="The models to benchmark [default: all].",
+)
+@click.option(
+    "--size",
+    "sizes",
+    type=int,
+    multiple=True,
+    help="The number of records of each portfolio [default: 1000, 10000 and 100000].",
+)
+@click.option(
+    "--volume-tbl",
+    type=click.Path(exists=True, dir_okay=False),
+    default="docs/volume-tbl.csv",
+    show_default=True,
+    help="The attribute mix of the portfolios.",
+)
+@click.option(
+    "--samples",
+    type=click.Path(exists=True, file_okay=False),
+    default="docs/models/extract_models",
+    show_default=True,
+    help="The directory of the sample extracts.",
+)
+@click.option(
+    "--valuation-dt", default="2020-03-31", show_default=True, help="The valuation date."
+)
+@click.option(
+    "--executor",
+    type=click.Choice(list(EXECUTORS)),
+    default="process",
+    show_default=True,
+    help="The executor used to run the chunks of records.",
+)
+@click.option(
+    "--workers", type=int, default=None, help="The number of workers [default: CPUs]."
+)
+@click.option("--seed", default=0, show_default=True, help="The seed of the portfolios.")
+@click.option(
+    "--by-coverage/--no-by-coverage",
+    default=True,
+    show_default=True,
+    help="Also time the records of each coverage on their own.",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="The file to write the JSON report to [default: stdout].",
+)
+def benchmark(
+    models,
+    sizes,
+    volume_tbl,
+    samples,
+    valuation_dt,
+    executor,
+    workers,
+    seed,
+    by_coverage,
+    output,
+):
+    """Time the extract models on synthetic portfolios.
+
+    The portfolios are generated from the attribute mix in --volume-tbl and the sample
+    extracts in --samples (the defaults are relative to the repository root). The
+    records per second, peak RSS and a breakdown by coverage of each run are reported as
+    JSON.
+    """
+    import json
+
+    import pandas as pd
+
+    from .benchmark import BENCHMARK_MODELS, BENCHMARK_SIZES, run_benchmarks
+
+    report = run_benchmarks(
+        volume_tbl,
+        samples,
+        models=list(models) or list(BENCHMARK_MODELS),
+        sizes=list(sizes) or list(BENCHMARK_SIZES),
+        seed=seed,
+        by_coverage=by_coverage,
+        valuation_dt=pd.Timestamp(valuation_dt),
+        assumption_set="STAT",
+        executor=executor,
+        n_workers=workers,
+    )
+    content = json.dumps(report, indent=2)
+    if output is None:
+        click.echo(content)
+    else:
+        with open(output, "w") as file:
+            file.write(content)
+
+
 if __name__ == "__main__":
     main()
@@ -2,11 +2,47 @@ import numpy as np
 import pandas as pd
 from footings.assumption_registry import assumption_registry, def_assumption_set
 
-from .stat_gaap.incidence import get_incidence_rates
-from .stat_gaap.interest import get_al_interest_rate, get_dl_interest_rate
-from .stat_gaap.lapse import get_lapse_rates
-from .stat_gaap.mortality import get_mortality_rates
-from .stat_gaap.termination import get_ctr_select, get_ctr_ultimate
+from .stat_gaap.bundle import build_bundle, load_bundle, use_bundle
+from .stat_gaap.incidence import get_compiled_incidence, get_incidence_rates
+from .stat_gaap.interest import (
+    _get_interest_rate,
+    get_al_interest_rate,
+    get_dl_interest_rate,
+)
+from .stat_gaap.lapse import get_compiled_lapse, get_lapse_rate_array, get_lapse_rates
+from .stat_gaap.metrics import (
+    disable_metrics,
+    enable_metrics,
+    export_metrics,
+    get_metrics,
+    metered,
+)
+from .stat_gaap.mortality import (
+    get_compiled_mortality,
+    get_mortality_rate_array,
+    get_mortality_rates,
+)
+from .stat_gaap.termination import (
+    get_compiled_ctr,
+    get_ctr_select,
+    get_ctr_ultimate,
+    select_to_frame,
+)
+
+
+def compile_assumptions():
+    """Load and compile every STAT/GAAP assumption table.
+
+    The tables are otherwise loaded on first use. A long running process (e.g., the
+    valuation service) calls this at start up so no request pays for reading the files.
+    When an assumption bundle is set (see use_bundle), the tables are memory mapped from
+    the bundle instead.
+    """
+    get_compiled_ctr()
+    get_compiled_incidence()
+    get_compiled_lapse()
+    get_compiled_mortality()
+    _get_interest_rate()
 
 
 @assumption_registry
@@ -19,6 +55,7 @@ class idi_assumptions:
 
     @STAT.register(name="Claim Termination Rates (CTR) - Select")
     @GAAP.register(name="Claim Termination Rates (CTR) - Select")
+    @metered
     def ctr_select(
         age_incurred: str,
         idi_benefit_period: str,
@@ -61,6 +98,7 @@ class idi_assumptions:
 
     @STAT.register(name="Claim Termination Rate (CTR) - Ultimate")
     @GAAP.register(name="Claim Termination Rate (CTR) - Ultimate")
+    @metered
     def ctr_ultimate(idi_occupation_class: str, gender: str, modifier_ctr: float):
         """The claim termination rate (ctr) is the probability that a person goes off disability.
 
@@ -80,6 +118,7 @@ class idi_assumptions:
 
     @STAT.register(name="Claim Termination Rates (CTR)", bounded=True)
     @GAAP.register(name="Claim Termination Rates (CTR)", bounded=True)
+    @metered
     def ctr(
         self,
         frame: pd.DataFrame,
@@ -100,59 +139,104 @@ class idi_assumptions:
         |   1. the Select CTR (ctr_select) for claim duration years 1-10 and
         |   2. the Ultimate CTR (ctr_ultimate) for claim duration years 11+.
         """
-        # Get select rates
-        get_select = (frame.DURATION_MONTH.min() <= 120).item()
-        if get_select:
-            select = self.ctr_select(
-                age_incurred=age_incurred,
-                idi_benefit_period=idi_benefit_period,
-                idi_contract=idi_contract,
-                idi_diagnosis_grp=idi_diagnosis_grp,
-                idi_occupation_class=idi_occupation_class,
-                gender=gender,
-                elimination_period=elimination_period,
-                cola_percent=cola_percent,
-                model_mode=model_mode,
-                modifier_ctr=modifier_ctr,
-            )
-
-        # get ultimate rates
-        get_ultimate = (frame.DURATION_MONTH.max() > 120).item()
-        if get_ultimate:
-            ult_rates = self.ctr_ultimate(
-                idi_occupation_class=idi_occupation_class,
-                gender=gender,
-                modifier_ctr=modifier_ctr,
-            )
-            ult_base = pd.DataFrame(
-                {
-                    "AGE_ATTAINED": frame.AGE_ATTAINED,
-                    "DURATION_MONTH": frame.DURATION_MONTH,
-                }
-            )
-            ultimate = ult_base.merge(ult_rates, how="left", on=["AGE_ATTAINED"])
+        duration_month = frame.DURATION_MONTH.to_numpy(dtype=int)
+        age_attained = frame.AGE_ATTAINED.to_numpy(dtype=int)
+        get_select = bool(duration_month.min() <= 120)
+        get_ultimate = bool(duration_month.max() > 120)
+        kwargs = {
+            "idi_benefit_period": idi_benefit_period,
+            "idi_contract": idi_contract,
+            "idi_diagnosis_grp": idi_diagnosis_grp,
+            "idi_occupation_class": idi_occupation_class,
+            "gender": gender,
+            "elimination_period": elimination_period,
+            "age_incurred": age_incurred,
+            "cola_percent": cola_percent,
+            "model_mode": model_mode,
+            "modifier_ctr": modifier_ctr,
+        }
 
         # return rates
         if get_select is True and get_ultimate is False:
+            select = self.ctr_select(**kwargs)
             condlist = [select.PERIOD == "M", select.PERIOD == "Y"]
             choicelist = [select.SELECT_CTR, 1 - (1 - select.SELECT_CTR) ** (1 / 12)]
-            ret = select.assign(CTR=np.select(condlist, choicelist))
-        elif get_select is False and get_ultimate is True:
-            ret = ultimate.assign(CTR=lambda df: 1 - (1 - df.ULTIMATE_CTR) ** (1 / 12))
+            return select.assign(CTR=np.select(condlist, choicelist))
+
+        compiled = get_compiled_ctr()
+        ultimate = compiled.ultimate(
+            idi_occupation_class=idi_occupation_class,
+            gender=gender,
+            modifier_ctr=modifier_ctr,
+            age_attained=age_attained[None, :],
+        )
+        ret = pd.DataFrame(
+            {
+                "AGE_ATTAINED": frame.AGE_ATTAINED.values,
+                **{col: ultimate[col][0] for col in ultimate},
+            }
+        )
+        ctr = compiled.monthly_ctr(
+            **kwargs,
+            duration_month=duration_month[None, :],
+            age_attained=age_attained[None, :],
+            use_ultimate=True,
+        )
+        if get_select is False:
+            ret.insert(1, "DURATION_MONTH", frame.DURATION_MONTH.values)
         else:
-            ret = select.merge(ultimate, how="right", on=["DURATION_MONTH"])
-            condlist = [
-                ret.PERIOD == "M",
-                ret.PERIOD == "Y",
-                ret.PERIOD.isna(),
-            ]
-            choicelist = [
-                ret.SELECT_CTR,
-                1 - (1 - ret.SELECT_CTR) ** (1 / 12),
-                1 - (1 - ret.ULTIMATE_CTR) ** (1 / 12),
-            ]
-            ret = ret.assign(CTR=np.select(condlist, choicelist))
-        return ret
+            select = compiled.select(**kwargs, duration_month=duration_month[None, :])
+            select = select_to_frame(select, frame.DURATION_MONTH.values)
+            ret = pd.concat([select, ret], axis=1)
+        return ret.assign(CTR=ctr[0])
+
+    @STAT.register(name="Claim Termination Rates (CTR) - Monthly", bounded=True)
+    @GAAP.register(name="Claim Termination Rates (CTR) - Monthly", bounded=True)
+    @metered
+    def ctr_rates(
+        self,
+        duration_month: np.ndarray,
+        age_attained: np.ndarray,
+        use_ultimate: np.ndarray,
+        age_incurred,
+        idi_benefit_period,
+        idi_contract,
+        idi_diagnosis_grp,
+        idi_occupation_class,
+        gender,
+        elimination_period,
+        cola_percent,
+        model_mode,
+        modifier_ctr,
+    ):
+        """The monthly claim termination rate (ctr) for many claims at once.
+
+        The rating parameters are either scalars or arrays (one value per claim) while
+        duration_month and age_attained are arrays with shape (claims, months). The
+        return is an array of monthly CTRs with shape (claims, months) using the same
+        logic as the ctr assumption (i.e., the select rate for claim duration years 1-10
+        and the ultimate rate for claim duration years 11+ when use_ultimate is True).
+        """
+        return get_compiled_ctr().monthly_ctr(
+            idi_benefit_period=idi_benefit_period,
+            idi_contract=idi_contract,
+            idi_diagnosis_grp=idi_diagnosis_grp,
+            idi_occupation_class=idi_occupation_class,
+            gender=gender,
+            elimination_period=elimination_period,
+            age_incurred=age_incurred,
+            cola_percent=cola_percent,
+            model_mode=model_mode,
+            modifier_ctr=modifier_ctr,
+            duration_month=duration_month,
+            age_attained=age_attained,
+            use_ultimate=use_ultimate,
+        )
+
+    @BEST.register(name="Claim Termination Rates (CTR) - Monthly")
+    def ctr_rates():
+        """Not implemented yet."""
+        raise NotImplementedError("Best estimate assumptions are not implemented yet.")
 
     @BEST.register(name="Claim Termination Rate (CTR)")
     def ctr():
@@ -161,6 +245,7 @@ class idi_assumptions:
 
     @STAT.register(name="Incidence Rates")
     @GAAP.register(name="Incidence Rates")
+    @metered
     def incidence_rates(
         idi_contract: str,
         idi_occupation_class: str,
@@ -197,8 +282,47 @@ class idi_assumptions:
         """Not implemented yet."""
         raise NotImplementedError("Best estimate assumptions are not implemented yet.")
 
+    @STAT.register(name="Incidence Rates - Batch")
+    @GAAP.register(name="Incidence Rates - Batch")
+    @metered
+    def incidence_rates_batch(
+        age_attained: np.ndarray,
+        idi_contract,
+        idi_occupation_class,
+        idi_market,
+        idi_benefit_period,
+        tobacco_usage,
+        elimination_period,
+        gender,
+        modifier_incidence,
+    ):
+        """The incidence rates for many policies at once.
+
+        The rating parameters are either scalars or arrays (one value per policy) while
+        age_attained is an array with shape (policies, durations). The return is an
+        array of incidence rates with shape (policies, durations) using the same logic
+        as the incidence_rates assumption (NaN for ages not on the table).
+        """
+        return get_compiled_incidence().incidence_rates(
+            idi_contract=idi_contract,
+            idi_occupation_class=idi_occupation_class,
+            idi_market=idi_market,
+            idi_benefit_period=idi_benefit_period,
+            tobacco_usage=tobacco_usage,
+            elimination_period=elimination_period,
+            gender=gender,
+            modifier_incidence=modifier_incidence,
+            age_attained=age_attained,
+        )
+
+    @BEST.register(name="Incidence Rates - Batch")
+    def incidence_rates_batch():
+        """Not implemented yet."""
+        raise NotImplementedError("Best estimate assumptions are not implemented yet.")
+
     @STAT.register(name="Interest Rate - Active Lives")
     @GAAP.register(name="Interest Rate - Active Lives")
+    @metered
     def interest_rate_al(policy_start_dt):
         """STAT/GAAP active life (AL) interest rate assigned based on policy start date."""
         return get_al_interest_rate(policy_start_dt)
@@ -210,6 +334,7 @@ class idi_assumptions:
 
     @STAT.register(name="Interest Rate - Disabled Lives")
     @GAAP.register(name="Interest Rate - Disabled Lives")
+    @metered
     def interest_rate_dl(incurred_dt):
         """STAT/GAAP disabled life (DL) interest rate assigned based on incurred year."""
         return get_dl_interest_rate(incurred_dt)
@@ -221,6 +346,7 @@ class idi_assumptions:
 
     @STAT.register(name="Mortality Rates")
     @GAAP.register(name="Mortality Rates")
+    @metered
     def mortality_rates(gender: str, modifier_mortality: float):
         """Specify mortality table."""
         return get_mortality_rates(
@@ -232,7 +358,28 @@ class idi_assumptions:
         """Not implemented yet."""
         raise NotImplementedError("Best estimate assumptions are not implemented yet.")
 
+    @STAT.register(name="Mortality Rates - Batch")
+    @GAAP.register(name="Mortality Rates - Batch")
+    @metered
+    def mortality_rates_batch(
+        age_attained: np.ndarray, gender, modifier_mortality: float
+    ):
+        """The mortality rates for an array of ages attained (NaN for ages not on the
+        table) where gender is a scalar or an array (one value per row of ages)."""
+        return get_mortality_rate_array(
+            table_name="01CSO",
+            gender=gender,
+            age_attained=age_attained,
+            modifier_mortality=modifier_mortality,
+        )
+
+    @BEST.register(name="Mortality Rates - Batch")
+    def mortality_rates_batch():
+        """Not implemented yet."""
+        raise NotImplementedError("Best estimate assumptions are not implemented yet.")
+
     @STAT.register(name="Lapse Rates")
+    @metered
     def lapse_rates():
         """Lapse rate is the probability of a policy terminating from all causes less
         death (which is captured under mortality rate).
@@ -242,15 +389,47 @@ class idi_assumptions:
         return pd.DataFrame({"DURATION_YEAR": range(1, 100), "LAPSE_RATE": 0})
 
     @GAAP.register(name="Lapse Rates")
+    @metered
     def lapse_rates(age_issued: int, modifier_lapse: float):
         """Lapse rate is the probability of a policy terminating from all causes less
         death (which is captured under mortality rate).
 
         Lapse rates are stored in a tabular format and vary by issue age and duration year.
         """
-        return get_lapse_rate(age_issued, modifier_lapse)
+        return get_lapse_rates(age_issued, modifier_lapse)
 
     @BEST.register(name="Lapse Rates")
     def lapse_rate():
         """Not implemented yet."""
         raise NotImplementedError("Best estimate assumptions are not implemented yet.")
+
+    @STAT.register(name="Lapse Rates - Batch")
+    @metered
+    def lapse_rates_batch(duration_year: np.ndarray):
+        """The lapse rates for an array of duration years.
+
+        For STAT, the lapse rate is not considered thus the rate is set to 0 (an integer
+        as in Lapse Rates).
+        """
+        return np.zeros(np.shape(duration_year), dtype=int)
+
+    @GAAP.register(name="Lapse Rates - Batch")
+    @metered
+    def lapse_rates_batch(
+        duration_year: np.ndarray, age_issued: int, modifier_lapse: float
+    ):
+        """The lapse rates for an array of duration years where age_issued is a scalar
+        or an array (one value per row of durations).
+
+        Durations past the end of the table use the rate for the last duration.
+        """
+        return get_lapse_rate_array(
+            age_issued=age_issued,
+            duration_year=duration_year,
+            modifier_lapse=modifier_lapse,
+        )
+
+    @BEST.register(name="Lapse Rates - Batch")
+    def lapse_rates_batch():
+        """Not implemented yet."""
+        raise NotImplementedError("Best estimate assumptions are not implemented yet.")
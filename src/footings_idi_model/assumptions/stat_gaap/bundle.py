@@ -0,0 +1,210 @@
+import hashlib
+import importlib
+import json
+import os
+
+import numpy as np
+
+#########################################################################################
+# Assumption Bundle
+#
+# The compiled assumption tables (see get_compiled_ctr, get_compiled_incidence,
+# get_compiled_lapse and get_compiled_mortality) are built from the CSV/JSON files on
+# first use in every process. A bundle stores the compiled arrays as .npy files with a
+# JSON manifest so a process (e.g., each executor worker) memory maps the arrays
+# read-only instead of reading and compiling the tables. Processes mapping the same
+# bundle share one copy of the arrays in the page cache.
+#
+# A bundle is used when the FOOTINGS_IDI_ASSUMPTION_BUNDLE environment variable is set
+# to its directory before the tables are first used (worker processes inherit it).
+#########################################################################################
+
+BUNDLE_VERSION = 1
+
+BUNDLE_ENV = "FOOTINGS_IDI_ASSUMPTION_BUNDLE"
+
+MANIFEST_FILE = "manifest.json"
+
+directory, filename = os.path.split(__file__)
+
+# the compiled tables in a bundle (the getter is imported on use)
+TABLES = {
+    "ctr": "termination:get_compiled_ctr",
+    "incidence": "incidence:get_compiled_incidence",
+    "lapse": "lapse:get_compiled_lapse",
+    "mortality": "mortality:get_compiled_mortality",
+}
+
+_BUNDLES = {}
+
+
+def _import(path):
+    module, name = path.split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def _hash_bytes(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def source_hash():
+    """Hash the content of the assumption files (CSV and JSON) the tables are built from."""
+    digest = hashlib.sha256()
+    for root, dirs, files in sorted(os.walk(directory)):
+        dirs.sort()
+        for file in sorted(files):
+            if os.path.splitext(file)[1] not in [".csv", ".json"]:
+                continue
+            path = os.path.join(root, file)
+            digest.update(os.path.relpath(path, directory).encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _to_json(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _dump_table(name, compiled, path):
+    cls = type(compiled)
+    content = {
+        "class": f"{cls.__module__}:{cls.__qualname__}",
+        "arrays": {},
+        "indexes": {},
+        "values": {},
+    }
+    for attribute, value in vars(compiled).items():
+        if isinstance(value, np.ndarray):
+            if value.dtype == object:
+                msg = f"The array [{name}.{attribute}] can not be stored in a bundle."
+                raise TypeError(msg)
+            file = f"{name}.{attribute}.npy"
+            array = np.ascontiguousarray(value)
+            # write then rename so processes mapping an old bundle keep their copy
+            temp = os.path.join(path, f"{file}.tmp")
+            with open(temp, "wb") as f:
+                np.save(f, array)
+            os.replace(temp, os.path.join(path, file))
+            content["arrays"][attribute] = {
+                "file": file,
+                "dtype": str(array.dtype),
+                "shape": list(array.shape),
+                "sha256": _hash_bytes(array.tobytes()),
+            }
+        elif isinstance(value, dict):
+            # the indexes map each key to its position (see make_index)
+            keys = list(value)
+            if [value[key] for key in keys] != list(range(len(keys))):
+                msg = f"The dict [{name}.{attribute}] is not an index."
+                raise TypeError(msg)
+            content["indexes"][attribute] = [_to_json(key) for key in keys]
+        else:
+            content["values"][attribute] = _to_json(value)
+    return content
+
+
+def build_bundle(path: str):
+    """Compile the STAT/GAAP assumption tables and write them as a bundle.
+
+    Parameters
+    ----------
+    path : str
+        The directory to write the bundle to (created when missing).
+
+    Returns
+    -------
+    dict
+        The manifest of the bundle.
+    """
+    from .interest import _get_interest_rate
+
+    os.makedirs(path, exist_ok=True)
+    tables = {
+        name: _dump_table(name, _import(f"{__package__}.{getter}")(), path)
+        for name, getter in TABLES.items()
+    }
+    interest = {str(year): rate for year, rate in _get_interest_rate().items()}
+    content_hash = _hash_bytes(
+        json.dumps({"tables": tables, "interest": interest}, sort_keys=True).encode()
+    )
+    manifest = {
+        "version": BUNDLE_VERSION,
+        "source_hash": source_hash(),
+        "content_hash": content_hash,
+        "tables": tables,
+        "interest": interest,
+    }
+    temp = os.path.join(path, f"{MANIFEST_FILE}.tmp")
+    with open(temp, "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(temp, os.path.join(path, MANIFEST_FILE))
+    return manifest
+
+
+def _load_table(content, path, verify):
+    cls = _import(content["class"])
+    compiled = cls.__new__(cls)
+    for attribute, array in content["arrays"].items():
+        values = np.load(os.path.join(path, array["file"]), mmap_mode="r")
+        if verify and _hash_bytes(values.tobytes()) != array["sha256"]:
+            msg = f"The bundle array [{array['file']}] does not match its hash."
+            raise ValueError(msg)
+        setattr(compiled, attribute, values)
+    for attribute, keys in content["indexes"].items():
+        setattr(compiled, attribute, {key: i for i, key in enumerate(keys)})
+    for attribute, value in content["values"].items():
+        setattr(compiled, attribute, value)
+    return compiled
+
+
+def load_bundle(path: str, verify: bool = False):
+    """Load a bundle with the arrays memory mapped read-only.
+
+    Parameters
+    ----------
+    path : str
+        The directory of the bundle.
+    verify : bool, optional
+        Check the arrays against their hashes and the bundle against the current
+        assumption files (i.e., that the bundle is not stale), by default False.
+
+    Returns
+    -------
+    dict
+        The compiled tables by name (see TABLES) and the interest rates by year.
+    """
+    with open(os.path.join(path, MANIFEST_FILE)) as file:
+        manifest = json.load(file)
+    if manifest.get("version") != BUNDLE_VERSION:
+        msg = f"The bundle at [{path}] is version [{manifest.get('version')}] "
+        msg += f"while version [{BUNDLE_VERSION}] is required. Rebuild the bundle."
+        raise ValueError(msg)
+    if verify and manifest["source_hash"] != source_hash():
+        msg = f"The bundle at [{path}] was built from different assumption files."
+        raise ValueError(msg)
+    bundle = {
+        name: _load_table(content, path, verify)
+        for name, content in manifest["tables"].items()
+    }
+    bundle["interest"] = {int(year): rate for year, rate in manifest["interest"].items()}
+    return bundle
+
+
+def get_bundled(name: str):
+    """Get a compiled table from the bundle set with FOOTINGS_IDI_ASSUMPTION_BUNDLE (None
+    when no bundle is set)."""
+    path = os.environ.get(BUNDLE_ENV)
+    if not path:
+        return None
+    if path not in _BUNDLES:
+        _BUNDLES[path] = load_bundle(path)
+    return _BUNDLES[path][name]
+
+
+def use_bundle(path: str):
+    """Set the bundle used by this process and the worker processes it starts.
+
+    Needs to be called before the assumption tables are first used.
+    """
+    os.environ[BUNDLE_ENV] = os.path.abspath(path)
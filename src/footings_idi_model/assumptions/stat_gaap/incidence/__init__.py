@@ -1,9 +1,12 @@
 import json
 import os
-from functools import lru_cache
 
+import numpy as np
 import pandas as pd
-from footings.utils import once
+
+from ..bundle import get_bundled
+from ..metrics import lru_cache, metered, once
+from .compiled import CompiledIncidence
 
 directory, filename = os.path.split(__file__)
 
@@ -118,6 +121,37 @@ def get_margin_adjustment():
     return 1 + margin_temp["DURATION_1+"]
 
 
+@once
+def get_compiled_incidence():
+    """Get the incidence tables compiled into arrays (memory mapped from the assumption
+    bundle when one is set)."""
+    compiled = get_bundled("incidence")
+    if compiled is not None:
+        return compiled
+    return CompiledIncidence(
+        base_incidence=read_base_incidence(),
+        benefit_period_modifier=read_benefit_period_modifiers(),
+        contract_modifier=read_contract_modifiers(),
+        market_modifier=read_market_modifiers(),
+        tobacco_modifier=read_tobacco_modifiers(),
+        margin_adjustment=get_margin_adjustment(),
+    )
+
+
+# the policy attributes each incidence modifier is looked up by
+MODIFIER_KEYS = {
+    "CONTRACT_MODIFIER": ("idi_contract",),
+    "BENEFIT_PERIOD_MODIFIER": (
+        "idi_occupation_class",
+        "idi_benefit_period",
+        "elimination_period",
+    ),
+    "MARKET_MODIFIER": ("idi_market",),
+    "TOBACCO_MODIFIER": ("idi_occupation_class", "gender", "tobacco_usage"),
+}
+
+
+@metered
 def get_incidence_rates(
     idi_contract: str,
     idi_occupation_class: str,
@@ -128,53 +162,64 @@ def get_incidence_rates(
     gender: str,
     modifier_incidence: float,
 ):
-
-    prod_cols = [
-        "INCIDENCES",
-        "BENEFIT_PERIOD_MODIFIER",
-        "CONTRACT_MODIFIER",
-        "MARKET_MODIFIER",
-        "TOBACCO_MODIFIER",
-        "MARGIN_ADJUSTMENT",
-        "MODIFIER_INCIDENCE",
-    ]
-
-    frame = get_base_incidence(
+    compiled = get_compiled_incidence()
+    modifiers = compiled.modifiers(
+        idi_contract=idi_contract,
+        idi_occupation_class=idi_occupation_class,
+        idi_market=idi_market,
+        idi_benefit_period=idi_benefit_period,
+        tobacco_usage=tobacco_usage,
+        elimination_period=elimination_period,
+        gender=gender,
+    )
+    for name, modifier in modifiers.items():
+        if np.isnan(modifier[0]):
+            keys = {
+                "idi_contract": idi_contract,
+                "idi_occupation_class": idi_occupation_class,
+                "idi_market": idi_market,
+                "idi_benefit_period": idi_benefit_period,
+                "tobacco_usage": tobacco_usage,
+                "elimination_period": elimination_period,
+                "gender": gender,
+            }
+            values = ", ".join(f"{k}={keys[k]!r}" for k in MODIFIER_KEYS[name])
+            msg = f"The {name} is not found for {values}."
+            raise IndexError(msg)
+
+    incidences = compiled.incidences_by_age(
         idi_contract, idi_occupation_class, gender, elimination_period
-    ).reset_index()
-    frame["IDI_CONTRACT"] = idi_contract
-    frame["IDI_BENEFIT_PERIOD"] = idi_benefit_period
-    frame["IDI_MARKET"] = idi_market
-    frame["TOBACCO_USAGE"] = tobacco_usage
-    frame["BENEFIT_PERIOD_MODIFIER"] = get_benefit_period_modifier(
-        idi_occupation_class, idi_benefit_period, elimination_period
     )
-    frame["CONTRACT_MODIFIER"] = get_contract_modifier(idi_contract)
-    frame["MARKET_MODIFIER"] = get_market_modifier(idi_market)
-    frame["TOBACCO_MODIFIER"] = get_tobacco_modifier(
-        idi_occupation_class, gender, tobacco_usage
+    age_attained = np.flatnonzero(~np.isnan(incidences))
+    rates = compiled.incidence_rates(
+        idi_contract=idi_contract,
+        idi_occupation_class=idi_occupation_class,
+        idi_market=idi_market,
+        idi_benefit_period=idi_benefit_period,
+        tobacco_usage=tobacco_usage,
+        elimination_period=elimination_period,
+        gender=gender,
+        modifier_incidence=modifier_incidence,
+        age_attained=age_attained[None, :],
+    )
+
+    return pd.DataFrame(
+        {
+            "IDI_BENEFIT_PERIOD": idi_benefit_period,
+            "IDI_CONTRACT": idi_contract,
+            "IDI_MARKET": idi_market,
+            "IDI_OCCUPATION_CLASS": idi_occupation_class,
+            "TOBACCO_USAGE": tobacco_usage,
+            "ELIMINATION_PERIOD": elimination_period,
+            "GENDER": gender,
+            "AGE_ATTAINED": age_attained,
+            "INCIDENCES": incidences[age_attained],
+            "BENEFIT_PERIOD_MODIFIER": modifiers["BENEFIT_PERIOD_MODIFIER"][0],
+            "CONTRACT_MODIFIER": modifiers["CONTRACT_MODIFIER"][0],
+            "MARKET_MODIFIER": modifiers["MARKET_MODIFIER"][0],
+            "TOBACCO_MODIFIER": modifiers["TOBACCO_MODIFIER"][0],
+            "MARGIN_ADJUSTMENT": compiled.margin_adjustment,
+            "MODIFIER_INCIDENCE": modifier_incidence,
+            "INCIDENCE_RATE": rates[0],
+        }
     )
-    frame["MARGIN_ADJUSTMENT"] = get_margin_adjustment()
-    frame["MODIFIER_INCIDENCE"] = modifier_incidence
-    frame["INCIDENCE_RATE"] = frame[prod_cols].prod(axis=1).div(1000)
-
-    return frame[
-        [
-            "IDI_BENEFIT_PERIOD",
-            "IDI_CONTRACT",
-            "IDI_MARKET",
-            "IDI_OCCUPATION_CLASS",
-            "TOBACCO_USAGE",
-            "ELIMINATION_PERIOD",
-            "GENDER",
-            "AGE_ATTAINED",
-            "INCIDENCES",
-            "BENEFIT_PERIOD_MODIFIER",
-            "CONTRACT_MODIFIER",
-            "MARKET_MODIFIER",
-            "TOBACCO_MODIFIER",
-            "MARGIN_ADJUSTMENT",
-            "MODIFIER_INCIDENCE",
-            "INCIDENCE_RATE",
-        ]
-    ]
@@ -0,0 +1,228 @@
+import numpy as np
+
+from ..indexing import clip_index, lookup_index, make_index
+
+# the base incidence type used for each contract (anything else uses Acc + Sck)
+CONTRACT_TYPES = {"AO": "Acc", "SO": "Sck"}
+
+
+class CompiledIncidence:
+    """The incidence tables compiled into arrays.
+
+    The base incidences are stored by IDI contract / occupation class / gender /
+    elimination period / age attained with the contract modifier, margin adjustment and
+    the conversion from per 1,000 lives pre-multiplied. The benefit period, market and
+    tobacco modifiers are small arrays by their own keys which are multiplied into a
+    single factor for each policy.
+
+    Missing keys map to NaN.
+
+    Parameters
+    ----------
+    base_incidence : pd.DataFrame
+        The base incidence table (incidences per 1,000 by Acc / Sck).
+    benefit_period_modifier : pd.DataFrame
+        The benefit period modifier table.
+    contract_modifier : pd.DataFrame
+        The contract modifier table.
+    market_modifier : pd.DataFrame
+        The market modifier table.
+    tobacco_modifier : pd.DataFrame
+        The tobacco modifier table.
+    margin_adjustment : float
+        The margin adjustment (i.e., 1 + margin).
+    """
+
+    def __init__(
+        self,
+        base_incidence,
+        benefit_period_modifier,
+        contract_modifier,
+        market_modifier,
+        tobacco_modifier,
+        margin_adjustment,
+    ):
+        keys = ["IDI_OCCUPATION_CLASS", "GENDER", "ELIMINATION_PERIOD", "AGE_ATTAINED"]
+        base_incidence = base_incidence.assign(
+            TYPE=base_incidence["TYPE"].astype(str),
+            IDI_OCCUPATION_CLASS=base_incidence["IDI_OCCUPATION_CLASS"].astype(str),
+            GENDER=base_incidence["GENDER"].astype(str),
+        )
+        combined = base_incidence.groupby(keys, as_index=False)["INCIDENCES"].sum()
+
+        # base incidences by contract
+        contract_modifier = contract_modifier.drop_duplicates("IDI_CONTRACT")
+        self.contract_index = make_index(contract_modifier["IDI_CONTRACT"])
+        self.occupation_index = make_index(base_incidence["IDI_OCCUPATION_CLASS"])
+        self.gender_index = make_index(base_incidence["GENDER"])
+        self.elimination_period_index = make_index(base_incidence["ELIMINATION_PERIOD"])
+        self.ages = int(base_incidence["AGE_ATTAINED"].max()) + 2
+        self.incidences = np.full(
+            (
+                len(self.contract_index) + 1,
+                len(self.occupation_index) + 1,
+                len(self.gender_index) + 1,
+                len(self.elimination_period_index) + 1,
+                self.ages,
+            ),
+            np.nan,
+        )
+        for contract, i in self.contract_index.items():
+            if contract in CONTRACT_TYPES:
+                tbl = base_incidence[base_incidence["TYPE"] == CONTRACT_TYPES[contract]]
+            else:
+                tbl = combined
+            self.incidences[
+                i,
+                lookup_index(self.occupation_index, tbl["IDI_OCCUPATION_CLASS"]),
+                lookup_index(self.gender_index, tbl["GENDER"]),
+                lookup_index(self.elimination_period_index, tbl["ELIMINATION_PERIOD"]),
+                tbl["AGE_ATTAINED"].to_numpy(dtype=np.intp),
+            ] = tbl["INCIDENCES"].to_numpy(dtype=float)
+        self.contract_modifier = self._to_array(
+            contract_modifier,
+            [(self.contract_index, "IDI_CONTRACT")],
+            "CONTRACT_MODIFIER",
+        )
+        self.margin_adjustment = margin_adjustment
+
+        # pre-multiply contract modifier, margin and conversion from per 1,000 lives
+        shape = (-1,) + (1,) * (self.incidences.ndim - 1)
+        self.base = (
+            self.incidences
+            * self.contract_modifier.reshape(shape)
+            * margin_adjustment
+            / 1000
+        )
+
+        # policy level modifiers
+        self.benefit_period_index = make_index(
+            benefit_period_modifier["IDI_BENEFIT_PERIOD"]
+        )
+        self.benefit_period_modifier = self._to_array(
+            benefit_period_modifier,
+            [
+                (self.occupation_index, "IDI_OCCUPATION_CLASS"),
+                (self.benefit_period_index, "IDI_BENEFIT_PERIOD"),
+                (self.elimination_period_index, "ELIMINATION_PERIOD"),
+            ],
+            "BENEFIT_PERIOD_MODIFIER",
+        )
+        self.market_index = make_index(market_modifier["IDI_MARKET"])
+        self.market_modifier = self._to_array(
+            market_modifier, [(self.market_index, "IDI_MARKET")], "MARKET_MODIFIER"
+        )
+        # the tobacco modifier does not vary by elimination period
+        self.tobacco_index = make_index(tobacco_modifier["TOBACCO_USAGE"])
+        self.tobacco_modifier = self._to_array(
+            tobacco_modifier.drop_duplicates(
+                ["IDI_OCCUPATION_CLASS", "GENDER", "TOBACCO_USAGE"]
+            ),
+            [
+                (self.occupation_index, "IDI_OCCUPATION_CLASS"),
+                (self.gender_index, "GENDER"),
+                (self.tobacco_index, "TOBACCO_USAGE"),
+            ],
+            "TOBACCO_MODIFIER",
+        )
+
+    @staticmethod
+    def _to_array(frame, dimensions, value):
+        arr = np.full(tuple(len(index) + 1 for index, _ in dimensions), np.nan)
+        position = tuple(lookup_index(index, frame[key]) for index, key in dimensions)
+        arr[position] = frame[value].to_numpy(dtype=float)
+        return arr
+
+    def modifiers(
+        self,
+        idi_contract,
+        idi_occupation_class,
+        idi_market,
+        idi_benefit_period,
+        tobacco_usage,
+        elimination_period,
+        gender,
+    ):
+        """Get the policy level modifiers for policies.
+
+        Each argument is a scalar or an array (one value per policy). Returns a dict of
+        arrays (one value per policy).
+        """
+        occupation = lookup_index(self.occupation_index, idi_occupation_class)
+        gender = lookup_index(self.gender_index, gender)
+        return {
+            "CONTRACT_MODIFIER": self.contract_modifier[
+                lookup_index(self.contract_index, idi_contract)
+            ],
+            "BENEFIT_PERIOD_MODIFIER": self.benefit_period_modifier[
+                occupation,
+                lookup_index(self.benefit_period_index, idi_benefit_period),
+                lookup_index(self.elimination_period_index, elimination_period),
+            ],
+            "MARKET_MODIFIER": self.market_modifier[
+                lookup_index(self.market_index, idi_market)
+            ],
+            "TOBACCO_MODIFIER": self.tobacco_modifier[
+                occupation, gender, lookup_index(self.tobacco_index, tobacco_usage)
+            ],
+        }
+
+    def incidences_by_age(
+        self, idi_contract, idi_occupation_class, gender, elimination_period
+    ):
+        """Get the base incidences (per 1,000 lives) by age attained for a policy
+        (NaN for ages not on the table)."""
+        return self.incidences[
+            lookup_index(self.contract_index, idi_contract)[0],
+            lookup_index(self.occupation_index, idi_occupation_class)[0],
+            lookup_index(self.gender_index, gender)[0],
+            lookup_index(self.elimination_period_index, elimination_period)[0],
+        ]
+
+    def incidence_rates(
+        self,
+        idi_contract,
+        idi_occupation_class,
+        idi_market,
+        idi_benefit_period,
+        tobacco_usage,
+        elimination_period,
+        gender,
+        modifier_incidence,
+        age_attained,
+    ):
+        """Get the incidence rates for policies.
+
+        The rating arguments are scalars or arrays (one value per policy) and
+        age_attained is an array of shape (policies, durations). Returns an array of
+        incidence rates with shape (policies, durations).
+        """
+        ages = np.atleast_2d(np.asarray(age_attained, dtype=np.intp))
+        n = ages.shape[0]
+
+        def _column(values):
+            return np.broadcast_to(values, (n,))[:, None]
+
+        modifiers = self.modifiers(
+            idi_contract=idi_contract,
+            idi_occupation_class=idi_occupation_class,
+            idi_market=idi_market,
+            idi_benefit_period=idi_benefit_period,
+            tobacco_usage=tobacco_usage,
+            elimination_period=elimination_period,
+            gender=gender,
+        )
+        factor = (
+            modifiers["BENEFIT_PERIOD_MODIFIER"]
+            * modifiers["MARKET_MODIFIER"]
+            * modifiers["TOBACCO_MODIFIER"]
+            * np.asarray(modifier_incidence, dtype=float)
+        )
+        base = self.base[
+            _column(lookup_index(self.contract_index, idi_contract)),
+            _column(lookup_index(self.occupation_index, idi_occupation_class)),
+            _column(lookup_index(self.gender_index, gender)),
+            _column(lookup_index(self.elimination_period_index, elimination_period)),
+            np.where(ages >= 0, clip_index(ages, self.ages), self.ages - 1),
+        ]
+        return base * _column(factor)
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+
+def make_index(values):
+    """Map each unique value to a position.
+
+    The position after the last value (i.e., len(index)) is reserved for missing values
+    so arrays built with an index should have one extra (NaN) slot for each dimension.
+    """
+    return {
+        value: i for i, value in enumerate(pd.unique(np.asarray(values, dtype=object)))
+    }
+
+
+def lookup_index(index, values):
+    """Get positions for values (missing values get the reserved missing position)."""
+    missing = len(index)
+    values = np.atleast_1d(np.asarray(values, dtype=object))
+    return np.array([index.get(value, missing) for value in values], dtype=np.intp)
+
+
+def clip_index(positions, size):
+    """Clip positions to size - 1 which is always a NaN slot."""
+    return np.clip(positions, 0, size - 1)
+
+
+def expand_index(positions, ndim):
+    """Reshape positions (one per row) to broadcast against an array with ndim
+    dimensions."""
+    if ndim > 1:
+        return positions.reshape((-1,) + (1,) * (ndim - 1))
+    return positions
@@ -1,9 +1,11 @@
 import json
 import os
-from functools import lru_cache
 
 import pandas as pd
 
+from ..bundle import get_bundled
+from ..metrics import lru_cache, metered
+
 directory, filename = os.path.split(__file__)
 
 interest_file = os.path.join(directory, "interest.json")
@@ -12,6 +14,9 @@ interest_file = os.path.join(directory, "interest.json")
 @lru_cache(maxsize=1)
 def _get_interest_rate():
     """Get termination margin"""
+    interest_dict = get_bundled("interest")
+    if interest_dict is not None:
+        return interest_dict
 
     with open(interest_file, "r") as f:
         interest_records = json.load(f)
@@ -22,11 +27,13 @@ def _get_interest_rate():
     return interest_dict
 
 
+@metered
 def get_al_interest_rate(policy_start_dt: pd.Timestamp):
     """Get the valuation interest rate based on the policy start date."""
     return _get_interest_rate()[policy_start_dt.year]
 
 
+@metered
 def get_dl_interest_rate(incurred_dt: pd.Timestamp):
     """Get the valuation interest rate based on the disability incurred date."""
     return _get_interest_rate()[incurred_dt.year]
@@ -1,7 +1,11 @@
 import os
 
+import numpy as np
 import pandas as pd
-from footings.utils import once
+
+from ..bundle import get_bundled
+from ..indexing import expand_index
+from ..metrics import metered, once
 
 directory, filename = os.path.split(__file__)
 
@@ -11,12 +15,71 @@ def load_lapse_file():
     return pd.read_csv(os.path.join(directory, "lapse-rate-table.csv"))
 
 
-def get_lapse_rates(age_issued: int, modifier_lapse: float):
-    return (
-        load_lapse_file()
-        .query("ISSUE_AGE_MIN <= @age_issue <= ISSUE_AGE_MAX")
-        .assign(
-            MODIFIER_LAPSE=modifier_lapse,
-            LAPSE_RATE=lambda df: df.BASE_LAPSE_RATE * df.MODIFIER_LAPSE,
+class CompiledLapse:
+    """The lapse table compiled into an array by issue age band / duration year.
+
+    Durations past the end of the table use the rate for the last duration. Issue ages
+    not on the table map to NaN.
+
+    Parameters
+    ----------
+    tbl : pd.DataFrame
+        The lapse table.
+    """
+
+    def __init__(self, tbl):
+        bands = tbl[["ISSUE_AGE_MIN", "ISSUE_AGE_MAX"]].drop_duplicates()
+        self.ages = int(bands["ISSUE_AGE_MAX"].max()) + 2
+        self.band = np.full(self.ages, len(bands), dtype=np.intp)
+        self.durations = int(tbl["DURATION_YEAR"].max()) + 1
+        self.rates = np.full((len(bands) + 1, self.durations), np.nan)
+        for i, (age_min, age_max) in enumerate(bands.itertuples(index=False)):
+            self.band[age_min : age_max + 1] = i
+            band = tbl[(tbl.ISSUE_AGE_MIN == age_min) & (tbl.ISSUE_AGE_MAX == age_max)]
+            durations = band["DURATION_YEAR"].to_numpy(dtype=np.intp)
+            self.rates[i, durations] = band["BASE_LAPSE_RATE"].to_numpy(dtype=float)
+            # carry the last rate forward to later durations
+            self.rates[i] = pd.Series(self.rates[i]).ffill().to_numpy()
+
+    def lapse_rates(self, age_issued, duration_year, modifier_lapse):
+        """Get the lapse rates for duration_year (any shape) where age_issued and
+        modifier_lapse are scalars or arrays (one value per row of duration_year).
+        """
+        durations = np.asarray(duration_year, dtype=np.intp)
+        ages = np.atleast_1d(np.asarray(age_issued, dtype=np.intp))
+        ages = np.where((ages >= 0) & (ages < self.ages), ages, self.ages - 1)
+        band = expand_index(self.band[ages], durations.ndim)
+        modifier = expand_index(
+            np.atleast_1d(np.asarray(modifier_lapse, dtype=float)), durations.ndim
         )
+        durations = np.clip(durations, 0, self.durations - 1)
+        return self.rates[band, durations] * modifier
+
+
+@once
+def get_compiled_lapse():
+    """Get the lapse table compiled into an array (memory mapped from the assumption
+    bundle when one is set)."""
+    compiled = get_bundled("lapse")
+    if compiled is not None:
+        return compiled
+    return CompiledLapse(load_lapse_file())
+
+
+@metered
+def get_lapse_rates(age_issued: int, modifier_lapse: float):
+    tbl = load_lapse_file()
+    return tbl[
+        (tbl.ISSUE_AGE_MIN <= age_issued) & (age_issued <= tbl.ISSUE_AGE_MAX)
+    ].assign(
+        MODIFIER_LAPSE=modifier_lapse,
+        LAPSE_RATE=lambda df: df.BASE_LAPSE_RATE * df.MODIFIER_LAPSE,
+    )
+
+
+@metered
+def get_lapse_rate_array(age_issued, duration_year, modifier_lapse):
+    """Get lapse rates as an array with the same shape as duration_year."""
+    return get_compiled_lapse().lapse_rates(
+        age_issued=age_issued, duration_year=duration_year, modifier_lapse=modifier_lapse
     )
@@ -0,0 +1,260 @@
+import functools
+import json
+import os
+from time import perf_counter
+
+import pandas as pd
+
+#########################################################################################
+# Assumption Metrics
+#
+# The assumption lookups are wrapped with once, lru_cache and metered (drop-in
+# replacements of footings.utils.once and functools.lru_cache). When the metrics are
+# enabled (see enable_metrics) each wrapper records the calls, cache hits, misses and
+# evictions and the cumulative time (including the time of any lookups it calls) of its
+# function by name (e.g., incidence.get_tobacco_modifier). When disabled the wrappers
+# only check a flag before calling the cached function.
+#
+# The metrics are per process. run_chunked gathers the metrics recorded by the worker
+# processes into the process running the extract model (see run_metered).
+#########################################################################################
+
+METRICS_ENV = "FOOTINGS_IDI_ASSUMPTION_METRICS"
+
+COLUMNS = [
+    "ASSUMPTION",
+    "CACHE",
+    "MAXSIZE",
+    "CALLS",
+    "HITS",
+    "MISSES",
+    "EVICTIONS",
+    "HIT_RATE",
+    "SECONDS",
+    "SECONDS_PER_CALL",
+]
+
+# calls, hits, misses, evictions and seconds
+_COUNTERS = 5
+
+
+class AssumptionMetrics:
+    """The calls, cache hits, misses and evictions and cumulative time of each
+    assumption lookup.
+
+    Parameters
+    ----------
+    enabled : bool, optional
+        Whether the lookups record metrics, by default False.
+    """
+
+    __slots__ = ("enabled", "caches", "counters")
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        # the cache type and maxsize of each lookup
+        self.caches = {}
+        self.counters = {}
+
+    def register(self, name: str, cache: str, maxsize: int = None):
+        """Register a lookup with its cache type (none, once or lru) and maxsize."""
+        self.caches[name] = (cache, maxsize)
+
+    def record(self, name, seconds, hit=False, miss=False, eviction=False):
+        """Record a call of a lookup."""
+        counters = self.counters.get(name)
+        if counters is None:
+            counters = self.counters[name] = [0, 0, 0, 0, 0.0]
+        counters[0] += 1
+        counters[1] += hit
+        counters[2] += miss
+        counters[3] += eviction
+        counters[4] += seconds
+
+    def snapshot(self):
+        """A copy of the counters."""
+        return {name: list(counters) for name, counters in self.counters.items()}
+
+    def delta(self, snapshot: dict):
+        """The counters recorded since snapshot was taken."""
+        ret = {}
+        for name, counters in self.counters.items():
+            before = snapshot.get(name, [0] * _COUNTERS)
+            change = [now - then for now, then in zip(counters, before)]
+            if change[0] > 0:
+                ret[name] = change
+        return ret
+
+    def update(self, counters: dict):
+        """Add counters (e.g., the delta of a worker process)."""
+        for name, values in counters.items():
+            current = self.counters.get(name)
+            if current is None:
+                self.counters[name] = list(values)
+            else:
+                self.counters[name] = [a + b for a, b in zip(current, values)]
+
+    def reset(self):
+        """Reset the counters (the caches are left as is)."""
+        self.counters = {}
+
+    def to_frame(self):
+        """The metrics as a DataFrame (one row for each lookup called) sorted by seconds.
+
+        HIT_RATE is the share of calls that were cache hits (NaN for lookups without a
+        cache).
+        """
+        rows = []
+        for name, (calls, hits, misses, evictions, seconds) in self.counters.items():
+            cache, maxsize = self.caches.get(name, ("none", None))
+            rows.append(
+                (
+                    name,
+                    cache,
+                    maxsize,
+                    calls,
+                    hits,
+                    misses,
+                    evictions,
+                    hits / calls if cache != "none" else float("nan"),
+                    seconds,
+                    seconds / calls,
+                )
+            )
+        frame = pd.DataFrame(rows, columns=COLUMNS)
+        return frame.sort_values("SECONDS", ascending=False, ignore_index=True)
+
+
+METRICS = AssumptionMetrics(enabled=os.environ.get(METRICS_ENV, "") not in ["", "0"])
+
+
+def enable_metrics(reset: bool = True):
+    """Start recording the assumption metrics in this process.
+
+    Worker processes started after the call also record the metrics (the
+    FOOTINGS_IDI_ASSUMPTION_METRICS environment variable is set).
+    """
+    if reset:
+        METRICS.reset()
+    METRICS.enabled = True
+    os.environ[METRICS_ENV] = "1"
+
+
+def disable_metrics():
+    """Stop recording the assumption metrics."""
+    METRICS.enabled = False
+    os.environ.pop(METRICS_ENV, None)
+
+
+def get_metrics():
+    """Get the assumption metrics recorded as a DataFrame (see AssumptionMetrics)."""
+    return METRICS.to_frame()
+
+
+def export_metrics(path: str):
+    """Write the assumption metrics to a CSV or JSON (.json) file."""
+    frame = get_metrics()
+    if os.path.splitext(str(path))[1].lower() == ".json":
+        records = json.loads(frame.to_json(orient="records"))
+        with open(path, "w") as file:
+            json.dump(records, file, indent=2)
+    else:
+        frame.to_csv(path, index=False)
+    return frame
+
+
+def _name(function):
+    qualname = function.__qualname__
+    if "." in qualname:
+        return qualname
+    return f"{function.__module__.rsplit('.', 1)[-1]}.{qualname}"
+
+
+def metered(function):
+    """Record the calls and time of a lookup without a cache."""
+    name = _name(function)
+    METRICS.register(name, "none")
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not METRICS.enabled:
+            return function(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            METRICS.record(name, perf_counter() - start)
+
+    return wrapper
+
+
+def once(function):
+    """Call function once and return the same object after (as footings.utils.once)
+    recording the calls and hits."""
+    name = _name(function)
+    METRICS.register(name, "once", 1)
+    obj = None
+
+    @functools.wraps(function)
+    def inner():
+        nonlocal obj
+        if not METRICS.enabled:
+            if obj is None:
+                obj = function()
+            return obj
+        start = perf_counter()
+        miss = obj is None
+        if miss:
+            obj = function()
+        METRICS.record(name, perf_counter() - start, hit=not miss, miss=miss)
+        return obj
+
+    return inner
+
+
+def lru_cache(maxsize=128):
+    """A functools.lru_cache recording the calls, hits, misses and evictions.
+
+    Can be used as ``@lru_cache``, ``@lru_cache(256)`` or ``@lru_cache(maxsize=256)``.
+    The cache_info and cache_clear methods of the cache are available on the wrapper.
+    """
+    if callable(maxsize):
+        return lru_cache()(maxsize)
+
+    def decorator(function):
+        name = _name(function)
+        METRICS.register(name, "lru", maxsize)
+        cached = functools.lru_cache(maxsize=maxsize)(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return cached(*args, **kwargs)
+            before = cached.cache_info()
+            start = perf_counter()
+            try:
+                return cached(*args, **kwargs)
+            finally:
+                seconds = perf_counter() - start
+                after = cached.cache_info()
+                miss = after.misses > before.misses
+                eviction = miss and maxsize is not None and before.currsize >= maxsize
+                METRICS.record(name, seconds, hit=not miss, miss=miss, eviction=eviction)
+
+        wrapper.cache_info = cached.cache_info
+        wrapper.cache_clear = cached.cache_clear
+        return wrapper
+
+    return decorator
+
+
+def run_metered(records, *, run_chunk, driver: int, **kwargs):
+    """Run a chunk with run_chunk returning the result and the assumption metrics
+    recorded by the worker process (None when ran in the driver process as the metrics
+    are already recorded there)."""
+    if os.getpid() == driver:
+        return run_chunk(records, **kwargs), None
+    METRICS.enabled = True
+    snapshot = METRICS.snapshot()
+    result = run_chunk(records, **kwargs)
+    return result, METRICS.delta(snapshot)
@@ -1,8 +1,12 @@
 import os
-from functools import lru_cache
 
+import numpy as np
 import pandas as pd
 
+from ..bundle import get_bundled
+from ..indexing import clip_index, expand_index, lookup_index, make_index
+from ..metrics import metered, once
+
 directory, filename = os.path.split(__file__)
 
 WITHDRAW_TABLES = {
@@ -13,18 +17,91 @@ WITHDRAW_TABLES = {
 }
 
 
-@lru_cache(maxsize=4)
+@once
+def read_mortality_tables():
+    """Read all mortality tables into a dict of frames."""
+    return {table_name: pd.read_csv(file) for table_name, file in WITHDRAW_TABLES.items()}
+
+
+class CompiledMortality:
+    """The mortality tables compiled into an array by table / gender / age attained.
+
+    Missing keys (and ages not on a table) map to NaN.
+
+    Parameters
+    ----------
+    tables : dict
+        The mortality tables (as frames) by table name.
+    """
+
+    def __init__(self, tables):
+        self.table_index = {table_name: i for i, table_name in enumerate(tables)}
+        self.gender_index = make_index(
+            np.concatenate(
+                [tbl["GENDER"].to_numpy(dtype=object) for tbl in tables.values()]
+            )
+        )
+        self.ages = max(int(tbl["AGE_ATTAINED"].max()) for tbl in tables.values()) + 2
+        self.rates = np.full(
+            (len(self.table_index) + 1, len(self.gender_index) + 1, self.ages), np.nan
+        )
+        for table_name, tbl in tables.items():
+            self.rates[
+                self.table_index[table_name],
+                lookup_index(self.gender_index, tbl["GENDER"]),
+                tbl["AGE_ATTAINED"].to_numpy(dtype=np.intp),
+            ] = tbl["MORTALITY_RATE"].to_numpy(dtype=float)
+
+    def mortality_rates(self, table_name, gender, age_attained, modifier_mortality):
+        """Get the mortality rates for age attained (any shape) where gender and
+        modifier_mortality are scalars or arrays (one value per row of age_attained).
+        """
+        if table_name not in self.table_index:
+            raise ValueError(f"The table [{table_name}] is not known. See documentation.")
+        ages = np.asarray(age_attained, dtype=np.intp)
+        gender = expand_index(lookup_index(self.gender_index, gender), ages.ndim)
+        modifier = expand_index(
+            np.atleast_1d(np.asarray(modifier_mortality, dtype=float)), ages.ndim
+        )
+        ages = np.where(ages >= 0, clip_index(ages, self.ages), self.ages - 1)
+        return self.rates[self.table_index[table_name], gender, ages] * modifier
+
+
+@once
+def get_compiled_mortality():
+    """Get the mortality tables compiled into an array (memory mapped from the
+    assumption bundle when one is set)."""
+    compiled = get_bundled("mortality")
+    if compiled is not None:
+        return compiled
+    return CompiledMortality(read_mortality_tables())
+
+
+@metered
 def get_mortality_rates(table_name: str, gender: str, modifier_mortality: float):
     """Get mortality rates."""
-    file = WITHDRAW_TABLES.get(table_name, None)
-    if file is None:
+    if table_name not in WITHDRAW_TABLES:
         raise ValueError(f"The table [{table_name}] is not known. See documentation.")
-    return (
-        pd.read_csv(file)
-        .rename(columns={"MORTALITY_RATE": "BASE_MORTALITY_RATE"})
-        .query("GENDER==@gender")
-        .assign(
-            MODIFIER_MORTALITY=modifier_mortality,
-            MORTALITY_RATE=lambda df: df.BASE_MORTALITY_RATE * df.MODIFIER_MORTALITY,
-        )
+    tbl = read_mortality_tables()[table_name]
+    tbl = tbl[tbl["GENDER"] == gender]
+    return pd.DataFrame(
+        {
+            "BASIS": tbl["BASIS"],
+            "GENDER": tbl["GENDER"],
+            "AGE_ATTAINED": tbl["AGE_ATTAINED"],
+            "BASE_MORTALITY_RATE": tbl["MORTALITY_RATE"],
+            "MODIFIER_MORTALITY": modifier_mortality,
+            "MORTALITY_RATE": tbl["MORTALITY_RATE"] * modifier_mortality,
+        }
+    )
+
+
+@metered
+def get_mortality_rate_array(table_name: str, gender, age_attained, modifier_mortality):
+    """Get mortality rates as an array with the same shape as age_attained."""
+    return get_compiled_mortality().mortality_rates(
+        table_name=table_name,
+        gender=gender,
+        age_attained=age_attained,
+        modifier_mortality=modifier_mortality,
     )
@@ -3,10 +3,25 @@ import os
 
 import numpy as np
 import pandas as pd
-from footings.utils import once
+
+from ..bundle import get_bundled
+from ..metrics import metered, once
+from .compiled import PERIOD_CODES, CompiledCTR
 
 directory, filename = os.path.split(__file__)
 
+PERIOD_NAMES = {code: period for period, code in PERIOD_CODES.items()}
+
+SELECT_COLUMNS = [
+    "BASE_SELECT_CTR",
+    "BENEFIT_PERIOD_MODIFIER",
+    "CONTRACT_MODIFIER",
+    "DIAGNOSIS_MODIFIER",
+    "CAUSE_MODIFIER",
+    "MARGIN_SELECT",
+    "SELECT_CTR",
+]
+
 
 @once
 def get_contract_modifier():
@@ -78,6 +93,27 @@ def margin_to_table_select(margin):
     return tbl
 
 
+@once
+def get_compiled_ctr():
+    """Get the select and ultimate CTR tables compiled into arrays (memory mapped from
+    the assumption bundle when one is set)."""
+    compiled = get_bundled("ctr")
+    if compiled is not None:
+        return compiled
+    margin = get_margin()
+    return CompiledCTR(
+        base_select=get_base_select_ctr(),
+        base_ultimate=get_base_ultimate_ctr(),
+        benefit_period_modifier=get_benefit_period_modifier(),
+        contract_modifier=get_contract_modifier(),
+        diagnosis_modifier=get_diagnosis_modifier(),
+        cause_modifier=get_cause_modifier(),
+        margin_select=margin_to_table_select(margin),
+        margin_ultimate=margin["DURATION_2+"],
+    )
+
+
+@metered
 def get_ctr_select(
     idi_benefit_period: str,
     idi_contract: str,
@@ -91,91 +127,56 @@ def get_ctr_select(
     modifier_ctr: float,
 ):
     """Generate ctr select rates."""
+    compiled = get_compiled_ctr()
+    duration_month = np.arange(1, compiled.select_months + 1)
+    select = compiled.select(
+        idi_benefit_period=idi_benefit_period,
+        idi_contract=idi_contract,
+        idi_diagnosis_grp=idi_diagnosis_grp,
+        idi_occupation_class=idi_occupation_class,
+        gender=gender,
+        elimination_period=elimination_period,
+        age_incurred=age_incurred,
+        cola_percent=cola_percent,
+        model_mode=model_mode,
+        modifier_ctr=modifier_ctr,
+        duration_month=duration_month[None, :],
+    )
+    return select_to_frame(select, duration_month, available_only=True)
+
 
-    def _make_query(*args):
-        return " and ".join(args)
-
-    def _specify_model_mode(tbl, model_mode):
-        cols = ["IDI_CONTRACT", "GENDER", "DURATION_YEAR", "CAUSE_MODIFIER"]
-        if model_mode[:3] == "DLR":
-            tbl = tbl.rename(columns={"CAUSE_MODIFIER_DLR": "CAUSE_MODIFIER"})
-            return tbl[cols]
-        elif model_mode[:3] == "ALR":
-            tbl = tbl.rename(columns={"CAUSE_MODIFIER_ALR": "CAUSE_MODIFIER"})
-            return tbl[cols]
-        else:
-            raise ValueError(f"The model_mode [{model_mode}] is not recognized.")
-
-    cola_flag = "N" if cola_percent == 0 else "Y"
-
-    bp_query = "IDI_BENEFIT_PERIOD==@idi_benefit_period"
-    ct_query = "IDI_CONTRACT==@idi_contract"
-    dg_query = "IDI_DIAGNOSIS_GRP==@idi_diagnosis_grp"
-    oc_query = "IDI_OCCUPATION_CLASS==@idi_occupation_class"
-    gd_query = "GENDER==@gender"
-    ep_query = "ELIMINATION_PERIOD==@elimination_period"
-    ai_query = "AGE_INCURRED==@age_incurred"
-    ca_query = "COLA_FLAG==@cola_flag"
-
-    select_tbl = get_base_select_ctr().query(
-        _make_query(oc_query, gd_query, ep_query, ai_query)
+def select_to_frame(select, duration_month, available_only=False):
+    """Transform the select rate components for a single claim to a table."""
+    available = select["AVAILABLE"][0]
+    period = np.array(
+        [PERIOD_NAMES.get(code, np.nan) for code in select["PERIOD"][0]], dtype=object
     )
-    bp_tbl = get_benefit_period_modifier().query(_make_query(bp_query, ca_query))
-    contract_tbl = get_contract_modifier().query(ct_query)
-    cause_tbl = (
-        get_cause_modifier()
-        .query(_make_query(ct_query, gd_query))
-        .pipe(_specify_model_mode, model_mode)
+    duration_year = np.where(available, select["DURATION_YEAR"][0], np.nan)
+    tbl = pd.DataFrame(
+        {
+            "DURATION_YEAR": duration_year,
+            "DURATION_MONTH": duration_month,
+            "PERIOD": period,
+            **{col: select[col][0] for col in SELECT_COLUMNS},
+        }
     )
-    diagnosis_tbl = get_diagnosis_modifier().query(dg_query)
-    margin_tbl = margin_to_table_select(get_margin())
-
-    col_order = [
-        "DURATION_YEAR",
-        "DURATION_MONTH",
-        "PERIOD",
-        "BASE_SELECT_CTR",
-        "BENEFIT_PERIOD_MODIFIER",
-        "CONTRACT_MODIFIER",
-        "DIAGNOSIS_MODIFIER",
-        "CAUSE_MODIFIER",
-        "MARGIN_SELECT",
-        "SELECT_CTR",
-    ]
-
-    rate_tbl = (
-        select_tbl.merge(bp_tbl, how="left", on=["DURATION_YEAR"])
-        .merge(contract_tbl, how="left", on=["DURATION_YEAR"])
-        .merge(diagnosis_tbl, how="left", on=["DURATION_YEAR"])
-        .merge(cause_tbl, how="left", on=["DURATION_YEAR", "GENDER", "IDI_CONTRACT"])
-        .merge(margin_tbl, how="left", on=["DURATION_YEAR"])
-        .assign(
-            MODIFIER_CTR=modifier_ctr,
-            SELECT_CTR=lambda df: df.BASE_SELECT_CTR
-            * df.BENEFIT_PERIOD_MODIFIER
-            * df.CONTRACT_MODIFIER
-            * df.CAUSE_MODIFIER
-            * df.DIAGNOSIS_MODIFIER
-            * df.MARGIN_SELECT
-            * df.MODIFIER_CTR,
-        )
-    )[col_order]
-    return rate_tbl
+    if available_only:
+        tbl = tbl[available].reset_index(drop=True).astype({"DURATION_YEAR": int})
+    return tbl
 
 
+@metered
 def get_ctr_ultimate(idi_occupation_class: str, gender: str, modifier_ctr: float):
     """Generate ctr ultimate rates."""
-    query = "IDI_OCCUPATION_CLASS==@idi_occupation_class and GENDER==@gender"
-    margin = get_margin()["DURATION_2+"]
-    tbl = (
-        get_base_ultimate_ctr()
-        .query(query)
-        .assign(
-            MARGIN_ULTIMATE=1 - margin,
-            MODIFIER_CTR=modifier_ctr,
-            ULTIMATE_CTR=lambda df: df.BASE_ULTIMATE_CTR
-            * df.MARGIN_ULTIMATE
-            * df.MODIFIER_CTR,
-        )
+    compiled = get_compiled_ctr()
+    age_attained = np.arange(compiled.ultimate_ages)
+    ultimate = compiled.ultimate(
+        idi_occupation_class=idi_occupation_class,
+        gender=gender,
+        modifier_ctr=modifier_ctr,
+        age_attained=age_attained[None, :],
+    )
+    tbl = pd.DataFrame(
+        {"AGE_ATTAINED": age_attained, **{col: ultimate[col][0] for col in ultimate}}
     )
-    return tbl[["AGE_ATTAINED", "BASE_ULTIMATE_CTR", "MARGIN_ULTIMATE", "ULTIMATE_CTR"]]
+    return tbl[tbl["BASE_ULTIMATE_CTR"].notna()].reset_index(drop=True)
@@ -0,0 +1,351 @@
+import numpy as np
+import pandas as pd
+
+from ..indexing import clip_index, lookup_index, make_index
+
+PERIOD_CODES = {"M": 1, "Y": 2}
+
+MODEL_MODES = {"DLR": 0, "ALR": 1}
+
+
+def _to_monthly(rate):
+    return 1 - (1 - rate) ** (1 / 12)
+
+
+class CompiledCTR:
+    """The select and ultimate claim termination rate (CTR) tables compiled into arrays.
+
+    A fully expanded cube over every rating dimension would hold close to a billion
+    cells, so the select rates are stored as a base array by occupation class, gender,
+    elimination period, age incurred and duration month with each modifier stored as
+    its own array by duration year. Looking up rates for a claim (or many claims) is a
+    handful of array slices multiplied together in the same order as the table merges.
+
+    Missing keys map to NaN (the same as a left merge on the tables).
+
+    Parameters
+    ----------
+    base_select : pd.DataFrame
+        The base select CTR table.
+    base_ultimate : pd.DataFrame
+        The base ultimate CTR table.
+    benefit_period_modifier : pd.DataFrame
+        The benefit period modifier table.
+    contract_modifier : pd.DataFrame
+        The contract modifier table.
+    diagnosis_modifier : pd.DataFrame
+        The diagnosis modifier table.
+    cause_modifier : pd.DataFrame
+        The cause modifier table.
+    margin_select : pd.DataFrame
+        The select margin by duration year.
+    margin_ultimate : float
+        The ultimate margin.
+    """
+
+    def __init__(
+        self,
+        base_select,
+        base_ultimate,
+        benefit_period_modifier,
+        contract_modifier,
+        diagnosis_modifier,
+        cause_modifier,
+        margin_select,
+        margin_ultimate,
+    ):
+        # select base by occupation class / gender / elimination period / age / month
+        tbl = base_select
+        self.occupation_index = make_index(
+            np.concatenate(
+                [
+                    np.asarray(tbl["IDI_OCCUPATION_CLASS"], dtype=object),
+                    np.asarray(base_ultimate["IDI_OCCUPATION_CLASS"], dtype=object),
+                ]
+            )
+        )
+        self.gender_index = make_index(
+            np.concatenate(
+                [
+                    np.asarray(tbl["GENDER"], dtype=object),
+                    np.asarray(base_ultimate["GENDER"], dtype=object),
+                    np.asarray(cause_modifier["GENDER"], dtype=object),
+                ]
+            )
+        )
+        self.elimination_period_index = make_index(tbl["ELIMINATION_PERIOD"])
+        self.age_incurred_index = make_index(tbl["AGE_INCURRED"])
+        self.select_months = int(tbl["DURATION_MONTH"].max()) if tbl.shape[0] else 0
+        shape = (
+            len(self.occupation_index) + 1,
+            len(self.gender_index) + 1,
+            len(self.elimination_period_index) + 1,
+            len(self.age_incurred_index) + 1,
+            self.select_months + 1,
+        )
+        position = (
+            lookup_index(self.occupation_index, tbl["IDI_OCCUPATION_CLASS"]),
+            lookup_index(self.gender_index, tbl["GENDER"]),
+            lookup_index(self.elimination_period_index, tbl["ELIMINATION_PERIOD"]),
+            lookup_index(self.age_incurred_index, tbl["AGE_INCURRED"]),
+            tbl["DURATION_MONTH"].to_numpy(dtype=np.intp) - 1,
+        )
+        self.base_select = np.full(shape, np.nan)
+        self.base_select[position] = tbl["BASE_SELECT_CTR"].to_numpy(dtype=float)
+        self.select_period = np.zeros(shape, dtype=np.int8)
+        self.select_period[position] = [
+            PERIOD_CODES.get(period, 0) for period in tbl["PERIOD"]
+        ]
+        self.select_duration_year = np.zeros(shape, dtype=np.intp)
+        self.select_duration_year[position] = tbl["DURATION_YEAR"].to_numpy(dtype=np.intp)
+
+        # modifiers by duration year
+        years = int(
+            max(
+                tbl["DURATION_YEAR"].max() if tbl.shape[0] else 0,
+                margin_select["DURATION_YEAR"].max(),
+            )
+        )
+        self.years = years + 2
+
+        def _modifier(frame, keys, value):
+            indexes = [make_index(frame[key]) for key in keys]
+            shape = tuple(len(index) + 1 for index in indexes) + (self.years,)
+            arr = np.full(shape, np.nan)
+            position = tuple(
+                lookup_index(index, frame[key]) for index, key in zip(indexes, keys)
+            ) + (
+                clip_index(frame["DURATION_YEAR"].to_numpy(dtype=np.intp), self.years),
+            )
+            arr[position] = frame[value].to_numpy(dtype=float)
+            return indexes, arr
+
+        (
+            (self.benefit_period_index, self.cola_flag_index),
+            self.benefit_period_modifier,
+        ) = _modifier(
+            benefit_period_modifier,
+            ["IDI_BENEFIT_PERIOD", "COLA_FLAG"],
+            "BENEFIT_PERIOD_MODIFIER",
+        )
+        (self.contract_index,), self.contract_modifier = _modifier(
+            contract_modifier, ["IDI_CONTRACT"], "CONTRACT_MODIFIER"
+        )
+        (self.diagnosis_index,), self.diagnosis_modifier = _modifier(
+            diagnosis_modifier, ["IDI_DIAGNOSIS_GRP"], "DIAGNOSIS_MODIFIER"
+        )
+        cause = pd.concat(
+            [
+                cause_modifier.assign(
+                    MODEL_MODE=mode,
+                    CAUSE_MODIFIER=cause_modifier[f"CAUSE_MODIFIER_{mode}"],
+                )
+                for mode in MODEL_MODES
+            ]
+        )
+        (
+            (self.cause_contract_index, self.cause_gender_index, self.model_mode_index),
+            self.cause_modifier,
+        ) = _modifier(cause, ["IDI_CONTRACT", "GENDER", "MODEL_MODE"], "CAUSE_MODIFIER")
+        self.margin_select = np.full(self.years, np.nan)
+        self.margin_select[
+            clip_index(margin_select["DURATION_YEAR"].to_numpy(dtype=np.intp), self.years)
+        ] = margin_select["MARGIN_SELECT"].to_numpy(dtype=float)
+
+        # ultimate by occupation class / gender / age attained
+        ages = base_ultimate["AGE_ATTAINED"].to_numpy(dtype=np.intp)
+        self.ultimate_ages = int(ages.max()) + 2
+        self.base_ultimate = np.full(
+            (
+                len(self.occupation_index) + 1,
+                len(self.gender_index) + 1,
+                self.ultimate_ages,
+            ),
+            np.nan,
+        )
+        self.base_ultimate[
+            lookup_index(self.occupation_index, base_ultimate["IDI_OCCUPATION_CLASS"]),
+            lookup_index(self.gender_index, base_ultimate["GENDER"]),
+            ages,
+        ] = base_ultimate["BASE_ULTIMATE_CTR"].to_numpy(dtype=float)
+        self.margin_ultimate = 1 - margin_ultimate
+
+    #####################################################################################
+    # Select
+    #####################################################################################
+
+    def select(
+        self,
+        idi_benefit_period,
+        idi_contract,
+        idi_diagnosis_grp,
+        idi_occupation_class,
+        gender,
+        elimination_period,
+        age_incurred,
+        cola_percent,
+        model_mode,
+        modifier_ctr,
+        duration_month,
+    ):
+        """Get the select rate components for claims.
+
+        Each rating argument is a scalar or an array (one value per claim) and
+        duration_month is an array of shape (claims, months). Returns a dict of arrays
+        of shape (claims, months) with the same columns as get_ctr_select. The key
+        AVAILABLE flags months on the select table.
+        """
+        n = np.atleast_2d(duration_month).shape[0]
+
+        def _column(values, index):
+            positions = lookup_index(index, values)
+            return np.broadcast_to(positions, (n,))[:, None]
+
+        def _modes(values):
+            values = np.broadcast_to(np.asarray(values, dtype=object), (n,))
+            ret = np.empty(n, dtype=object)
+            for i, value in enumerate(values):
+                if value[:3] not in MODEL_MODES:
+                    raise ValueError(f"The model_mode [{value}] is not recognized.")
+                ret[i] = value[:3]
+            return ret
+
+        cola_flag = np.where(np.asarray(cola_percent) == 0, "N", "Y")
+        months = np.atleast_2d(np.asarray(duration_month, dtype=np.intp))
+        months = np.where(
+            (months >= 1) & (months <= self.select_months), months - 1, self.select_months
+        )
+        position = (
+            _column(idi_occupation_class, self.occupation_index),
+            _column(gender, self.gender_index),
+            _column(elimination_period, self.elimination_period_index),
+            _column(age_incurred, self.age_incurred_index),
+            months,
+        )
+        period = self.select_period[position]
+        available = period > 0
+        duration_year = self.select_duration_year[position]
+
+        base = self.base_select[position]
+        benefit_period = self.benefit_period_modifier[
+            _column(idi_benefit_period, self.benefit_period_index),
+            _column(cola_flag, self.cola_flag_index),
+            duration_year,
+        ]
+        contract = self.contract_modifier[
+            _column(idi_contract, self.contract_index), duration_year
+        ]
+        diagnosis = self.diagnosis_modifier[
+            _column(idi_diagnosis_grp, self.diagnosis_index), duration_year
+        ]
+        cause = self.cause_modifier[
+            _column(idi_contract, self.cause_contract_index),
+            _column(gender, self.cause_gender_index),
+            _column(_modes(model_mode), self.model_mode_index),
+            duration_year,
+        ]
+        margin = self.margin_select[duration_year]
+        modifier = np.broadcast_to(np.asarray(modifier_ctr, dtype=float), (n,))[:, None]
+        select = base * benefit_period * contract * cause * diagnosis * margin * modifier
+        return {
+            "DURATION_YEAR": duration_year,
+            "PERIOD": period,
+            "BASE_SELECT_CTR": base,
+            "BENEFIT_PERIOD_MODIFIER": benefit_period,
+            "CONTRACT_MODIFIER": contract,
+            "DIAGNOSIS_MODIFIER": diagnosis,
+            "CAUSE_MODIFIER": cause,
+            "MARGIN_SELECT": margin,
+            "SELECT_CTR": select,
+            "AVAILABLE": available,
+        }
+
+    #####################################################################################
+    # Ultimate
+    #####################################################################################
+
+    def ultimate(self, idi_occupation_class, gender, modifier_ctr, age_attained):
+        """Get the ultimate rate components for claims.
+
+        The rating arguments are scalars or arrays (one value per claim) and
+        age_attained is an array of shape (claims, months). Returns a dict of arrays of
+        shape (claims, months) with the same columns as get_ctr_ultimate.
+        """
+        ages = np.atleast_2d(np.asarray(age_attained, dtype=np.intp))
+        n = ages.shape[0]
+        occupation = np.broadcast_to(
+            lookup_index(self.occupation_index, idi_occupation_class), (n,)
+        )[:, None]
+        gender = np.broadcast_to(lookup_index(self.gender_index, gender), (n,))[:, None]
+        ages = np.where(ages >= 0, np.minimum(ages, self.ultimate_ages - 1), -1)
+        base = self.base_ultimate[occupation, gender, ages]
+        margin = np.where(np.isnan(base), np.nan, self.margin_ultimate)
+        modifier = np.broadcast_to(np.asarray(modifier_ctr, dtype=float), (n,))[:, None]
+        return {
+            "BASE_ULTIMATE_CTR": base,
+            "MARGIN_ULTIMATE": margin,
+            "ULTIMATE_CTR": base * margin * modifier,
+        }
+
+    #####################################################################################
+    # Monthly CTR
+    #####################################################################################
+
+    def monthly_ctr(
+        self,
+        idi_benefit_period,
+        idi_contract,
+        idi_diagnosis_grp,
+        idi_occupation_class,
+        gender,
+        elimination_period,
+        age_incurred,
+        cola_percent,
+        model_mode,
+        modifier_ctr,
+        duration_month,
+        age_attained,
+        use_ultimate,
+    ):
+        """Get the final monthly CTR for claims.
+
+        The select rate (converted to monthly when the table period is a year) is used
+        when the duration month is on the select table. Otherwise the ultimate rate
+        (converted to monthly) is used for claims where use_ultimate is True (i.e., the
+        claim runs past the select period) and NaN for the others.
+        """
+        select = self.select(
+            idi_benefit_period=idi_benefit_period,
+            idi_contract=idi_contract,
+            idi_diagnosis_grp=idi_diagnosis_grp,
+            idi_occupation_class=idi_occupation_class,
+            gender=gender,
+            elimination_period=elimination_period,
+            age_incurred=age_incurred,
+            cola_percent=cola_percent,
+            model_mode=model_mode,
+            modifier_ctr=modifier_ctr,
+            duration_month=duration_month,
+        )
+        ultimate = self.ultimate(
+            idi_occupation_class=idi_occupation_class,
+            gender=gender,
+            modifier_ctr=modifier_ctr,
+            age_attained=age_attained,
+        )
+        use_ultimate = np.broadcast_to(
+            np.asarray(use_ultimate, dtype=bool), (select["PERIOD"].shape[0],)
+        )[:, None]
+        return np.select(
+            [
+                select["PERIOD"] == PERIOD_CODES["M"],
+                select["PERIOD"] == PERIOD_CODES["Y"],
+                use_ultimate,
+            ],
+            [
+                select["SELECT_CTR"],
+                _to_monthly(select["SELECT_CTR"]),
+                _to_monthly(ultimate["ULTIMATE_CTR"]),
+            ],
+            default=np.nan,
+        )
@@ -0,0 +1,431 @@
+import os
+import platform
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from .metadata import get_git_revision, get_model_version
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+#########################################################################################
+# Benchmark
+#
+# Times the extract models on synthetic portfolios of a given number of records (rows of
+# the base extract). The attributes of each policy (or claim) are drawn from the volume
+# table (docs/volume-tbl.csv) weighted by WT. The coverage mix, rider attributes and the
+# remaining columns (e.g., BENEFIT_AMOUNT) are drawn from the sample extracts. The dates
+# are generated relative to the valuation date so every record is inforce.
+#
+# Each benchmark case is run in a new process so the peak RSS is that of the case.
+#########################################################################################
+
+BENCHMARK_MODELS = {
+    "active-lives": {
+        "model": "ActiveLivesValEMD",
+        "sample": "active-lives-sample",
+        "keys": ["POLICY_ID", "COVERAGE_ID"],
+        "parameters": {"net_benefit_method": "NLP"},
+        "attributes": [
+            "GENDER",
+            "TOBACCO_USAGE",
+            "IDI_OCCUPATION_CLASS",
+            "IDI_CONTRACT",
+            "IDI_BENEFIT_PERIOD",
+            "IDI_MARKET",
+            "COLA_PERCENT",
+            "ELIMINATION_PERIOD",
+        ],
+    },
+    "disabled-lives": {
+        "model": "DisabledLivesValEMD",
+        "sample": "disabled-lives-sample",
+        "keys": ["POLICY_ID", "CLAIM_ID", "COVERAGE_ID"],
+        "parameters": {},
+        "attributes": [
+            "GENDER",
+            "TOBACCO_USAGE",
+            "IDI_OCCUPATION_CLASS",
+            "IDI_CONTRACT",
+            "IDI_BENEFIT_PERIOD",
+            "IDI_MARKET",
+            "IDI_DIAGNOSIS_GRP",
+            "COLA_PERCENT",
+            "ELIMINATION_PERIOD",
+        ],
+    },
+}
+
+BENCHMARK_SIZES = (1_000, 10_000, 100_000)
+
+DT_COLS = [
+    "BIRTH_DT",
+    "POLICY_START_DT",
+    "PREMIUM_PAY_TO_DT",
+    "POLICY_END_DT",
+    "INCURRED_DT",
+    "TERMINATION_DT",
+]
+
+
+def _benefit_months(benefit_period):
+    if benefit_period.endswith("M"):
+        return int(benefit_period[:-1])
+    return None
+
+
+def _end_age(benefit_period):
+    if benefit_period.startswith("TO"):
+        return int(benefit_period[2:])
+    return 65
+
+
+def _active_dates(attributes, valuation_dt, rng):
+    n = len(attributes)
+    age = rng.uniform(30, 60, n)
+    duration = rng.uniform(0, np.minimum(20, age - 25))
+    birth_dt = valuation_dt - pd.to_timedelta(np.round(age * 365.25), unit="D")
+    policy_start_dt = valuation_dt - pd.to_timedelta(
+        np.round(duration * 365.25), unit="D"
+    )
+    policy_end_dt = pd.DatetimeIndex(
+        [
+            dt + pd.DateOffset(years=_end_age(bp), days=-1)
+            for dt, bp in zip(birth_dt, attributes["IDI_BENEFIT_PERIOD"])
+        ]
+    )
+    return pd.DataFrame(
+        {
+            "BIRTH_DT": birth_dt,
+            "POLICY_START_DT": policy_start_dt,
+            "PREMIUM_PAY_TO_DT": policy_end_dt,
+            "POLICY_END_DT": policy_end_dt,
+        }
+    )
+
+
+def _termination_dt(birth_dt, incurred_dt, elimination_period, benefit_period):
+    months = _benefit_months(benefit_period)
+    if months is not None:
+        return incurred_dt + pd.DateOffset(days=int(elimination_period), months=months)
+    years = 120 if benefit_period == "LIFE" else _end_age(benefit_period)
+    return birth_dt + pd.DateOffset(years=years, days=-1)
+
+
+def _disabled_dates(attributes, valuation_dt, rng):
+    n = len(attributes)
+    age = rng.uniform(30, 62, n)
+    birth_dt = valuation_dt - pd.to_timedelta(np.round(age * 365.25), unit="D")
+    # the months since incurred are within the benefit period (at most 10 years)
+    max_months = np.array(
+        [_benefit_months(bp) or 120 for bp in attributes["IDI_BENEFIT_PERIOD"]]
+    )
+    months = rng.uniform(0, np.minimum(max_months, (age - 25) * 12))
+    incurred_dt = valuation_dt - pd.to_timedelta(np.round(months * 30.4375), unit="D")
+    termination_dt = pd.DatetimeIndex(
+        [
+            _termination_dt(*args)
+            for args in zip(
+                birth_dt,
+                incurred_dt,
+                attributes["ELIMINATION_PERIOD"],
+                attributes["IDI_BENEFIT_PERIOD"],
+            )
+        ]
+    )
+    return pd.DataFrame(
+        {
+            "BIRTH_DT": birth_dt,
+            "INCURRED_DT": incurred_dt,
+            "TERMINATION_DT": termination_dt,
+        }
+    )
+
+
+def make_portfolio(
+    model: str,
+    n_records: int,
+    volume_tbl: pd.DataFrame,
+    sample_base: pd.DataFrame,
+    sample_riders: pd.DataFrame,
+    valuation_dt: pd.Timestamp,
+    seed: int = 0,
+):
+    """Generate a synthetic base and rider extract.
+
+    Parameters
+    ----------
+    model : str
+        The benchmark model (see BENCHMARK_MODELS).
+    n_records : int
+        The number of records (rows of the base extract).
+    volume_tbl : pd.DataFrame
+        The attribute mix of the policies (or claims) with weights WT.
+    sample_base : pd.DataFrame
+        The sample base extract (the coverage mix and the remaining columns).
+    sample_riders : pd.DataFrame
+        The sample rider extract (the rider attributes by coverage).
+    valuation_dt : pd.Timestamp
+        The valuation date the records are inforce at.
+    seed : int, optional
+        The seed of the random generator, by default 0.
+
+    Returns
+    -------
+    tuple
+        The base extract and the rider extract.
+    """
+    info = BENCHMARK_MODELS[model]
+    keys, attributes = info["keys"], info["attributes"]
+    rng = np.random.default_rng(seed)
+    valuation_dt = pd.Timestamp(valuation_dt)
+
+    # the share of policies (or claims) with each rider
+    base = sample_base[sample_base["COVERAGE_ID"] == "BASE"]
+    counts = sample_base["COVERAGE_ID"].value_counts()
+    rider_rates = {cov: counts[cov] / len(base) for cov in counts.index if cov != "BASE"}
+    # every policy has a BASE record so n_records policies are enough
+    n_policies = n_records
+
+    weights = volume_tbl["WT"].to_numpy(dtype=float)
+    drawn = volume_tbl.iloc[
+        rng.choice(len(volume_tbl), size=n_policies, p=weights / weights.sum())
+    ][attributes].reset_index(drop=True)
+    templates = base.iloc[rng.integers(0, len(base), n_policies)].reset_index(drop=True)
+    policies = templates.drop(columns=attributes + DT_COLS, errors="ignore")
+    policies[attributes] = drawn
+    policy_ids = [f"P{i + 1}" for i in range(n_policies)]
+    policies["POLICY_ID"] = policy_ids
+    if "CLAIM_ID" in keys:
+        policies["CLAIM_ID"] = [f"{policy_id}C1" for policy_id in policy_ids]
+        dates = _disabled_dates(policies, valuation_dt, rng)
+    else:
+        dates = _active_dates(policies, valuation_dt, rng)
+    policies[list(dates.columns)] = dates
+    policies["_ORDER"] = np.arange(n_policies)
+
+    frames = [policies.assign(COVERAGE_ID="BASE")]
+    for coverage, rate in rider_rates.items():
+        frames.append(
+            policies[rng.random(n_policies) < rate].assign(COVERAGE_ID=coverage)
+        )
+    coverages = list(counts.index)
+    extract_base = (
+        pd.concat(frames)
+        .assign(_COVERAGE=lambda df: df["COVERAGE_ID"].map(coverages.index))
+        .sort_values(["_ORDER", "_COVERAGE"], kind="stable")
+        .head(n_records)
+        .reset_index(drop=True)[list(sample_base.columns)]
+    )
+
+    # each rider is given the attributes of a sample rider with the same coverage
+    riders = []
+    sample_keys = sample_riders.groupby(keys)
+    sample_sets = {}
+    for key, frame in sample_keys:
+        sample_sets.setdefault(key[-1], []).append(frame)
+    for coverage, sets in sample_sets.items():
+        records = extract_base.loc[extract_base["COVERAGE_ID"] == coverage, keys]
+        if len(records) == 0:
+            continue
+        picks = rng.integers(0, len(sets), len(records))
+        for pick, frame in enumerate(sets):
+            matched = records[picks == pick]
+            values = frame.drop(columns=keys).reset_index(drop=True)
+            riders.append(
+                matched.loc[matched.index.repeat(len(values))].assign(
+                    RIDER_ATTRIBUTE=np.tile(values["RIDER_ATTRIBUTE"], len(matched)),
+                    VALUE=np.tile(values["VALUE"], len(matched)),
+                )
+            )
+    if len(riders) > 0:
+        extract_riders = pd.concat(riders).sort_index(kind="stable")
+    else:
+        extract_riders = sample_riders.iloc[:0]
+    extract_riders = extract_riders.reset_index(drop=True)[list(sample_riders.columns)]
+    return extract_base, extract_riders
+
+
+def read_samples(model: str, samples: str):
+    """Read the sample base and rider extracts of a benchmark model from a directory."""
+    sample = BENCHMARK_MODELS[model]["sample"]
+    sample_base = pd.read_csv(os.path.join(samples, f"{sample}-base.csv"))
+    sample_riders = pd.read_csv(os.path.join(samples, f"{sample}-riders.csv"))
+    return sample_base, sample_riders
+
+
+def _peak_rss_mb(who):
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes on linux and bytes on macos
+    scale = 2**20 if platform.system() == "Darwin" else 2**10
+    return round(peak / scale, 1)
+
+
+def _time_model(model, extract_base, extract_riders, parameters):
+    start = time.perf_counter()
+    _, _, errors = model(
+        extract_base=extract_base, extract_riders=extract_riders, **parameters
+    ).run()
+    seconds = time.perf_counter() - start
+    return seconds, errors
+
+
+def _rate(records, seconds):
+    return round(records / seconds, 2) if seconds > 0 else None
+
+
+def run_case(
+    model: str,
+    n_records: int,
+    volume_tbl: str,
+    samples: str,
+    *,
+    seed: int = 0,
+    by_coverage: bool = True,
+    **parameters,
+):
+    """Time an extract model on a synthetic portfolio of n_records (in this process).
+
+    Parameters
+    ----------
+    model : str
+        The benchmark model (see BENCHMARK_MODELS).
+    n_records : int
+        The number of records.
+    volume_tbl : str
+        The path to the volume table.
+    samples : str
+        The directory of the sample extracts.
+    seed : int, optional
+        The seed used to generate the portfolio, by default 0.
+    by_coverage : bool, optional
+        Also time the records of each coverage on their own, by default True.
+    parameters
+        The parameters passed to the extract model (e.g., valuation_dt and executor)
+        updating the default parameters of the benchmark model.
+
+    Returns
+    -------
+    dict
+        The records, seconds, records per second, errors and peak RSS (MB) of the run
+        with a breakdown by coverage. The seconds to run the sample extracts (i.e.,
+        loading the assumptions) are reported as warmup_seconds.
+    """
+    from . import models
+    from .models.executors import error_record_key
+
+    extract_model = getattr(models, BENCHMARK_MODELS[model]["model"])
+    parameters = {**BENCHMARK_MODELS[model]["parameters"], **parameters}
+    sample_base, sample_riders = read_samples(model, samples)
+    extract_base, extract_riders = make_portfolio(
+        model,
+        n_records,
+        pd.read_csv(volume_tbl),
+        sample_base,
+        sample_riders,
+        parameters["valuation_dt"],
+        seed=seed,
+    )
+    dt_cols = [col for col in DT_COLS if col in sample_base.columns]
+    # the sample extracts are run first so loading the assumptions is not timed
+    sample_base = sample_base.astype({col: "datetime64[ns]" for col in dt_cols})
+    warmup, _ = _time_model(extract_model, sample_base, sample_riders, parameters)
+    seconds, errors = _time_model(extract_model, extract_base, extract_riders, parameters)
+    result = {
+        "model": model,
+        "records": len(extract_base),
+        "warmup_seconds": round(warmup, 4),
+        "seconds": round(seconds, 4),
+        "records_per_second": _rate(len(extract_base), seconds),
+        "errors": len(errors),
+        "coverages": {},
+    }
+    error_coverages = Counter(error_record_key(error)["coverage_id"] for error in errors)
+    for coverage, frame in extract_base.groupby("COVERAGE_ID", sort=False):
+        breakdown = {"records": len(frame), "errors": error_coverages[coverage]}
+        if by_coverage:
+            keys = frame[BENCHMARK_MODELS[model]["keys"]]
+            riders = extract_riders.merge(keys, on=list(keys.columns))
+            seconds, _ = _time_model(extract_model, frame, riders, parameters)
+            breakdown["seconds"] = round(seconds, 4)
+            breakdown["records_per_second"] = _rate(len(frame), seconds)
+        result["coverages"][coverage] = breakdown
+    result["peak_rss_mb"] = _peak_rss_mb(getattr(resource, "RUSAGE_SELF", None))
+    result["peak_rss_workers_mb"] = _peak_rss_mb(
+        getattr(resource, "RUSAGE_CHILDREN", None)
+    )
+    return result
+
+
+def run_benchmarks(
+    volume_tbl: str,
+    samples: str,
+    *,
+    models: list = tuple(BENCHMARK_MODELS),
+    sizes: list = BENCHMARK_SIZES,
+    seed: int = 0,
+    by_coverage: bool = True,
+    **parameters,
+):
+    """Run the benchmark cases (each model and size) each in a new process.
+
+    Parameters
+    ----------
+    volume_tbl : str
+        The path to the volume table (docs/volume-tbl.csv).
+    samples : str
+        The directory of the sample extracts (docs/models/extract_models).
+    models : list, optional
+        The benchmark models, by default all of BENCHMARK_MODELS.
+    sizes : list, optional
+        The number of records of each case, by default BENCHMARK_SIZES.
+    seed : int, optional
+        The seed used to generate the portfolios, by default 0.
+    by_coverage : bool, optional
+        Also time the records of each coverage on their own, by default True.
+    parameters
+        The parameters passed to the extract models (e.g., valuation_dt and executor).
+
+    Returns
+    -------
+    dict
+        The environment and parameters of the run and a result for each case (see
+        run_case) which can be dumped as JSON.
+    """
+    results = []
+    for model in models:
+        for size in sizes:
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                future = pool.submit(
+                    run_case,
+                    model,
+                    size,
+                    volume_tbl,
+                    samples,
+                    seed=seed,
+                    by_coverage=by_coverage,
+                    **parameters,
+                )
+                results.append(future.result())
+    return {
+        "model_version": get_model_version(),
+        "last_commit": get_git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "parameters": {
+            k: v if isinstance(v, (str, int, float, type(None))) else str(v)
+            for k, v in parameters.items()
+        },
+        "results": results,
+    }
@@ -0,0 +1,43 @@
+import importlib
+
+#########################################################################################
+# Lazy Imports
+#
+# The packages import their objects on first access (PEP 562) so importing a package
+# (e.g., in a worker process) only imports the modules that are used.
+#########################################################################################
+
+
+def lazy_imports(package: str, imports: dict):
+    """Create the module level __getattr__ and __dir__ of a package which imports
+    objects from its modules on first access.
+
+    Parameters
+    ----------
+    package : str
+        The name of the package (i.e., __name__).
+    imports : dict
+        The relative module of each object (e.g., {"ActiveLivesValEMD":
+        ".extract_models.active_lives"}). When the name of the object is the module
+        itself (e.g., {"models": ".models"}), the module is returned.
+
+    Returns
+    -------
+    tuple
+        The __getattr__ and __dir__ functions of the package.
+    """
+
+    def __getattr__(name):
+        if name not in imports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module = importlib.import_module(imports[name], package)
+        if imports[name] == f".{name}":
+            return module
+        value = getattr(module, name)
+        setattr(importlib.import_module(package), name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(importlib.import_module(package))) | set(imports))
+
+    return __getattr__, __dir__
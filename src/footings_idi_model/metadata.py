@@ -0,0 +1,40 @@
+import os
+from functools import lru_cache
+
+try:
+    import importlib.metadata as importlib_metadata
+except ModuleNotFoundError:
+    import importlib_metadata
+
+#########################################################################################
+# Metadata
+#
+# The model version and last git commit are recorded on every output row. Both are
+# resolved on first use (not on import) and a deployment without the package metadata
+# or a .git directory gets UNKNOWN instead of failing to import.
+#########################################################################################
+
+UNKNOWN = "unknown"
+
+directory, filename = os.path.split(__file__)
+
+
+@lru_cache(maxsize=1)
+def get_model_version():
+    """Get the installed version of footings_idi_model."""
+    try:
+        return importlib_metadata.version("footings_idi_model")
+    except importlib_metadata.PackageNotFoundError:
+        return UNKNOWN
+
+
+@lru_cache(maxsize=1)
+def get_git_revision():
+    """Get the last git commit of the repository holding footings_idi_model."""
+    try:
+        import git
+
+        repo = git.Repo(directory, search_parent_directories=True)
+        return repo.head.object.hexsha
+    except Exception:
+        return UNKNOWN
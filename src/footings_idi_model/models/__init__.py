@@ -1,18 +1,38 @@
-# extract models
-from .extract_models.active_lives import ActiveLivesValEMD
-from .extract_models.disabled_lives import DisabledLivesProjEMD, DisabledLivesValEMD
+from ..lazy import lazy_imports
 
-# policy models
-from .policy_models.active_deterministic_base import AProjBasePMD, AValBasePMD
-from .policy_models.active_deterministic_cat import AProjCatRPMD, AValCatRPMD
-from .policy_models.active_deterministic_cola import AProjColaRPMD, AValColaRPMD
-from .policy_models.active_deterministic_res import AProjResRPMD, AValResRPMD
-from .policy_models.active_deterministic_rop import AProjRopRPMD, AValRopRPMD
-from .policy_models.active_deterministic_sis import AProjSisRPMD, AValSisRPMD
-from .policy_models.disabled_deterministic_base import DProjBasePMD, DValBasePMD
-from .policy_models.disabled_deterministic_cat import DProjCatRPMD, DValCatRPMD
-from .policy_models.disabled_deterministic_cola import DProjColaRPMD, DValColaRPMD
-from .policy_models.disabled_deterministic_res import DProjResRPMD, DValResRPMD
-from .policy_models.disabled_deterministic_sis import DProjSisRPMD, DValSisRPMD
-
-# from .disabled_stochastic import DLRStochasticPolicyModel
+# the models are imported from their module on first access
+__getattr__, __dir__ = lazy_imports(
+    __name__,
+    {
+        # extract models
+        "ActiveLivesValEMD": ".extract_models.active_lives",
+        "DisabledLivesProjEMD": ".extract_models.disabled_lives",
+        "DisabledLivesValEMD": ".extract_models.disabled_lives",
+        "read_extract": ".extract_models.streaming",
+        "run_extract_stream": ".extract_models.streaming",
+        # policy models
+        "AProjBasePMD": ".policy_models.active_deterministic_base",
+        "AValBasePMD": ".policy_models.active_deterministic_base",
+        "AProjCatRPMD": ".policy_models.active_deterministic_cat",
+        "AValCatRPMD": ".policy_models.active_deterministic_cat",
+        "AProjColaRPMD": ".policy_models.active_deterministic_cola",
+        "AValColaRPMD": ".policy_models.active_deterministic_cola",
+        "AProjResRPMD": ".policy_models.active_deterministic_res",
+        "AValResRPMD": ".policy_models.active_deterministic_res",
+        "AProjRopRPMD": ".policy_models.active_deterministic_rop",
+        "AValRopRPMD": ".policy_models.active_deterministic_rop",
+        "AProjSisRPMD": ".policy_models.active_deterministic_sis",
+        "AValSisRPMD": ".policy_models.active_deterministic_sis",
+        "DProjBasePMD": ".policy_models.disabled_deterministic_base",
+        "DValBasePMD": ".policy_models.disabled_deterministic_base",
+        "DProjCatRPMD": ".policy_models.disabled_deterministic_cat",
+        "DValCatRPMD": ".policy_models.disabled_deterministic_cat",
+        "DProjColaRPMD": ".policy_models.disabled_deterministic_cola",
+        "DValColaRPMD": ".policy_models.disabled_deterministic_cola",
+        "DProjResRPMD": ".policy_models.disabled_deterministic_res",
+        "DValResRPMD": ".policy_models.disabled_deterministic_res",
+        "DProjSisRPMD": ".policy_models.disabled_deterministic_sis",
+        "DValSisRPMD": ".policy_models.disabled_deterministic_sis",
+        # "DLRStochasticPolicyModel": ".disabled_stochastic",
+    },
+)
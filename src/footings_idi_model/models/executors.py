@@ -0,0 +1,567 @@
+import ast
+import heapq
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+
+import numpy as np
+import pandas as pd
+from attr import evolve
+from footings.exceptions import Error
+from footings.jigs import ForeachJig, MappedModel, WrappedModel
+
+from ..assumptions.stat_gaap.metrics import METRICS, run_metered
+from .records import RecordBatch
+from .sensitivities import run_scenarios, scenario_error_key
+from .timings import StepTimings, TimedModel
+
+#########################################################################################
+# Executors
+#
+# The extract models split the records into chunks and hand each chunk to an executor.
+# Each chunk is valued by a chunk runner (e.g., run_foreach or run_dlr_batch) which
+# returns a tuple of the projected frame and a list of errors. The executor returns the
+# chunk results in chunk order so the concatenated projected frame is in record order.
+#
+# When the step timings are requested (see run_chunked), the chunk runner is called with
+# time_steps=True and returns the StepTimings of the chunk as a third item. When the
+# assumption metrics are enabled, the metrics recorded by worker processes are added to
+# the metrics of the calling process (see run_metered). When a list of sensitivity
+# scenarios is passed, the chunk runner values every record under each scenario and the
+# projected frame holds a SCENARIO column (see run_scenarios).
+#########################################################################################
+
+# the target number of chunks per worker when chunk_size is not set
+CHUNKS_PER_WORKER = 4
+
+ITERATOR_KEYS = ("policy_id", "coverage_id")
+
+EXECUTORS = {}
+
+
+def register_executor(name, executor=None):
+    """Register an executor to be available to the extract models.
+
+    An executor is a callable with the signature ``executor(run_chunk, chunks, kwargs,
+    n_workers)`` that calls ``run_chunk(chunk, **kwargs)`` for each chunk and returns the
+    results as a list in chunk order.
+
+    Can be used as a decorator (i.e., ``@register_executor("name")``).
+    """
+    if executor is None:
+        return partial(register_executor, name)
+    EXECUTORS[name] = executor
+    return executor
+
+
+def validate_executor(instance, attribute, value):
+    """Validator for the executor parameter of the extract models."""
+    if value not in EXECUTORS:
+        msg = f"The executor [{value}] is not known. Options are {list(EXECUTORS)}."
+        raise ValueError(msg)
+
+
+@register_executor("serial")
+def serial_executor(run_chunk, chunks, kwargs, n_workers):
+    """Run each chunk in the current process."""
+    return [run_chunk(chunk, **kwargs) for chunk in chunks]
+
+
+@register_executor("dask")
+def dask_executor(run_chunk, chunks, kwargs, n_workers):
+    """Run each chunk as a dask delayed task using the configured dask scheduler."""
+    from dask import compute, delayed
+
+    tasks = [delayed(run_chunk)(chunk, **kwargs) for chunk in chunks]
+    return list(compute(*tasks))
+
+
+@register_executor("process")
+def process_executor(run_chunk, chunks, kwargs, n_workers):
+    """Run the chunks on a pool of worker processes (concurrent.futures)."""
+    if len(chunks) <= 1:
+        return serial_executor(run_chunk, chunks, kwargs, n_workers)
+    with ProcessPoolExecutor(max_workers=min(n_workers, len(chunks))) as pool:
+        futures = [pool.submit(run_chunk, chunk, **kwargs) for chunk in chunks]
+        return [future.result() for future in futures]
+
+
+#########################################################################################
+# Chunk runners
+#########################################################################################
+
+
+@lru_cache(maxsize=None)
+def _create_foreach_jig(models: tuple, constant_params: tuple):
+    model = MappedModel.create(
+        dict(models),
+        model_wrapper=WrappedModel,
+        iterator_keys=ITERATOR_KEYS,
+        mapped_keys=("coverage_id",),
+        pass_iterator_keys=("policy_id",),
+    )
+    return ForeachJig.create(
+        model=model,
+        iterator_name="records",
+        constant_params=constant_params,
+        success_wrap=pd.concat,
+    )
+
+
+def run_foreach_scenarios(records, *, models: dict, scenarios: list, timings, **kwargs):
+    """Run each record through its respective policy model for each scenario (see
+    run_scenarios).
+
+    The projected rows of a record are in scenario order with a SCENARIO column (the
+    position of the scenario) and the errors are keyed by the record and the scenario
+    (see scenario_error_key).
+    """
+    frames, errors = [], []
+    for record in records:
+        key = ({k: record.get(k) for k in ITERATOR_KEYS},)
+        params = {k: v for k, v in record.items() if k != "coverage_id"}
+        try:
+            model = models[record["coverage_id"]](**params, **kwargs)
+        except:
+            for scenario in range(len(scenarios)):
+                errors.append(
+                    Error.create(
+                        key=scenario_error_key(key, scenario), sys_info=sys.exc_info()
+                    )
+                )
+            continue
+        results = run_scenarios(model, scenarios, error_key=key, timings=timings)
+        for scenario, result in enumerate(results):
+            if isinstance(result, Error):
+                errors.append(result)
+            else:
+                frames.append(result.assign(SCENARIO=scenario))
+    projected = pd.concat(frames) if len(frames) > 0 else []
+    return projected, errors
+
+
+def run_foreach(
+    records,
+    *,
+    models: dict,
+    time_steps: bool = False,
+    scenarios: list = None,
+    **kwargs,
+):
+    """Run each record through its respective policy model based on COVERAGE_ID.
+
+    The same as the foreach jig used by the extract models but run in the current
+    process (i.e., for use within an executor). When scenarios is passed, each record is
+    valued under every scenario (see run_foreach_scenarios).
+
+    Returns
+    -------
+    tuple
+        The projected frame (or an empty list when no record ran without error) and a
+        list of any errors captured. When time_steps is True, the StepTimings of the
+        policy models is returned as a third item.
+    """
+    if scenarios is not None:
+        timings = StepTimings() if time_steps else None
+        projected, errors = run_foreach_scenarios(
+            records, models=models, scenarios=scenarios, timings=timings, **kwargs
+        )
+        return (projected, errors, timings) if time_steps else (projected, errors)
+    if not time_steps:
+        jig = _create_foreach_jig(tuple(models.items()), tuple(kwargs))
+        return jig(records=records, **kwargs)
+    timings = StepTimings()
+    models = {k: TimedModel(v, timings) for k, v in models.items()}
+    # not cached as the timed models are new for each chunk
+    jig = _create_foreach_jig.__wrapped__(tuple(models.items()), tuple(kwargs))
+    projected, errors = jig(records=records, **kwargs)
+    return projected, errors, timings
+
+
+#########################################################################################
+# Map-side aggregation
+#
+# Instead of returning every projected row, each chunk is summed by the grouping keys
+# within the worker and the driver only combines the partial sums. The time 0 row of
+# each record is summed separately and flagged with TIME_0 (for each scenario when the
+# projected frame has a SCENARIO column).
+#########################################################################################
+
+
+def aggregate(frame, by, measures):
+    """Sum the measures of frame by the grouping keys."""
+    return frame.groupby(list(by), as_index=False, dropna=False)[list(measures)].sum()
+
+
+def _add_record_columns(projected, records, record_keys, columns):
+    """Add record attributes (e.g., IDI_CONTRACT) which are not on the projected frame."""
+    columns = list(record_keys) + columns
+    if isinstance(records, RecordBatch):
+        attributes = records.to_frame([col.lower() for col in columns])
+        attributes.columns = columns
+    else:
+        attributes = pd.DataFrame(
+            [{col: record.get(col.lower()) for col in columns} for record in records]
+        )
+    attributes = attributes.drop_duplicates(list(record_keys))
+    return projected.merge(attributes, on=list(record_keys), how="left")
+
+
+def run_aggregated(records, *, run_chunk, by, measures, record_keys, **kwargs):
+    """Run a chunk of records with run_chunk and sum the projected rows by the grouping
+    keys (picklable as a partial for the process executor).
+
+    The grouping keys can be projected columns or record attributes. The time 0 row of
+    each record (the first projected row) is summed separately and flagged with a TIME_0
+    column.
+    """
+    projected, errors, *timings = run_chunk(records, **kwargs)
+    if not isinstance(projected, pd.DataFrame) or len(projected) == 0:
+        return ([], errors, *timings)
+    missing = [col for col in by if col not in projected.columns]
+    if len(missing) > 0:
+        projected = _add_record_columns(projected, records, record_keys, missing)
+    keys = list(record_keys)
+    if "SCENARIO" in projected.columns:
+        keys.append("SCENARIO")
+    time_0 = projected.groupby(keys, sort=False).head(1)
+    frame = pd.concat(
+        [
+            aggregate(projected, by, measures).assign(TIME_0=False),
+            aggregate(time_0, by, measures).assign(TIME_0=True),
+        ],
+        ignore_index=True,
+    )
+    return (frame, errors, *timings)
+
+
+#########################################################################################
+# De-duplication
+#
+# Records which only differ in their identifiers (e.g., POLICY_ID and CLAIM_ID) produce
+# the same projected rows apart from the identifiers. Each distinct record is valued once
+# and its projected rows and errors are copied to the duplicates with their identifiers.
+#########################################################################################
+
+
+def expand_duplicates(
+    projected, errors, unique, records, inverse, order_keys, id_keys, n_scenarios=None
+):
+    """Copy the projected rows and errors of the distinct records to every record.
+
+    Parameters
+    ----------
+    projected : pd.DataFrame or list
+        The projected frame of the distinct records (or an empty list).
+    errors : list
+        The errors of the distinct records.
+    unique : RecordBatch
+        The distinct records (see RecordBatch.deduplicate).
+    records : RecordBatch
+        All the records.
+    inverse : np.ndarray
+        The position of each record's distinct record within unique.
+    order_keys : tuple
+        The projected columns identifying a record.
+    id_keys : tuple
+        The projected columns set to the identifiers of each record.
+    n_scenarios : int, optional
+        The number of sensitivity scenarios when the errors are keyed by scenario.
+
+    Returns
+    -------
+    tuple
+        The projected frame and errors of all the records (in record order).
+    """
+    if len(projected) > 0:
+        positions = {}
+        for position, key in enumerate(
+            _record_keys(unique, [k.lower() for k in order_keys])
+        ):
+            positions.setdefault(key, position)
+        keys = zip(*(projected[k].tolist() for k in order_keys))
+        rows = np.array([positions[key] for key in keys], dtype=np.intp)
+        order = np.argsort(rows, kind="stable")
+        counts = np.bincount(rows, minlength=len(unique))
+        starts = np.cumsum(counts) - counts
+        n_rows = counts[inverse]
+        offsets = np.cumsum(n_rows) - n_rows
+        take = np.repeat(starts[inverse] - offsets, n_rows) + np.arange(n_rows.sum())
+        projected = projected.take(order[take])
+        for key in id_keys:
+            projected[key] = np.repeat(records.column(key.lower()), n_rows)
+    if len(errors) > 0:
+        unique_errors = {}
+        for error in errors:
+            unique_errors.setdefault(error.key, []).append(error)
+        record_keys = _record_keys(records, ITERATOR_KEYS)
+        unique_keys = [
+            _error_keys(dict(zip(ITERATOR_KEYS, key)), n_scenarios)
+            for key in _record_keys(unique, ITERATOR_KEYS)
+        ]
+        errors = [
+            evolve(error, key=error_key)
+            for key, position in zip(record_keys, inverse.tolist())
+            for unique_key, error_key in zip(
+                unique_keys[position],
+                _error_keys(dict(zip(ITERATOR_KEYS, key)), n_scenarios),
+            )
+            for error in unique_errors.get(unique_key, [])
+        ]
+    return projected, errors
+
+
+#########################################################################################
+# Run chunked
+#########################################################################################
+
+
+def _n_chunks(n_records: int, n_workers: int, chunk_size: int = None):
+    if chunk_size is None:
+        return min(n_records, n_workers * CHUNKS_PER_WORKER)
+    return -(-n_records // chunk_size)
+
+
+def make_chunks(records, n_workers: int, chunk_size: int = None):
+    """Split the records into chunks (in record order).
+
+    When chunk_size is None, the records are split into CHUNKS_PER_WORKER chunks for
+    each worker.
+    """
+    if len(records) == 0:
+        return []
+    n_chunks = _n_chunks(len(records), n_workers, chunk_size)
+    chunk_size = -(-len(records) // n_chunks)
+    return [records[i : i + chunk_size] for i in range(0, len(records), chunk_size)]
+
+
+def schedule_chunks(costs, n_chunks: int):
+    """Assign records to chunks balanced by their estimated cost.
+
+    Uses the longest processing time first (LPT) rule - records are taken in order of
+    decreasing cost and each is assigned to the chunk with the smallest total cost so
+    far. Within each chunk the records stay in record order and the chunks are returned
+    in order of decreasing total cost (i.e., the most expensive chunks start first).
+
+    Parameters
+    ----------
+    costs : list
+        The estimated cost of each record.
+    n_chunks : int
+        The number of chunks.
+
+    Returns
+    -------
+    list
+        A list of the record positions in each chunk.
+    """
+    costs = np.asarray(costs, dtype=float)
+    n_chunks = max(1, min(n_chunks, costs.size))
+    heap = [(0.0, chunk) for chunk in range(n_chunks)]
+    positions = [[] for _ in range(n_chunks)]
+    totals = [0.0] * n_chunks
+    for position in np.argsort(-costs, kind="stable").tolist():
+        total, chunk = heapq.heappop(heap)
+        positions[chunk].append(position)
+        totals[chunk] = total + costs[position]
+        heapq.heappush(heap, (totals[chunk], chunk))
+    order = sorted(range(n_chunks), key=lambda chunk: -totals[chunk])
+    return [sorted(positions[chunk]) for chunk in order if len(positions[chunk]) > 0]
+
+
+def _error_key(record):
+    return str(({k: record.get(k) for k in ITERATOR_KEYS},))
+
+
+def error_record_key(error):
+    """The record keys (policy_id and coverage_id) of an error captured by the extract
+    models (the first item of the error key, see _error_key and scenario_error_key)."""
+    return ast.literal_eval(error.key)[0]
+
+
+def _error_keys(record, n_scenarios=None):
+    """The keys of the errors of a record (one for each scenario when n_scenarios is
+    passed)."""
+    if n_scenarios is None:
+        return [_error_key(record)]
+    key = ({k: record.get(k) for k in ITERATOR_KEYS},)
+    return [str(scenario_error_key(key, scenario)) for scenario in range(n_scenarios)]
+
+
+def _record_keys(records, keys):
+    """The values of keys (lower case) for each record as a list of tuples."""
+    if isinstance(records, RecordBatch):
+        return list(zip(*(records.column(k).tolist() for k in keys)))
+    return [tuple(record.get(k) for k in keys) for record in records]
+
+
+def _restore_order(projected, errors, records, order_keys, n_scenarios=None):
+    """Sort the projected rows and errors back into record order."""
+    positions = {}
+    for position, key in enumerate(
+        _record_keys(records, [k.lower() for k in order_keys])
+    ):
+        positions.setdefault(key, position)
+    if len(projected) > 0:
+        keys = zip(*(projected[k].tolist() for k in order_keys))
+        rows = [positions.get(key, len(records)) for key in keys]
+        projected = projected.take(np.argsort(rows, kind="stable"))
+    error_positions = {}
+    for position, key in enumerate(_record_keys(records, ITERATOR_KEYS)):
+        for error_key in _error_keys(dict(zip(ITERATOR_KEYS, key)), n_scenarios):
+            error_positions.setdefault(error_key, position)
+    errors = sorted(errors, key=lambda e: error_positions.get(e.key, len(records)))
+    return projected, errors
+
+
+def run_chunked(
+    run_chunk,
+    records,
+    *,
+    executor: str = "dask",
+    n_workers: int = None,
+    chunk_size: int = None,
+    cost=None,
+    order_keys: tuple = None,
+    aggregate_by: list = None,
+    aggregate_measures: list = None,
+    step_timings: StepTimings = None,
+    duplicate_ids: tuple = None,
+    scenarios: list = None,
+    **kwargs,
+):
+    """Run records in chunks with an executor.
+
+    Parameters
+    ----------
+    run_chunk : callable
+        The chunk runner called as run_chunk(chunk, **kwargs) returning a tuple of the
+        projected frame and a list of errors. Needs to be picklable for the process
+        executor (i.e., a module level function or partial).
+    records : RecordBatch or list
+        The records to run. A record batch is split into batches (i.e., the chunks are
+        sent to the workers as columns) while a list is split into lists of dicts.
+    executor : str, optional
+        The name of a registered executor, by default dask.
+    n_workers : int, optional
+        The number of workers, by default the number of CPUs.
+    chunk_size : int, optional
+        The number of records per chunk, by default CHUNKS_PER_WORKER chunks per worker.
+        When cost is passed, this sets the number of chunks (i.e., the average number of
+        records per chunk).
+    cost : callable, optional
+        A function returning the estimated cost of a record. When passed, the chunks are
+        balanced by cost (see schedule_chunks) instead of split in record order.
+    order_keys : tuple, optional
+        The projected columns identifying a record used to restore record order when
+        the chunks are balanced by cost, by default (POLICY_ID, COVERAGE_ID).
+    aggregate_by : list, optional
+        When passed, each chunk is summed by these keys within the worker (see
+        run_aggregated) and the returned frame is the combined sums with a TIME_0 flag.
+    aggregate_measures : list, optional
+        The columns to sum when aggregating.
+    step_timings : StepTimings, optional
+        When passed, run_chunk is called with time_steps=True and the timings returned
+        for each chunk are added to step_timings.
+    duplicate_ids : tuple, optional
+        When passed (e.g., (POLICY_ID, CLAIM_ID)), records which only differ in these
+        columns are valued once (see expand_duplicates). Only used when records is a
+        RecordBatch and aggregate_by is not set.
+    scenarios : list, optional
+        When passed, run_chunk values each record under every sensitivity scenario
+        (passed to run_chunk) and the projected frame holds a SCENARIO column (also
+        added to the grouping keys when aggregating).
+    kwargs
+        Constant parameters passed to run_chunk.
+
+    Returns
+    -------
+    tuple
+        The concatenated projected frame (or an empty list when no record ran without
+        error) and the list of errors across all chunks.
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    if step_timings is not None:
+        kwargs["time_steps"] = True
+    n_scenarios = None
+    if scenarios is not None:
+        kwargs["scenarios"] = scenarios
+        n_scenarios = len(scenarios)
+        if aggregate_by is not None:
+            aggregate_by = list(aggregate_by) + ["SCENARIO"]
+    if order_keys is None:
+        order_keys = tuple(k.upper() for k in ITERATOR_KEYS)
+    if aggregate_by is not None:
+        run_chunk = partial(
+            run_aggregated,
+            run_chunk=run_chunk,
+            by=list(aggregate_by),
+            measures=list(aggregate_measures),
+            record_keys=order_keys,
+        )
+    metered = METRICS.enabled
+    if metered:
+        run_chunk = partial(run_metered, run_chunk=run_chunk, driver=os.getpid())
+    if not isinstance(records, RecordBatch):
+        records = list(records)
+    elif duplicate_ids is not None and aggregate_by is None:
+        all_records = records
+        records, inverse = records.deduplicate([k.lower() for k in duplicate_ids])
+        if len(records) == len(all_records):
+            records = all_records
+            duplicate_ids = None
+    else:
+        duplicate_ids = None
+    if cost is None or len(records) == 0:
+        chunks = make_chunks(records, n_workers, chunk_size)
+    else:
+        positions = schedule_chunks(
+            [cost(record) for record in records],
+            _n_chunks(len(records), n_workers, chunk_size),
+        )
+        if isinstance(records, RecordBatch):
+            chunks = [records.take(chunk) for chunk in positions]
+        else:
+            chunks = [[records[i] for i in chunk] for chunk in positions]
+    results = EXECUTORS[executor](run_chunk, chunks, kwargs, n_workers)
+    if metered:
+        results, metrics = zip(*results) if len(results) > 0 else ([], [])
+        for worker_metrics in metrics:
+            if worker_metrics is not None:
+                METRICS.update(worker_metrics)
+    frames, errors = [], []
+    for projected, chunk_errors, *timings in results:
+        if isinstance(projected, pd.DataFrame) and len(projected) > 0:
+            frames.append(projected)
+        errors.extend(chunk_errors)
+        if step_timings is not None:
+            step_timings.update(timings[0])
+    if len(frames) == 0:
+        projected = []
+    elif aggregate_by is not None:
+        by = list(aggregate_by) + ["TIME_0"]
+        projected = aggregate(pd.concat(frames), by, aggregate_measures)
+    else:
+        projected = pd.concat(frames)
+    if cost is not None and len(chunks) > 1:
+        if aggregate_by is not None:
+            # the sums are ordered by the grouping keys
+            _, errors = _restore_order([], errors, records, order_keys, n_scenarios)
+        else:
+            projected, errors = _restore_order(
+                projected, errors, records, order_keys, n_scenarios
+            )
+    if duplicate_ids is not None:
+        projected, errors = expand_duplicates(
+            projected,
+            errors,
+            records,
+            all_records,
+            inverse,
+            order_keys,
+            duplicate_ids,
+            n_scenarios,
+        )
+    return projected, errors
@@ -1,2 +1,12 @@
-from .active_lives import ActiveLivesValEMD
-from .disabled_lives import DisabledLivesProjEMD, DisabledLivesValEMD
+from ...lazy import lazy_imports
+
+__getattr__, __dir__ = lazy_imports(
+    __name__,
+    {
+        "ActiveLivesValEMD": ".active_lives",
+        "DisabledLivesProjEMD": ".disabled_lives",
+        "DisabledLivesValEMD": ".disabled_lives",
+        "read_extract": ".streaming",
+        "run_extract_stream": ".streaming",
+    },
+)
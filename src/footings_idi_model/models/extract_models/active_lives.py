@@ -1,10 +1,11 @@
+from functools import partial
+
 import pandas as pd
-from footings.actuarial_tools import convert_to_records
 from footings.model import def_intermediate, def_parameter, def_return, model, step
-from footings.parallel_tools.dask import create_dask_foreach_jig
-from footings.utils import get_kws
 
+from ...extracts import ActiveLivesBaseExtract
 from ...outputs import ActiveLivesValOutput
+from ..executors import run_chunked, run_foreach
 from ..policy_models import (
     AValBasePMD,
     AValCatRPMD,
@@ -13,6 +14,11 @@ from ..policy_models import (
     AValRopRPMD,
     AValSisRPMD,
 )
+from ..policy_models.active_deterministic_claim_cost import (
+    DURATION_BENEFITS,
+    SELECT_MONTHS,
+)
+from ..records import RecordBatch
 from ..shared import (
     meta_last_commit,
     meta_model_version,
@@ -22,10 +28,20 @@ from ..shared import (
     modifier_interest,
     modifier_lapse,
     modifier_mortality,
+    param_aggregate_by,
     param_assumption_set,
+    param_chunk_size,
+    param_deduplicate,
+    param_executor,
+    param_n_workers,
     param_net_benefit_method,
+    param_output_policy,
+    param_scenarios,
+    param_time_0_only,
+    param_time_steps,
     param_valuation_dt,
 )
+from ..timings import StepTimings
 
 models = {
     "BASE": AValBasePMD,
@@ -45,20 +61,40 @@ FOREACH_PARAMS = (
     "modifier_interest",
     "modifier_lapse",
     "modifier_mortality",
+    "time_0_only",
 )
 
-foreach_model = create_dask_foreach_jig(
-    models,
-    iterator_name="records",
-    iterator_keys=("policy_id", "coverage_id",),
-    mapped_keys=("coverage_id",),
-    pass_iterator_keys=("policy_id",),
-    constant_params=FOREACH_PARAMS,
-    success_wrap=pd.concat,
-)
 
+def run_records(records, **kwargs):
+    """Run a chunk of records through their respective policy models (picklable by
+    reference for the process executor)."""
+    return run_foreach(records, models=models, **kwargs)
 
-@model(steps=["_create_records", "_run_foreach", "_get_time0"])
+
+def estimate_cost(record, valuation_dt):
+    """Estimate the relative cost of valuing a record.
+
+    Each remaining policy year runs a claim cost for a claim lasting the benefit period.
+    The claim cost model projects the select period for every policy year and values the
+    ultimate period once (every policy year for riders in DURATION_BENEFITS).
+    """
+    policy_end_dt = record["policy_end_dt"]
+    years = max(policy_end_dt.year - valuation_dt.year, 1)
+    benefit_period = record["idi_benefit_period"]
+    if benefit_period[-1] == "M":
+        claim_months = int(benefit_period[:-1])
+    else:
+        if benefit_period == "LIFE":
+            end_year = record["birth_dt"].year + 120
+        else:
+            end_year = policy_end_dt.year
+        claim_months = max(end_year - valuation_dt.year, 1) * 12
+    if record["coverage_id"] in DURATION_BENEFITS:
+        return years * claim_months
+    return years * min(claim_months, SELECT_MONTHS) + claim_months
+
+
+@model(steps=["_create_records", "_run_foreach", "_get_time0", "_apply_output_policy"])
 class ActiveLivesValEMD:
     """Active lives deterministic valuation extract model.
 
@@ -76,6 +112,20 @@ class ActiveLivesValEMD:
     valuation_dt = param_valuation_dt
     assumption_set = param_assumption_set
     net_benefit_method = param_net_benefit_method
+    executor = param_executor
+    n_workers = param_n_workers
+    chunk_size = param_chunk_size
+    aggregate_by = param_aggregate_by
+    aggregate_measures = def_parameter(
+        dtype=list,
+        default=("ALR",),
+        description="The projected columns to sum when aggregate_by is set.",
+    )
+    time_0_only = param_time_0_only
+    time_steps = param_time_steps
+    deduplicate = param_deduplicate
+    scenarios = param_scenarios
+    output_policy = param_output_policy
 
     # sensitivities
     modifier_ctr = modifier_ctr
@@ -91,7 +141,11 @@ class ActiveLivesValEMD:
 
     # intermediates
     records = def_intermediate(
-        dtype=dict, description="The extract transformed to records."
+        dtype=RecordBatch, description="The extract transformed to records."
+    )
+    step_timings = def_intermediate(
+        dtype=StepTimings,
+        description="The time of each policy model step when time_steps is True.",
     )
 
     # return
@@ -109,45 +163,91 @@ class ActiveLivesValEMD:
         impacts=["records"],
     )
     def _create_records(self):
-        """Turn extract into a list of records for each row in extract."""
-        records = convert_to_records(self.extract_base, column_case="lower")
-        rider_data = self.extract_riders.copy()
-        rider_data.columns = [col.lower() for col in rider_data.columns]
-        rider_data = rider_data.pivot(
-            index=["policy_id", "coverage_id"], columns="rider_attribute", values="value"
-        ).to_dict(orient="index")
-
-        def update_record(record):
-            key = (
-                record["policy_id"],
-                record["coverage_id"],
-            )
-            kwargs_add = rider_data.get(key, None)
-            if kwargs_add is not None:
-                return {**record, **kwargs_add}
-            return record
-
-        self.records = [
-            record if record["coverage_id"] not in ["ROP"] else update_record(record)
-            for record in records
-        ]
+        """Turn extract into a batch of records (see RecordBatch) for each row in extract.
+
+        The ROP rider attributes are joined to the ROP records as columns.
+        """
+        self.records = RecordBatch.from_extract(
+            self.extract_base,
+            ActiveLivesBaseExtract,
+            riders=self.extract_riders,
+            rider_keys=("policy_id", "coverage_id"),
+            rider_coverages=("ROP",),
+        )
 
     @step(
         name="Run Records with Policy Models",
-        uses=["records"] + list(FOREACH_PARAMS),
-        impacts=["projected", "errors"],
+        uses=[
+            "records",
+            "executor",
+            "n_workers",
+            "chunk_size",
+            "aggregate_by",
+            "aggregate_measures",
+            "time_steps",
+            "deduplicate",
+            "scenarios",
+        ]
+        + list(FOREACH_PARAMS),
+        impacts=["projected", "errors", "step_timings"],
     )
     def _run_foreach(self):
-        """Foreach record run through respective policy model based on COVERAGE_ID value."""
-        projected, errors = foreach_model(**get_kws(foreach_model, self))
-        if isinstance(projected, list):
-            projected = pd.DataFrame(columns=list(ActiveLivesValOutput.columns))
+        """Foreach record run through respective policy model based on COVERAGE_ID value.
+
+        The records are split into chunks balanced by their estimated cost (see
+        estimate_cost) which are ran with the chosen executor. When time_steps is True,
+        the time of each policy model step is summed across the chunks.
+        When deduplicate is True, records which only differ in their identifiers are
+        valued once (see expand_duplicates). When scenarios is set, each record is valued
+        under every scenario (see run_scenarios) and the projected rows of a record are in
+        scenario order.
+        """
+        step_timings = StepTimings() if self.time_steps else None
+        projected, errors = run_chunked(
+            run_records,
+            self.records,
+            executor=self.executor,
+            n_workers=self.n_workers,
+            chunk_size=self.chunk_size,
+            cost=partial(estimate_cost, valuation_dt=self.valuation_dt),
+            aggregate_by=self.aggregate_by,
+            aggregate_measures=self.aggregate_measures,
+            step_timings=step_timings,
+            scenarios=self.scenarios,
+            duplicate_ids=("POLICY_ID",) if self.deduplicate else None,
+            **{param: getattr(self, param) for param in FOREACH_PARAMS},
+        )
+        scenario_cols = [] if self.scenarios is None else ["SCENARIO"]
+        if isinstance(projected, list) and self.aggregate_by is not None:
+            columns = (
+                list(self.aggregate_by) + scenario_cols + list(self.aggregate_measures)
+            )
+            projected = pd.DataFrame(columns=columns + ["TIME_0"])
+        elif isinstance(projected, list):
+            columns = list(ActiveLivesValOutput.columns) + scenario_cols
+            projected = pd.DataFrame(columns=columns)
         self.projected = projected
         self.errors = errors
+        self.step_timings = step_timings
 
-    @step(name="Get Time0 Values", uses=["projected"], impacts=["time_0"])
+    @step(
+        name="Get Time0 Values",
+        uses=["projected", "aggregate_by", "scenarios"],
+        impacts=["projected", "time_0"],
+    )
     def _get_time0(self):
-        """Filter projected reserves frame down to time_0 reserve for each record."""
+        """Filter projected reserves frame down to time_0 reserve for each record.
+
+        When aggregate_by is set, the sums of the time 0 rows are split from projected.
+        When time_0_only is set, projected already only holds the time 0 rows. When
+        scenarios is set, there is a time 0 row for each record and scenario.
+        """
+        if self.aggregate_by is not None:
+            is_time_0 = self.projected["TIME_0"].astype(bool)
+            frame = self.projected.drop(columns="TIME_0")
+            self.time_0 = frame[is_time_0].reset_index(drop=True)
+            self.projected = frame[~is_time_0].reset_index(drop=True)
+            return
         cols = [
             "MODEL_VERSION",
             "LAST_COMMIT",
@@ -158,7 +258,21 @@ class ActiveLivesValEMD:
             "ALR_DATE",
             "ALR",
         ]
-        self.time_0 = self.projected.groupby(cols[4:6], as_index=False).head(1)[cols]
+        keys = cols[4:6]
+        if self.scenarios is not None:
+            keys, cols = keys + ["SCENARIO"], cols + ["SCENARIO"]
+        self.time_0 = self.projected.groupby(keys, as_index=False).head(1)[cols]
+
+    @step(
+        name="Apply Output Policy",
+        uses=["projected", "time_0", "output_policy"],
+        impacts=["projected", "time_0"],
+    )
+    def _apply_output_policy(self):
+        """Set the dtypes of the projected and time 0 frames using the output policy."""
+        if self.output_policy is not None:
+            self.projected = self.output_policy.apply(self.projected)
+            self.time_0 = self.output_policy.apply(self.time_0)
 
 
 @model
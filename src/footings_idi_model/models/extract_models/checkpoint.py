@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from ...metadata import get_git_revision, get_model_version
+
+#########################################################################################
+# Run Manifest
+#
+# A checkpointed run records each completed chunk (with the state of the output sink
+# after the chunk was written) in a local JSON manifest. A rerun with the same extract,
+# parameters and code version skips the completed chunks.
+#########################################################################################
+
+MANIFEST_VERSION = 1
+
+# parameters which change how the records are ran but not the output (e.g., a rerun
+# with fewer workers after running out of memory resumes the checkpoint)
+EXECUTION_PARAMS = ("executor", "n_workers", "chunk_size", "time_steps", "deduplicate")
+
+
+def _hash_file(path, block_size=2**20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_extract(extract):
+    """Hash the content of an extract (a path to a file or a DataFrame)."""
+    if isinstance(extract, pd.DataFrame):
+        values = pd.util.hash_pandas_object(extract, index=False).to_numpy()
+        columns = ",".join(str(col) for col in extract.columns)
+        return hashlib.sha256(columns.encode() + values.tobytes()).hexdigest()
+    if isinstance(extract, (str, os.PathLike)):
+        return _hash_file(extract)
+    msg = "A checkpointed run requires the extract to be a path or a DataFrame."
+    raise TypeError(msg)
+
+
+def run_fingerprint(model, extract_base, extract_riders, chunk_size, parameters):
+    """Create the fingerprint of a run.
+
+    The fingerprint covers the model, the content of the extracts, the chunk size, the
+    parameters and the code version (model version and last git commit). The parameters
+    in EXECUTION_PARAMS are left out as they do not change the output.
+    """
+    content = {
+        "model": f"{model.__module__}.{model.__qualname__}",
+        "extract_base": hash_extract(extract_base),
+        "extract_riders": hash_extract(extract_riders),
+        "chunk_size": chunk_size,
+        "parameters": {
+            k: str(v) for k, v in sorted(parameters.items()) if k not in EXECUTION_PARAMS
+        },
+        "model_version": get_model_version(),
+        "last_commit": get_git_revision(),
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+class RunManifest:
+    """The manifest of a checkpointed run stored as JSON.
+
+    Parameters
+    ----------
+    path : str
+        The path to the manifest file.
+    fingerprint : str
+        The fingerprint of the run (see run_fingerprint). An existing manifest with a
+        different fingerprint is discarded (i.e., the run starts over).
+    """
+
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.chunks = {}
+        self.sink_state = None
+        self.complete = False
+        if os.path.exists(path):
+            with open(path) as file:
+                content = json.load(file)
+            if (
+                content.get("version") == MANIFEST_VERSION
+                and content.get("fingerprint") == fingerprint
+            ):
+                self.chunks = {int(k): v for k, v in content["chunks"].items()}
+                self.sink_state = content["sink_state"]
+                self.complete = content["complete"]
+
+    def _save(self):
+        content = {
+            "version": MANIFEST_VERSION,
+            "fingerprint": self.fingerprint,
+            "chunks": {str(k): v for k, v in self.chunks.items()},
+            "sink_state": self.sink_state,
+            "complete": self.complete,
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # write then rename so a crash never leaves a partial manifest
+        temp = f"{self.path}.tmp"
+        with open(temp, "w") as file:
+            json.dump(content, file, indent=2)
+        os.replace(temp, self.path)
+
+    def add_chunk(self, chunk: int, records: int, errors: int, sink_state):
+        """Record a completed chunk and the state of the sink after it was written."""
+        self.chunks[chunk] = {"records": records, "errors": errors}
+        self.sink_state = sink_state
+        self._save()
+
+    def mark_complete(self):
+        """Record that the run finished (i.e., the sink was closed)."""
+        self.complete = True
+        self._save()
+
+    def summary(self):
+        """The number of chunks, records and errors completed."""
+        return {
+            "chunks": len(self.chunks),
+            "records": sum(chunk["records"] for chunk in self.chunks.values()),
+            "errors": sum(chunk["errors"] for chunk in self.chunks.values()),
+        }
@@ -1,26 +1,43 @@
+from functools import partial
+
 import pandas as pd
-from footings.actuarial_tools import convert_to_records
 from footings.model import def_intermediate, def_parameter, def_return, model, step
-from footings.parallel_tools.dask import create_dask_foreach_jig
-from footings.utils import get_kws
+from footings.validators import isin
 
+from ...extracts import DisabledLivesBaseExtract
 from ...outputs import DisabledLivesValOutput
+from ..executors import run_chunked, run_foreach
 from ..policy_models import (
     DValBasePMD,
     DValCatRPMD,
     DValColaRPMD,
     DValResRPMD,
     DValSisRPMD,
+    build_reserve_factors,
+    load_reserve_factors,
+    run_dlr_batch,
+    run_dlr_factors,
 )
+from ..records import RecordBatch
 from ..shared import (
     meta_last_commit,
     meta_model_version,
     meta_run_date_time,
     modifier_ctr,
     modifier_interest,
+    param_aggregate_by,
     param_assumption_set,
+    param_chunk_size,
+    param_deduplicate,
+    param_executor,
+    param_n_workers,
+    param_output_policy,
+    param_scenarios,
+    param_time_0_only,
+    param_time_steps,
     param_valuation_dt,
 )
+from ..timings import StepTimings
 
 models = {
     "BASE": DValBasePMD,
@@ -35,20 +52,27 @@ FOREACH_PARAMS = (
     "assumption_set",
     "modifier_interest",
     "modifier_ctr",
+    "time_0_only",
 )
 
-foreach_model = create_dask_foreach_jig(
-    models,
-    iterator_name="records",
-    iterator_keys=("policy_id", "coverage_id",),
-    mapped_keys=("coverage_id",),
-    pass_iterator_keys=("policy_id",),
-    constant_params=FOREACH_PARAMS,
-    success_wrap=pd.concat,
-)
 
+def run_records(records, **kwargs):
+    """Run a chunk of records through their respective policy models (picklable by
+    reference for the process executor)."""
+    return run_foreach(records, models=models, **kwargs)
 
-@model(steps=["_create_records", "_run_foreach", "_get_time0"])
+
+def estimate_cost(record, valuation_dt):
+    """Estimate the relative cost of valuing a record (the number of projected months
+    from the valuation date to the benefit termination date)."""
+    termination_dt = record["termination_dt"]
+    months = (termination_dt.year - valuation_dt.year) * 12 + (
+        termination_dt.month - valuation_dt.month
+    )
+    return max(months, 1)
+
+
+@model(steps=["_create_records", "_run_foreach", "_get_time0", "_apply_output_policy"])
 class DisabledLivesValEMD:
     """Disabled lives deterministic valuation extract model.
 
@@ -65,6 +89,39 @@ class DisabledLivesValEMD:
     )
     valuation_dt = param_valuation_dt
     assumption_set = param_assumption_set
+    execution_mode = def_parameter(
+        dtype=str,
+        default="foreach",
+        validator=isin(["foreach", "batch", "factors"]),
+        description="""The mode used to value the records. Options are :
+
+        * `foreach` - run each record through its respective policy model
+        * `batch` - value records together with the vectorized DLR engine
+        * `factors` - value the time 0 reserve with reserve factor tables (see
+          reserve_factors)
+    """,
+    )
+    reserve_factors = def_parameter(
+        default=None,
+        description="""The reserve factor tables used when execution_mode is factors (a
+        ReserveFactors or the path of a file written with ReserveFactors.save). If None
+        the tables are built for the records.
+    """,
+    )
+    executor = param_executor
+    n_workers = param_n_workers
+    chunk_size = param_chunk_size
+    aggregate_by = param_aggregate_by
+    aggregate_measures = def_parameter(
+        dtype=list,
+        default=("DLR",),
+        description="The projected columns to sum when aggregate_by is set.",
+    )
+    time_0_only = param_time_0_only
+    time_steps = param_time_steps
+    deduplicate = param_deduplicate
+    scenarios = param_scenarios
+    output_policy = param_output_policy
 
     # sensitivities
     modifier_ctr = modifier_ctr
@@ -77,7 +134,11 @@ class DisabledLivesValEMD:
 
     # intermediates
     records = def_intermediate(
-        dtype=dict, description="The extract transformed to records."
+        dtype=RecordBatch, description="The extract transformed to records."
+    )
+    step_timings = def_intermediate(
+        dtype=StepTimings,
+        description="The time of each policy model step when time_steps is True.",
     )
 
     # return
@@ -95,51 +156,124 @@ class DisabledLivesValEMD:
         impacts=["records"],
     )
     def _create_records(self):
-        """Turn extract into a list of records for each row in extract."""
-        frame = self.extract_base.copy()
-        del frame["IDI_MARKET"]
-        del frame["TOBACCO_USAGE"]
-        records = convert_to_records(frame, column_case="lower")
-        rider_data = self.extract_riders.copy()
-        rider_data.columns = [col.lower() for col in rider_data.columns]
-        rider_data = rider_data.pivot(
-            index=["policy_id", "claim_id", "coverage_id"],
-            columns="rider_attribute",
-            values="value",
-        ).to_dict(orient="index")
-
-        def update_record(record):
-            key = (
-                record["policy_id"],
-                record["claim_id"],
-                record["coverage_id"],
-            )
-            kwargs_add = rider_data.get(key, None)
-            if kwargs_add is not None:
-                return {**record, **kwargs_add}
-            return record
-
-        self.records = [
-            record if record["coverage_id"] not in ["RES"] else update_record(record)
-            for record in records
-        ]
+        """Turn extract into a batch of records (see RecordBatch) for each row in extract.
+
+        The RES rider attributes are joined to the RES records as columns.
+        """
+        self.records = RecordBatch.from_extract(
+            self.extract_base,
+            DisabledLivesBaseExtract,
+            riders=self.extract_riders,
+            rider_keys=("policy_id", "claim_id", "coverage_id"),
+            rider_coverages=("RES",),
+            drop=("IDI_MARKET", "TOBACCO_USAGE"),
+        )
 
     @step(
         name="Run Records with Policy Models",
-        uses=["records"] + list(FOREACH_PARAMS),
-        impacts=["projected", "errors"],
+        uses=[
+            "records",
+            "execution_mode",
+            "executor",
+            "n_workers",
+            "chunk_size",
+            "aggregate_by",
+            "aggregate_measures",
+            "time_steps",
+            "deduplicate",
+            "scenarios",
+            "reserve_factors",
+        ]
+        + list(FOREACH_PARAMS),
+        impacts=["projected", "errors", "step_timings"],
     )
     def _run_foreach(self):
-        """Foreach record run through respective policy model based on COVERAGE_ID value."""
-        projected, errors = foreach_model(**get_kws(foreach_model, self))
-        if isinstance(projected, list):
-            projected = pd.DataFrame(columns=list(DisabledLivesValOutput.columns))
+        """Foreach record run through respective policy model based on COVERAGE_ID value.
+
+        The records are split into chunks balanced by their estimated cost (see
+        estimate_cost) which are ran with the chosen executor. When
+        execution_mode is batch, each chunk is valued together with the vectorized DLR
+        engine (run_dlr_batch) which produces the same projected frame. When time_steps
+        is True, the time of each policy model step is summed across the chunks.
+        When deduplicate is True, records which only differ in their identifiers are
+        valued once (see expand_duplicates). When execution_mode is factors, the time 0
+        reserve of the BASE and CAT records is looked up from reserve factor tables (see
+        run_dlr_factors) and the projected frame only holds the time 0 rows. When
+        scenarios is set, each record is valued under every scenario (see run_scenarios)
+        and the projected rows of a record are in scenario order.
+        """
+        if self.execution_mode == "batch":
+            run_chunk = run_dlr_batch
+        elif self.execution_mode == "factors":
+            if self.scenarios is not None:
+                msg = "The scenarios are not supported when execution_mode is factors "
+                msg += "(the reserve factors are built for one modifier_ctr)."
+                raise ValueError(msg)
+            run_chunk = partial(run_dlr_factors, reserve_factors=self._get_factors())
+        else:
+            run_chunk = run_records
+        step_timings = StepTimings() if self.time_steps else None
+        projected, errors = run_chunked(
+            run_chunk,
+            self.records,
+            executor=self.executor,
+            n_workers=self.n_workers,
+            chunk_size=self.chunk_size,
+            cost=partial(estimate_cost, valuation_dt=self.valuation_dt),
+            aggregate_by=self.aggregate_by,
+            aggregate_measures=self.aggregate_measures,
+            step_timings=step_timings,
+            scenarios=self.scenarios,
+            order_keys=("POLICY_ID", "CLAIM_ID", "COVERAGE_ID"),
+            duplicate_ids=("POLICY_ID", "CLAIM_ID") if self.deduplicate else None,
+            **{param: getattr(self, param) for param in FOREACH_PARAMS},
+        )
+        scenario_cols = [] if self.scenarios is None else ["SCENARIO"]
+        if isinstance(projected, list) and self.aggregate_by is not None:
+            columns = (
+                list(self.aggregate_by) + scenario_cols + list(self.aggregate_measures)
+            )
+            projected = pd.DataFrame(columns=columns + ["TIME_0"])
+        elif isinstance(projected, list):
+            columns = list(DisabledLivesValOutput.columns) + scenario_cols
+            projected = pd.DataFrame(columns=columns)
         self.projected = projected
         self.errors = errors
+        self.step_timings = step_timings
+
+    def _get_factors(self):
+        """The reserve factor tables checked against the assumptions of the run."""
+        factors = self.reserve_factors
+        if factors is None:
+            factors = build_reserve_factors(
+                self.records,
+                assumption_set=self.assumption_set,
+                modifier_ctr=self.modifier_ctr,
+                modifier_interest=self.modifier_interest,
+            )
+        elif isinstance(factors, str):
+            factors = load_reserve_factors(factors)
+        factors.check(self.assumption_set, self.modifier_ctr)
+        return factors
 
-    @step(name="Get Time0 Values", uses=["projected"], impacts=["time_0"])
+    @step(
+        name="Get Time0 Values",
+        uses=["projected", "aggregate_by", "scenarios"],
+        impacts=["projected", "time_0"],
+    )
     def _get_time0(self):
-        """Filter projected reserves frame down to time_0 reserve for each record."""
+        """Filter projected reserves frame down to time_0 reserve for each record.
+
+        When aggregate_by is set, the sums of the time 0 rows are split from projected.
+        When time_0_only is set, projected already only holds the time 0 rows. When
+        scenarios is set, there is a time 0 row for each record and scenario.
+        """
+        if self.aggregate_by is not None:
+            is_time_0 = self.projected["TIME_0"].astype(bool)
+            frame = self.projected.drop(columns="TIME_0")
+            self.time_0 = frame[is_time_0].reset_index(drop=True)
+            self.projected = frame[~is_time_0].reset_index(drop=True)
+            return
         cols = [
             "MODEL_VERSION",
             "LAST_COMMIT",
@@ -151,7 +285,21 @@ class DisabledLivesValEMD:
             "DATE_DLR",
             "DLR",
         ]
-        self.time_0 = self.projected.groupby(cols[4:7], as_index=False).head(1)[cols]
+        keys = cols[4:7]
+        if self.scenarios is not None:
+            keys, cols = keys + ["SCENARIO"], cols + ["SCENARIO"]
+        self.time_0 = self.projected.groupby(keys, as_index=False).head(1)[cols]
+
+    @step(
+        name="Apply Output Policy",
+        uses=["projected", "time_0", "output_policy"],
+        impacts=["projected", "time_0"],
+    )
+    def _apply_output_policy(self):
+        """Set the dtypes of the projected and time 0 frames using the output policy."""
+        if self.output_policy is not None:
+            self.projected = self.output_policy.apply(self.projected)
+            self.time_0 = self.output_policy.apply(self.time_0)
 
 
 @model
@@ -0,0 +1,189 @@
+import os
+
+import pandas as pd
+
+from ...extracts import ActiveLivesBaseExtract, DisabledLivesBaseExtract
+from ..timings import StepTimings
+from .active_lives import ActiveLivesValEMD
+from .checkpoint import RunManifest, run_fingerprint
+from .disabled_lives import DisabledLivesValEMD
+
+#########################################################################################
+# Streaming Extract Runner
+#
+# Runs an extract model over an extract read in chunks of rows. The results for each
+# chunk are handed to an output sink (see footings_idi_model.outputs.sinks) so peak memory
+# depends on the chunk size instead of the size of the extract.
+#########################################################################################
+
+# the base extract data dictionary for each extract model (used to read CSV chunks)
+EXTRACTS = {
+    ActiveLivesValEMD: ActiveLivesBaseExtract,
+    DisabledLivesValEMD: DisabledLivesBaseExtract,
+}
+
+STREAM_CHUNK_SIZE = 100_000
+
+
+def _is_parquet(path):
+    return os.path.splitext(str(path))[1].lower() in [".parquet", ".pq"]
+
+
+def _columns_with_dtype(extract, dtype):
+    if extract is None:
+        return []
+    return [
+        col.name
+        for col in extract.list_columns()
+        if col.dtype is not None and col.dtype.value == dtype
+    ]
+
+
+def read_extract(path, chunk_size: int = STREAM_CHUNK_SIZE, extract=None):
+    """Read an extract file (CSV or Parquet) in chunks of rows.
+
+    Parquet files require pyarrow.
+
+    Parameters
+    ----------
+    path : str
+        The path to the extract (.parquet/.pq files are read as Parquet otherwise CSV).
+    chunk_size : int, optional
+        The number of rows in each chunk.
+    extract : DataDictionary, optional
+        The extract data dictionary used to parse the date and string columns of a CSV
+        file (i.e., so the dtypes do not change between chunks).
+
+    Yields
+    ------
+    pd.DataFrame
+        A chunk of the extract.
+    """
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        columns = pd.read_csv(path, nrows=0).columns
+        parse_dates = [
+            col
+            for col in _columns_with_dtype(extract, "datetime64[ns]")
+            if col in columns
+        ]
+        dtype = {
+            col: str for col in _columns_with_dtype(extract, "string") if col in columns
+        }
+        yield from pd.read_csv(
+            path, chunksize=chunk_size, parse_dates=parse_dates, dtype=dtype
+        )
+
+
+def _split_frame(frame, chunk_size):
+    for start in range(0, len(frame), chunk_size):
+        yield frame.iloc[start : start + chunk_size]
+
+
+def _read_riders(extract_riders):
+    if isinstance(extract_riders, pd.DataFrame):
+        return extract_riders
+    if _is_parquet(extract_riders):
+        return pd.read_parquet(extract_riders)
+    return pd.read_csv(extract_riders)
+
+
+def run_extract_stream(
+    model,
+    extract_base,
+    extract_riders,
+    sink,
+    *,
+    stream_chunk_size: int = STREAM_CHUNK_SIZE,
+    checkpoint: str = None,
+    **parameters,
+):
+    """Run an extract model over an extract in chunks writing the results to a sink.
+
+    Each chunk of the base extract (with the riders for the policies in the chunk) is
+    ran through the extract model and the projected, time 0 and errors are passed to
+    sink.write before the next chunk is read. The sink is closed at the end of the run.
+
+    When checkpoint is passed, each completed chunk is recorded in a manifest at that
+    path. A rerun with the same extract, parameters and code version skips the completed
+    chunks (the sink is restored to its state after the last completed chunk) and a
+    rerun of a finished run returns without running anything. The execution parameters
+    (e.g., executor and n_workers) can change between reruns (see EXECUTION_PARAMS).
+
+    Parameters
+    ----------
+    model
+        The extract model (ActiveLivesValEMD or DisabledLivesValEMD).
+    extract_base : str, pd.DataFrame or iterable
+        The base extract as a path to a CSV or Parquet file (read in chunks), a
+        DataFrame (split into chunks) or an iterable of DataFrames (used as the chunks).
+    extract_riders : str or pd.DataFrame
+        The rider extract as a path or DataFrame (held in memory).
+    sink : OutputSink
+        The sink to write the results of each chunk to.
+    stream_chunk_size : int, optional
+        The number of base extract rows in each chunk (chunk_size is passed to the
+        extract model with the parameters).
+    checkpoint : str, optional
+        The path to the run manifest. The sink needs to support checkpoints and the
+        extracts need to be a path or DataFrame.
+    parameters
+        The remaining parameters passed to the extract model (e.g., valuation_dt).
+
+    Returns
+    -------
+    dict
+        The number of chunks, records and errors. When time_steps is passed as True,
+        the step timings summed across the chunks (a StepTimings) as step_timings. With
+        a checkpoint, the chunks, records and errors include the chunks completed by an
+        earlier run while the step timings only include the chunks ran by this run (the
+        chunks skipped on resume are not timed).
+    """
+    summary = {"chunks": 0, "records": 0, "errors": 0}
+    if parameters.get("time_steps", False):
+        summary["step_timings"] = StepTimings()
+
+    manifest = None
+    if checkpoint is not None:
+        fingerprint = run_fingerprint(
+            model, extract_base, extract_riders, stream_chunk_size, parameters
+        )
+        manifest = RunManifest(checkpoint, fingerprint)
+        if manifest.complete:
+            return {**summary, **manifest.summary()}
+        sink.resume(manifest.sink_state)
+
+    if isinstance(extract_base, pd.DataFrame):
+        chunks = _split_frame(extract_base, stream_chunk_size)
+    elif isinstance(extract_base, (str, os.PathLike)):
+        chunks = read_extract(extract_base, stream_chunk_size, EXTRACTS.get(model))
+    else:
+        chunks = extract_base
+    riders = _read_riders(extract_riders)
+
+    for chunk, base in enumerate(chunks):
+        if manifest is not None and chunk in manifest.chunks:
+            continue
+        chunk_riders = riders[riders["POLICY_ID"].isin(base["POLICY_ID"])]
+        extract_model = model(
+            extract_base=base, extract_riders=chunk_riders, **parameters
+        )
+        projected, time_0, errors = extract_model.run()
+        sink.write(chunk, projected, time_0, errors)
+        if manifest is not None:
+            manifest.add_chunk(chunk, len(base), len(errors), sink.checkpoint())
+        summary["chunks"] += 1
+        summary["records"] += len(base)
+        summary["errors"] += len(errors)
+        if "step_timings" in summary:
+            summary["step_timings"].update(extract_model.step_timings)
+    sink.close()
+
+    if manifest is not None:
+        manifest.mark_complete()
+        return {**summary, **manifest.summary()}
+    return summary
@@ -1,13 +1,35 @@
-from .active_deterministic_base import AProjBasePMD, AValBasePMD
-from .active_deterministic_cat import AProjCatRPMD, AValCatRPMD
-from .active_deterministic_cola import AProjColaRPMD, AValColaRPMD
-from .active_deterministic_res import AProjResRPMD, AValResRPMD
-from .active_deterministic_rop import AProjRopRPMD, AValRopRPMD
-from .active_deterministic_sis import AProjSisRPMD, AValSisRPMD
-from .disabled_deterministic_base import DProjBasePMD, DValBasePMD
-from .disabled_deterministic_cat import DProjCatRPMD, DValCatRPMD
-from .disabled_deterministic_cola import DProjColaRPMD, DValColaRPMD
-from .disabled_deterministic_res import DProjResRPMD, DValResRPMD
-from .disabled_deterministic_sis import DProjSisRPMD, DValSisRPMD
+from ...lazy import lazy_imports
 
-# from .disabled_stochastic import DLRStochasticPolicyModel
+__getattr__, __dir__ = lazy_imports(
+    __name__,
+    {
+        "AProjBasePMD": ".active_deterministic_base",
+        "AValBasePMD": ".active_deterministic_base",
+        "AProjCatRPMD": ".active_deterministic_cat",
+        "AValCatRPMD": ".active_deterministic_cat",
+        "AProjColaRPMD": ".active_deterministic_cola",
+        "AValColaRPMD": ".active_deterministic_cola",
+        "AProjResRPMD": ".active_deterministic_res",
+        "AValResRPMD": ".active_deterministic_res",
+        "AProjRopRPMD": ".active_deterministic_rop",
+        "AValRopRPMD": ".active_deterministic_rop",
+        "AProjSisRPMD": ".active_deterministic_sis",
+        "AValSisRPMD": ".active_deterministic_sis",
+        "DProjBasePMD": ".disabled_deterministic_base",
+        "DValBasePMD": ".disabled_deterministic_base",
+        "run_dlr_batch": ".disabled_deterministic_batch",
+        "ReserveFactors": ".disabled_deterministic_factors",
+        "build_reserve_factors": ".disabled_deterministic_factors",
+        "load_reserve_factors": ".disabled_deterministic_factors",
+        "run_dlr_factors": ".disabled_deterministic_factors",
+        "DProjCatRPMD": ".disabled_deterministic_cat",
+        "DValCatRPMD": ".disabled_deterministic_cat",
+        "DProjColaRPMD": ".disabled_deterministic_cola",
+        "DValColaRPMD": ".disabled_deterministic_cola",
+        "DProjResRPMD": ".disabled_deterministic_res",
+        "DValResRPMD": ".disabled_deterministic_res",
+        "DProjSisRPMD": ".disabled_deterministic_sis",
+        "DValSisRPMD": ".disabled_deterministic_sis",
+        # "DLRStochasticPolicyModel": ".disabled_stochastic",
+    },
+)
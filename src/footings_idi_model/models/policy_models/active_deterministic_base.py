@@ -1,5 +1,5 @@
+import inspect
 from datetime import date
-from inspect import getfullargspec
 
 import pandas as pd
 from footings.actuarial_tools import (
@@ -9,12 +9,9 @@ from footings.actuarial_tools import (
     calc_pv,
     calc_pvfnb,
     calculate_age,
-    convert_to_records,
     create_frame,
     frame_add_weights,
 )
-from footings.exceptions import ModelRunError
-from footings.jigs import create_foreach_jig
 from footings.model import def_intermediate, def_meta, def_return, model, step
 from footings.utils import get_kws
 
@@ -32,8 +29,10 @@ from ..shared import (
     modifier_mortality,
     param_assumption_set,
     param_net_benefit_method,
+    param_time_0_only,
     param_valuation_dt,
 )
+from .active_deterministic_claim_cost import ClaimCostModel
 from .disabled_deterministic_base import STEPS as CC_STEPS
 from .disabled_deterministic_base import DValBasePMD
 
@@ -97,20 +96,7 @@ class ActiveLifeBaseClaimCostModel(DValBasePMD):
     )
 
 
-def _constant_params():
-    kwargs = getfullargspec(ActiveLifeBaseClaimCostModel).kwonlyargs
-    kwargs.remove("incurred_dt")
-    kwargs.remove("valuation_dt")
-    return tuple(kwargs)
-
-
-claim_cost_model = create_foreach_jig(
-    ActiveLifeBaseClaimCostModel,
-    iterator_name="records",
-    iterator_keys=("policy_id", "valuation_dt",),
-    pass_iterator_keys=("policy_id", "valuation_dt",),
-    constant_params=_constant_params(),
-)
+claim_cost_model = ClaimCostModel(ActiveLifeBaseClaimCostModel)
 
 
 #########################################################################################
@@ -136,6 +122,14 @@ STEPS = [
 ]
 
 
+def _get_batch_kws(func, obj, **arrays):
+    """Get the kwargs for a batched assumption (arrays are passed while the remaining
+    parameters are pulled from obj)."""
+    parameters = inspect.signature(func).parameters
+    kws = {p: getattr(obj, p) for p in parameters if p not in arrays}
+    return {**kws, **{k: v for k, v in arrays.items() if k in parameters}}
+
+
 def _assign_end_date(frame):
     frame["DATE_ED"] = frame["DATE_BD"].shift(-1, fill_value=frame["DATE_BD"].iat[-1])
     return frame[frame.index != max(frame.index)]
@@ -154,16 +148,17 @@ class AValBasePMD(ALRBasePMD):
         dtype=str,
         description="The coverage id which recognizes base policy vs riders.",
     )
+    time_0_only = param_time_0_only
 
     # intermediate objects
     age_issued = def_intermediate(
         dtype=date, description="The calculate age policy was issued."
     )
     lapse_rates = def_intermediate(
-        dtype=pd.DataFrame, description="The placholder for lapse rates."
+        dtype=pd.Series, description="The lapse rate for each policy duration."
     )
     mortality_rates = def_intermediate(
-        dtype=pd.DataFrame, description="The placholder for lapse rates."
+        dtype=pd.Series, description="The mortality rate for each policy duration."
     )
     incidence_rates = def_intermediate(
         dtype=pd.DataFrame, description="The placholder for incidence rates."
@@ -270,35 +265,25 @@ class AValBasePMD(ALRBasePMD):
 
     @step(
         name="Model Claim Cost",
-        uses=["frame", "claim_cost_model",],
+        uses=["frame", "claim_cost_model", "modifier_ctr", "modifier_interest"],
         impacts=["modeled_claim_cost"],
     )
     def _model_claim_cost(self):
-        """Model claim cost for active live if policy holder were to become disabled for each policy duration"""
-
-        # create records
-        record_cols = ["policy_id", "incurred_dt", "valuation_dt", "termination_dt"]
-        frame = self.frame[["DATE_BD", "TERMINATION_DT"]].assign(
-            policy_id=self.policy_id,
-            incurred_dt=lambda df: df.DATE_BD,
-            valuation_dt=lambda df: df.DATE_BD,
-            termination_dt=lambda df: df.TERMINATION_DT,
-        )[record_cols]
-        records = convert_to_records(frame)
-
-        # model disabled lives
-        kwargs = {
-            kw: getattr(self, kw)
-            for kw in self.claim_cost_model.constant_params
-            if kw not in record_cols + ["claim_id", "idi_diagnosis_grp"]
-        }
-        success, errors = self.claim_cost_model(
-            records=records, claim_id="NA", idi_diagnosis_grp="AG", **kwargs,
+        """Model claim cost for active live if policy holder were to become disabled for each policy duration.
+
+        The claim cost for all policy durations is calculated at once by the claim cost
+        model (see ClaimCostModel).
+        """
+        kwargs = {kw: getattr(self, kw) for kw in self.claim_cost_model.constant_params}
+        claim_cost = self.claim_cost_model(
+            incurred_dt=self.frame["DATE_BD"],
+            termination_dt=self.frame["TERMINATION_DT"],
+            idi_diagnosis_grp="AG",
+            **kwargs,
         )
-        if len(errors) == 0:
-            self.modeled_claim_cost = {y: val for y, val in enumerate(success, start=1)}
-        else:
-            raise ModelRunError(str(errors))
+        self.modeled_claim_cost = {
+            y: val for y, val in enumerate(claim_cost.tolist(), start=1)
+        }
 
     #####################################################################################
     # Step: Get Incidence Rate
@@ -306,7 +291,8 @@ class AValBasePMD(ALRBasePMD):
 
     @step(
         name="Get Incidence Rate",
-        uses=[],  # idi_assumptions.uses("incidence_rate", "assumption_set"),
+        # idi_assumptions.uses("incidence_rate", "assumption_set"),
+        uses=["modifier_incidence"],
         impacts=["incidence_rates"],
     )
     def _get_incidence_rates(self):
@@ -320,13 +306,25 @@ class AValBasePMD(ALRBasePMD):
 
     @step(
         name="Get Mortality Rates",
-        uses=[],  # assumptions.uses("mortality_rate", "assumption_set"),
+        # assumptions.uses("mortality_rate", "assumption_set"),
+        uses=["frame", "modifier_mortality"],
         impacts=["mortality_rates"],
     )
     def _get_mortality_rates(self):
-        """Get lapse rates and multiply by incidence sensitivity to form final rate."""
-        assumption_func = idi_assumptions.get(self.assumption_set, "mortality_rates")
-        self.mortality_rates = assumption_func(**get_kws(assumption_func, self))
+        """Get mortality rates by age attained for each duration."""
+        assumption_func = idi_assumptions.get(
+            self.assumption_set, "mortality_rates_batch"
+        )
+        rates = assumption_func(
+            **_get_batch_kws(
+                assumption_func,
+                self,
+                age_attained=self.frame["AGE_ATTAINED"].to_numpy(dtype=int),
+            )
+        )
+        self.mortality_rates = pd.Series(
+            rates, index=self.frame.index, name="MORTALITY_RATE"
+        )
 
     #####################################################################################
     # Step: Get Lapse Rates
@@ -334,13 +332,21 @@ class AValBasePMD(ALRBasePMD):
 
     @step(
         name="Get Lapse Rates",
-        uses=[],  # assumptions.uses("lapse_rate", "assumption_set"),
+        # assumptions.uses("lapse_rate", "assumption_set"),
+        uses=["frame", "modifier_lapse"],
         impacts=["lapse_rates"],
     )
     def _get_lapse_rates(self):
-        """Get lapse rates and multiply by incidence sensitivity to form final rate."""
-        assumption_func = idi_assumptions.get(self.assumption_set, "lapse_rates")
-        self.lapse_rates = assumption_func(**get_kws(assumption_func, self))
+        """Get lapse rates by duration year for each duration."""
+        assumption_func = idi_assumptions.get(self.assumption_set, "lapse_rates_batch")
+        rates = assumption_func(
+            **_get_batch_kws(
+                assumption_func,
+                self,
+                duration_year=self.frame["DURATION_YEAR"].to_numpy(dtype=int),
+            )
+        )
+        self.lapse_rates = pd.Series(rates, index=self.frame.index, name="LAPSE_RATE")
 
     #####################################################################################
     # Step: Calculate Premiums
@@ -385,7 +391,7 @@ class AValBasePMD(ALRBasePMD):
         )
 
         # add modeled claim cost (i.e., DLR)
-        self.frame["DLR"] = [df["DLR"].iat[0] for df in self.modeled_claim_cost.values()]
+        self.frame["DLR"] = list(self.modeled_claim_cost.values())
 
         # calculate benefit cost
         self.frame["BENEFIT_COST"] = self.frame["DLR"] * self.frame["INCIDENCE_RATE"]
@@ -394,23 +400,16 @@ class AValBasePMD(ALRBasePMD):
     # Step: Calculate Lives
     #####################################################################################
 
-    @step(name="Calculate Lives", uses=["frame", "lapse_rates"], impacts=["frame"])
+    @step(
+        name="Calculate Lives",
+        uses=["frame", "mortality_rates", "lapse_rates"],
+        impacts=["frame"],
+    )
     def _calculate_lives(self):
         """Calculate the beginning, middle, and ending lives for each duration using lapse rates."""
-        # merge mortality rates
-        self.frame = self.frame.merge(
-            self.mortality_rates[["AGE_ATTAINED", "MORTALITY_RATE"]],
-            how="left",
-            on=["AGE_ATTAINED"],
-        )
-
-        # merge lapse rates
-        self.frame = self.frame.merge(
-            self.lapse_rates[["DURATION_YEAR", "LAPSE_RATE"]],
-            how="left",
-            on=["DURATION_YEAR"],
-        )
-        self.frame["LAPSE_RATE"] = self.frame["LAPSE_RATE"].ffill()
+        # add mortality and lapse rates (already aligned to the frame)
+        self.frame["MORTALITY_RATE"] = self.mortality_rates
+        self.frame["LAPSE_RATE"] = self.lapse_rates
 
         # calculate lives
         lives_ed = calc_continuance(
@@ -435,7 +434,9 @@ class AValBasePMD(ALRBasePMD):
     #####################################################################################
 
     @step(
-        name="Calculate Discount Factors", uses=["frame"], impacts=["frame"],
+        name="Calculate Discount Factors",
+        uses=["frame", "modifier_interest"],
+        impacts=["frame"],
     )
     def _calculate_discount(self):
         """Calculate beginning, middle, and ending discount factors for each duration."""
@@ -491,17 +492,22 @@ class AValBasePMD(ALRBasePMD):
 
     @step(
         name="Calculate Valuation Date ALR",
-        uses=["frame", "valuation_dt"],
+        uses=["frame", "valuation_dt", "time_0_only"],
         impacts=["frame"],
     )
     def _calculate_valuation_dt_alr(self):
-        """Calculate active life reserves (ALR) for each duration as of valuation date."""
+        """Calculate active life reserves (ALR) for each duration as of valuation date.
+
+        When time_0_only is True, only the ALR as of the valuation date is calculated.
+        """
 
         def alr_date(period):
             return self.valuation_dt + pd.DateOffset(years=period)
 
         # filter frame to valuation_dt starting in duration
         self.frame = self.frame[self.frame["DATE_ED"] >= self.valuation_dt].copy()
+        if self.time_0_only:
+            self.frame = self.frame.iloc[:1]
 
         # create projected alr date column
         self.frame["ALR_DATE"] = pd.to_datetime(
@@ -0,0 +1,419 @@
+from collections import OrderedDict, namedtuple
+from inspect import getfullargspec
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+from .disabled_deterministic_batch import (
+    SELECT_MONTHS,
+    _add_months,
+    _AssumptionCache,
+    _calculate_benefit,
+    _calculate_ctr,
+    _calculate_dlr,
+    _calculate_exposure,
+    _model_meta,
+    _month_diff,
+    _prepare_record,
+    _project_block,
+    _reverse_cumsum,
+    _shift_left,
+    _split_dates,
+    _to_days,
+)
+
+#########################################################################################
+# Claim Cost Engine
+#
+# The claim cost for an active life in each policy duration is the DLR as of the
+# incurred date for a claim incurred at the start of the duration. Instead of running a
+# full monthly projection per duration, the select period (first 120 claim months) is
+# projected for all durations at once and the ultimate period, which only depends on
+# the calendar month, is calculated once with a backward recursion and shared by every
+# duration.
+#########################################################################################
+
+RECORD_PARAMS = (
+    "policy_id",
+    "claim_id",
+    "incurred_dt",
+    "valuation_dt",
+    "termination_dt",
+    "idi_diagnosis_grp",
+)
+
+# parameters of the disabled life models that only change the output frame (not the DLR)
+OUTPUT_PARAMS = ("time_0_only",)
+
+# riders where the monthly benefit depends on the claim duration (i.e., cannot share the
+# ultimate period between policy durations)
+DURATION_BENEFITS = ("COLA",)
+
+# coverages where the monthly benefit is proportional to the benefit amount (i.e., the
+# claim cost per $1 of benefit amount is shared by every benefit amount) - the other
+# riders round the monthly benefit to cents
+UNIT_BENEFITS = ("BASE", "CAT")
+
+
+def _has_shared_tail(items, coverage_id):
+    """Check if the ultimate period can be shared between the long claims."""
+    if coverage_id in DURATION_BENEFITS:
+        return False
+    long_items = [item for item in items if item["length"] > SELECT_MONTHS]
+    if len(long_items) == 0:
+        return False
+    anchor = long_items[0]
+    for item in long_items:
+        if item["termination_dt"] != anchor["termination_dt"]:
+            return False
+        months = (item["incurred_dt"].year - anchor["incurred_dt"].year) * 12 + (
+            item["incurred_dt"].month - anchor["incurred_dt"].month
+        )
+        # monthly durations need to line up with the anchor's monthly durations (i.e.,
+        # not the case for a policy starting on a leap day)
+        if item["incurred_dt"] != anchor["incurred_dt"] + pd.DateOffset(months=months):
+            return False
+        if item["incurred_dt"].day != anchor["incurred_dt"].day:
+            return False
+        if anchor["length"] - item["length"] != months:
+            return False
+    return True
+
+
+def _calculate_tail(items, coverage_id):
+    """Calculate the present value of the ultimate period for each long claim.
+
+    The ultimate period is laid out on the monthly grid of the earliest long claim
+    (anchor). For each calendar month c the present value as of the start of c per
+    life inforce is calculated with the backward recursion -
+
+        T(c) = B(c) x (1 - q(c) / 2) x v^0.5 + (1 - q(c)) x v x T(c + 1)
+
+    where q(c) is the ultimate CTR and B(c) is the monthly benefit. A claim starts the
+    ultimate period at its month 121 so its tail value is T(c_121) x lives x discount
+    at the end of month 120.
+    """
+    long_items = [item for item in items if item["length"] > SELECT_MONTHS]
+    anchor = long_items[0]
+    k = np.arange(SELECT_MONTHS, anchor["length"])[None, :]
+    iy, im, id_ = _split_dates(_to_days([anchor["incurred_dt"]]))
+    date_bd = _add_months(iy[:, None], im[:, None], id_[:, None], k)
+    date_ed = _add_months(iy[:, None], im[:, None], id_[:, None], k + 1)
+    age_attained = (anchor["base_months"] + k) // 12
+
+    ctr = _calculate_ctr([anchor], k + 1, age_attained)[0]
+    if np.isnan(ctr).any():
+        return None
+
+    begin_dt = _to_days([anchor["begin_dt"]])[:, None]
+    end_dt = _to_days([anchor["termination_dt"]])[:, None]
+    exposure = _calculate_exposure(date_bd, date_ed, begin_dt, end_dt)
+    frame = {
+        "DURATION_YEAR": k // 12 + 1,
+        "AGE_ATTAINED": age_attained,
+        "VALID": np.ones(k.shape, dtype=bool),
+    }
+    benefit = _calculate_benefit([anchor], coverage_id, exposure, frame)[0]
+
+    tails = {}
+    for item in long_items:
+        rate = item["interest_rate"] * item["modifier_interest"] / 12
+        if rate not in tails:
+            tail = np.zeros(benefit.size + 1)
+            v, v_md = 1 / (1 + rate), 1 / (1 + rate) ** 0.5
+            for c in range(benefit.size - 1, -1, -1):
+                survive = 1 - ctr[c]
+                tail[c] = benefit[c] * (0.5 + 0.5 * survive) * v_md
+                tail[c] += survive * v * tail[c + 1]
+            tails[rate] = tail
+        item["tail"] = tails[rate][anchor["length"] - item["length"]]
+    return True
+
+
+def _calculate_claim_cost(
+    model, coverage_id, incurred_dts, termination_dts, idi_diagnosis_grp, kwargs, cache
+):
+    """Calculate the claim cost (DLR as of the incurred date before rounding) for each
+    incurred date."""
+    items = []
+    for dt_incurred, dt_termination in zip(incurred_dts, termination_dts):
+        record = {
+            **kwargs,
+            "incurred_dt": dt_incurred,
+            "termination_dt": dt_termination,
+            "idi_diagnosis_grp": idi_diagnosis_grp,
+        }
+        item = _prepare_record(record, model, dt_incurred, cache)
+        item["modifier_interest"] = kwargs["modifier_interest"]
+        items.append(item)
+
+    if len(items) == 0:
+        return np.array([], dtype=float)
+
+    proj = None
+    if _has_shared_tail(items, coverage_id) and _calculate_tail(items, coverage_id):
+        proj = _project_block(items, coverage_id, max_width=SELECT_MONTHS)
+        if np.isnan(proj["ctr"][proj["valid"]]).any():
+            proj = None
+        else:
+            last = SELECT_MONTHS - 1
+            pv = proj["pv"].copy()
+            for i, item in enumerate(items):
+                if item["length"] > SELECT_MONTHS:
+                    # lives and discount at the end of the select period
+                    pv[i, last] += (
+                        item["tail"]
+                        * proj["lives_ed"][i, last]
+                        * proj["discount_ed"][i, last]
+                    )
+
+    if proj is None:
+        proj = _project_block(items, coverage_id)
+        pv = proj["pv"]
+
+    pvfb_bd = _reverse_cumsum(pv)
+    pvfb_ed = _shift_left(pvfb_bd, 0.0)
+    return _calculate_dlr(proj, pvfb_bd, pvfb_ed, decimals=None)[:, 0]
+
+
+def _claim_months(incurred_dts, termination_dts, birth_dt, elimination_period):
+    """Describe the claim months of each incurred date by what the claim cost depends on.
+
+    Returns the age incurred in months, the number of projected months, the first month
+    with a benefit paid and the exposure of the first and last paid months. The exposure
+    is 0 before the benefits start, 1 while paid and partial in the first and last
+    months only (see _calculate_exposure).
+    """
+    if len(incurred_dts) == 0:
+        return ([],) * 5
+    incurred = _to_days(incurred_dts)
+    termination = _to_days(termination_dts)
+    iy, im, id_ = _split_dates(incurred)
+    by, bm, _ = _split_dates(_to_days([birth_dt]))
+    base_months = (iy - by) * 12 + (im - bm)
+    n_months = _month_diff(incurred, termination)
+
+    k = np.arange(max(n_months.max(), 1))[None, :]
+    iy, im, id_ = iy[:, None], im[:, None], id_[:, None]
+    begin_dt = incurred + np.timedelta64(int(elimination_period), "D")
+    exposure = _calculate_exposure(
+        _add_months(iy, im, id_, k),
+        _add_months(iy, im, id_, k + 1),
+        begin_dt[:, None],
+        termination[:, None],
+    )
+    exposure = np.where(k < n_months[:, None], exposure, 0.0)
+    rows = np.arange(len(incurred))
+    first_paid = np.argmax(exposure > 0, axis=1)
+    last = np.maximum(n_months - 1, 0)
+    return (
+        base_months.tolist(),
+        n_months.tolist(),
+        first_paid.tolist(),
+        exposure[rows, first_paid].tolist(),
+        exposure[rows, last].tolist(),
+    )
+
+
+#########################################################################################
+# Claim Cost Cache
+#########################################################################################
+
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"]
+)
+
+
+class ClaimCostCache:
+    """A bounded least recently used (LRU) cache of claim costs shared by all claim cost
+    models in the process.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of claim costs to hold. Use 0 to disable the cache.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __deepcopy__(self, memo):
+        # the cache is shared (i.e., copies of a model use the same cache)
+        return self
+
+    def __getstate__(self):
+        # the lock cannot be pickled and the cached values are local to each process
+        return {"maxsize": self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(state["maxsize"])
+
+    def get(self, key):
+        """Get the claim cost for key (None if not cached)."""
+        with self._lock:
+            value = self._data.get(key, None)
+            if value is None:
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Add the claim cost for key evicting the least recently used if full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def cache_info(self):
+        """Report cache statistics."""
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, self.evictions, self.maxsize, len(self._data)
+            )
+
+    def cache_clear(self):
+        """Clear the cache and statistics."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+CLAIM_COST_CACHE_SIZE = 100_000
+
+claim_cost_cache = ClaimCostCache(maxsize=CLAIM_COST_CACHE_SIZE)
+
+
+#########################################################################################
+# Claim Cost Model
+#########################################################################################
+
+
+class ClaimCostModel:
+    """The claim cost model used by the active life models.
+
+    Calculates the DLR as of the incurred date for a set of incurred dates (one for
+    each policy duration) using the DLR logic of the passed disabled life model (i.e.,
+    model mode, coverage and monthly benefit). The result matches running the passed
+    model for each incurred date and taking the time 0 DLR.
+
+    Claim costs are held in a process wide cache so a claim cost shared by many
+    policies (or policy durations) is only calculated once. The cache key is what the
+    claim cost depends on - the model, the rating cell, the sensitivities, the interest
+    rate, the age incurred in months, the number of projected months and the exposure
+    of the partial months (see _claim_months) - instead of the dates. The claim cost of
+    BASE and CAT is cached per $1 of benefit amount (see UNIT_BENEFITS) and scaled to
+    the benefit amount before rounding.
+
+    Parameters
+    ----------
+    model
+        The disabled life model (e.g., ActiveLifeBaseClaimCostModel) the claim cost is
+        based on.
+    cache : ClaimCostCache, optional
+        The cache to use, by default the process wide claim_cost_cache.
+    """
+
+    def __init__(self, model, cache=claim_cost_cache):
+        self.model = model
+        self.cache = cache
+        self.coverage_id = _model_meta(model, "coverage_id")
+        self.constant_params = tuple(
+            param
+            for param in getfullargspec(model).kwonlyargs
+            if param not in RECORD_PARAMS + OUTPUT_PARAMS
+        )
+
+    def __repr__(self):
+        return f"ClaimCostModel({self.model.__qualname__})"
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def _cache_keys(
+        self, incurred_dts, termination_dts, idi_diagnosis_grp, kwargs, cache
+    ):
+        params = tuple(
+            kwargs[param] for param in self.constant_params if param != "birth_dt"
+        )
+        months = _claim_months(
+            incurred_dts,
+            termination_dts,
+            kwargs["birth_dt"],
+            kwargs["elimination_period"],
+        )
+        interest_rates = [cache.get_interest(dt) for dt in incurred_dts]
+        return [
+            (self.model, idi_diagnosis_grp, interest_rate) + claim_months + params
+            for interest_rate, claim_months in zip(interest_rates, zip(*months))
+        ]
+
+    def __call__(
+        self,
+        *,
+        incurred_dt,
+        termination_dt,
+        idi_diagnosis_grp,
+        **kwargs,
+    ):
+        """Calculate the claim cost for each incurred date.
+
+        Parameters
+        ----------
+        incurred_dt
+            The incurred dates (one per policy duration).
+        termination_dt
+            The benefit termination date for each incurred date.
+        idi_diagnosis_grp : str
+            The diagnosis group to use.
+        kwargs
+            The remaining parameters of the model (see constant_params).
+
+        Returns
+        -------
+        np.ndarray
+            The claim cost (DLR as of the incurred date) for each incurred date.
+        """
+        incurred_dts = [pd.Timestamp(dt) for dt in incurred_dt]
+        termination_dts = [pd.Timestamp(dt) for dt in termination_dt]
+        benefit_amount = 1.0
+        if self.coverage_id in UNIT_BENEFITS:
+            benefit_amount = kwargs["benefit_amount"]
+            kwargs = {**kwargs, "benefit_amount": 1.0}
+        cache = _AssumptionCache(kwargs["assumption_set"], kwargs["modifier_ctr"])
+        keys = self._cache_keys(
+            incurred_dts, termination_dts, idi_diagnosis_grp, kwargs, cache
+        )
+        cached = [self.cache.get(key) for key in keys]
+        claim_cost = np.array(
+            [np.nan if value is None else value for value in cached], dtype=float
+        )
+
+        missing = [i for i, value in enumerate(cached) if value is None]
+        if len(missing) > 0:
+            calculated = _calculate_claim_cost(
+                self.model,
+                self.coverage_id,
+                [incurred_dts[i] for i in missing],
+                [termination_dts[i] for i in missing],
+                idi_diagnosis_grp,
+                kwargs,
+                cache,
+            )
+            claim_cost[missing] = calculated
+            for i, value in zip(missing, calculated.tolist()):
+                self.cache.set(keys[i], value)
+        return np.round(claim_cost * benefit_amount, 2)
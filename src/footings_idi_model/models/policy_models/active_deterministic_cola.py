@@ -1,9 +1,7 @@
-from inspect import getfullargspec
-
-from footings.jigs import create_foreach_jig
 from footings.model import def_meta, model
 
 from .active_deterministic_base import STEPS, AValBasePMD
+from .active_deterministic_claim_cost import ClaimCostModel
 from .disabled_deterministic_cola import STEPS as CC_STEPS
 from .disabled_deterministic_cola import DValColaRPMD
 
@@ -23,20 +21,7 @@ class ActiveLifeCOLAClaimCostModel(DValColaRPMD):
     )
 
 
-def _constant_params():
-    kwargs = getfullargspec(ActiveLifeCOLAClaimCostModel).kwonlyargs
-    kwargs.remove("incurred_dt")
-    kwargs.remove("valuation_dt")
-    return tuple(kwargs)
-
-
-claim_cost_model = create_foreach_jig(
-    ActiveLifeCOLAClaimCostModel,
-    iterator_name="records",
-    iterator_keys=("policy_id", "valuation_dt",),
-    pass_iterator_keys=("policy_id", "valuation_dt",),
-    constant_params=_constant_params(),
-)
+claim_cost_model = ClaimCostModel(ActiveLifeCOLAClaimCostModel)
 
 
 #########################################################################################
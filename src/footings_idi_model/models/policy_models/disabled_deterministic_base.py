@@ -22,6 +22,7 @@ from ..shared import (
     modifier_ctr,
     modifier_interest,
     param_assumption_set,
+    param_time_0_only,
     param_valuation_dt,
 )
 
@@ -103,6 +104,7 @@ class DValBasePMD(DLRBasePMD):
         dtype=str,
         description="The coverage id which recognizes base policy vs riders.",
     )
+    time_0_only = param_time_0_only
 
     # intermediate objects
     age_incurred = def_intermediate(
@@ -211,6 +213,7 @@ class DValBasePMD(DLRBasePMD):
             "elimination_period",
             "age_incurred",
             "cola_percent",
+            "modifier_ctr",
         ],
         impacts=["ctr_table"],
     )
@@ -277,7 +280,7 @@ class DValBasePMD(DLRBasePMD):
 
     @step(
         name="Calculate Discount Factors",
-        uses=["frame", "incurred_dt"],
+        uses=["frame", "incurred_dt", "modifier_interest"],
         impacts=["frame"],
     )
     def _calculate_discount(self):
@@ -313,9 +316,19 @@ class DValBasePMD(DLRBasePMD):
     # Step: Calculate DLR
     #####################################################################################
 
-    @step(name="Calculate DLR", uses=["frame", "valuation_dt"], impacts=["frame"])
+    @step(
+        name="Calculate DLR",
+        uses=["frame", "valuation_dt", "time_0_only"],
+        impacts=["frame"],
+    )
     def _calculate_dlr(self):
-        """Calculate disabled life reserves (DLR) for each duration as of valuation date."""
+        """Calculate disabled life reserves (DLR) for each duration as of valuation date.
+
+        When time_0_only is True, only the DLR as of the valuation date is calculated
+        (PVFB_BD and PVFB_ED of the first row already hold the full backward sum).
+        """
+        if self.time_0_only:
+            self.frame = self.frame.iloc[:1].copy()
 
         def dlr_date(period):
             return self.valuation_dt + pd.DateOffset(months=period)
@@ -0,0 +1,673 @@
+import sys
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from attr import Factory, fields_dict
+from footings.exceptions import Error
+
+from ...assumptions import idi_assumptions
+from ...outputs import DisabledLivesValOutput
+from ..sensitivities import scenario_error_key
+from ..timings import StepTimings
+from .disabled_deterministic_base import DValBasePMD
+from .disabled_deterministic_cat import DValCatRPMD
+from .disabled_deterministic_cola import DValColaRPMD
+from .disabled_deterministic_res import DValResRPMD
+from .disabled_deterministic_sis import DValSisRPMD
+
+#########################################################################################
+# Batch DLR Engine
+#
+# Values a block of disabled life records together using numpy arrays instead of
+# running each record through its own policy model. Every calculation mirrors the
+# respective step in DValBasePMD (and rider children) so the projected frame is
+# identical to the one produced by the policy models.
+#########################################################################################
+
+BATCH_MODELS = {
+    "BASE": DValBasePMD,
+    "CAT": DValCatRPMD,
+    "COLA": DValColaRPMD,
+    "RES": DValResRPMD,
+    "SIS": DValSisRPMD,
+}
+
+BLOCK_SIZE = 1000
+
+SELECT_MONTHS = 120
+
+SIS_PROBABILITY = 0.7
+
+ITERATOR_KEYS = ("policy_id", "coverage_id")
+
+CTR_KEYS = [
+    "age_incurred",
+    "idi_benefit_period",
+    "idi_contract",
+    "idi_diagnosis_grp",
+    "idi_occupation_class",
+    "gender",
+    "elimination_period",
+    "cola_percent",
+    "model_mode",
+]
+
+
+def _model_meta(model, name):
+    default = fields_dict(model)[name].default
+    if isinstance(default, Factory):
+        # resolved on first use (e.g., the last git commit)
+        return default.factory()
+    return default
+
+
+#########################################################################################
+# Date helpers
+#########################################################################################
+
+
+def _to_days(values):
+    """Convert dates to numpy datetime64[D]."""
+    return np.asarray(pd.to_datetime(values).values).astype("datetime64[D]")
+
+
+def _split_dates(dates):
+    """Split datetime64[D] array into year, month and day arrays."""
+    months = dates.astype("datetime64[M]")
+    year = months.astype("datetime64[Y]").astype(int) + 1970
+    month = months.astype(int) % 12 + 1
+    day = (dates - months.astype("datetime64[D]")).astype(int) + 1
+    return year, month, day
+
+
+def _add_months(year, month, day, months):
+    """Add months to a date (as year, month, day) clipping to the end of month which
+    matches start_dt + pd.DateOffset(months=months).
+    """
+    total = year * 12 + (month - 1) + months
+    month_start = (total - 1970 * 12).astype("datetime64[M]")
+    days_in_month = (
+        (month_start + 1).astype("datetime64[D]") - month_start.astype("datetime64[D]")
+    ).astype(int)
+    return month_start.astype("datetime64[D]") + (np.minimum(day, days_in_month) - 1)
+
+
+def _month_diff(start, end):
+    """The number of monthly periods needed for a frame going from start to end."""
+    sy, sm, sd = _split_dates(start)
+    ey, em, ed = _split_dates(end)
+    return (ey - sy) * 12 + (em - sm) + (ed > sd)
+
+
+def _days(delta):
+    return delta.astype("timedelta64[D]").astype(int)
+
+
+#########################################################################################
+# Array helpers
+#########################################################################################
+
+
+def _shift_right(arr, fill_value):
+    ret = np.empty_like(arr)
+    ret[:, 0] = fill_value
+    ret[:, 1:] = arr[:, :-1]
+    return ret
+
+
+def _shift_left(arr, fill_value):
+    ret = np.empty_like(arr)
+    ret[:, -1] = fill_value
+    ret[:, :-1] = arr[:, 1:]
+    return ret
+
+
+def _nan_cumprod(arr):
+    """Cumulative product along rows skipping NaN values (as pd.Series.cumprod)."""
+    mask = np.isnan(arr)
+    ret = np.cumprod(np.where(mask, 1.0, arr), axis=1)
+    ret[mask] = np.nan
+    return ret
+
+
+def _nan_to_one(arr):
+    return np.where(np.isnan(arr), 1.0, arr)
+
+
+def _reverse_cumsum(arr):
+    return np.cumsum(arr[:, ::-1], axis=1)[:, ::-1]
+
+
+#########################################################################################
+# Assumptions
+#########################################################################################
+
+
+class _AssumptionCache:
+    """Cache assumption lookups so each assumption (and interest rate) is only pulled
+    once for a run.
+
+    Failed lookups are cached as the raised exception which is raised again for every
+    record using the assumption.
+    """
+
+    def __init__(self, assumption_set, modifier_ctr):
+        self.assumption_set = assumption_set
+        self.modifier_ctr = modifier_ctr
+        self.assumptions = {}
+        self.interest = {}
+
+    @staticmethod
+    def _get(cache, key, func):
+        if key not in cache:
+            try:
+                cache[key] = func()
+            except Exception as exc:
+                cache[key] = exc
+        ret = cache[key]
+        if isinstance(ret, Exception):
+            raise ret
+        return ret
+
+    def get_assumption(self, name):
+        return self._get(
+            self.assumptions,
+            name,
+            lambda: idi_assumptions.get(self.assumption_set, name),
+        )
+
+    def get_interest(self, incurred_dt):
+        func = self.get_assumption("interest_rate_dl")
+        return self._get(
+            self.interest, incurred_dt, lambda: func(incurred_dt=incurred_dt)
+        )
+
+
+#########################################################################################
+# Monthly benefits
+#########################################################################################
+
+
+def _benefit_base(block, exposure, frame):
+    return exposure * block["benefit_amount"][:, None]
+
+
+def _benefit_cola(block, exposure, frame):
+    duration_year = frame["DURATION_YEAR"]
+    is_65 = (frame["AGE_ATTAINED"] == 65) & frame["VALID"]
+    has_65 = is_65.any(axis=1)
+    first_65 = np.argmax(is_65, axis=1)
+    upper = duration_year[np.arange(duration_year.shape[0]), first_65]
+    power = np.where(
+        has_65[:, None], np.minimum(duration_year, upper[:, None]), duration_year
+    )
+    benefit = block["benefit_amount"][:, None]
+    cola = (1 + block["cola_percent"][:, None]) ** (power - 1)
+    return np.round(exposure * ((benefit * cola) - benefit), 2)
+
+
+def _benefit_res(block, exposure, frame):
+    return np.round(
+        exposure
+        * block["benefit_amount"][:, None]
+        * block["residual_benefit_percent"][:, None],
+        2,
+    )
+
+
+def _benefit_sis(block, exposure, frame):
+    return np.round(
+        exposure * block["benefit_amount"][:, None] * (1 - SIS_PROBABILITY), 2
+    )
+
+
+BENEFIT_FUNCTIONS = {
+    "BASE": _benefit_base,
+    "CAT": _benefit_base,
+    "COLA": _benefit_cola,
+    "RES": _benefit_res,
+    "SIS": _benefit_sis,
+}
+
+
+#########################################################################################
+# Record preparation
+#########################################################################################
+
+
+def _prepare_record(record, model, valuation_dt, cache):
+    """Calculate the scalar values needed for a record and validate the record can be
+    projected (mirroring the scalar steps of DValBasePMD).
+    """
+    model_mode = _model_meta(model, "model_mode")
+    birth_dt = pd.Timestamp(record["birth_dt"])
+    incurred_dt = pd.Timestamp(record["incurred_dt"])
+    termination_dt = pd.Timestamp(record["termination_dt"])
+    start_pay_dt = incurred_dt + pd.DateOffset(days=record["elimination_period"])
+    base_months = (incurred_dt.year - birth_dt.year) * 12 + (
+        incurred_dt.month - birth_dt.month
+    )
+    age_incurred = int(round(base_months / 12))
+
+    # frame runs over duration months k = 0, ..., n_months - 1
+    n_months = (termination_dt.year - incurred_dt.year) * 12 + (
+        termination_dt.month - incurred_dt.month
+    )
+    if termination_dt.day > incurred_dt.day:
+        n_months += 1
+
+    # first duration with an end date on or after the valuation date
+    first = (valuation_dt.year - incurred_dt.year) * 12 + (
+        valuation_dt.month - incurred_dt.month
+    )
+    first = max(first - 1, 0)
+    while (
+        first < n_months and incurred_dt + pd.DateOffset(months=first + 1) < valuation_dt
+    ):
+        first += 1
+    date_bd = incurred_dt + pd.DateOffset(months=first)
+    date_ed = incurred_dt + pd.DateOffset(months=first + 1)
+    if first >= n_months or date_bd > valuation_dt:
+        msg = "The claim has no projection month at or after the valuation date "
+        msg += f"{valuation_dt:%Y-%m-%d} (incurred {incurred_dt:%Y-%m-%d} with benefits "
+        msg += f"terminating {termination_dt:%Y-%m-%d})."
+        raise IndexError(msg)
+    wt_bd = (date_ed - valuation_dt).days / (date_ed - date_bd).days
+
+    ctr_params = {
+        "age_incurred": age_incurred,
+        "idi_benefit_period": record["idi_benefit_period"],
+        "idi_contract": record["idi_contract"],
+        "idi_diagnosis_grp": record["idi_diagnosis_grp"],
+        "idi_occupation_class": record["idi_occupation_class"],
+        "gender": record["gender"],
+        "elimination_period": record["elimination_period"],
+        "cola_percent": record["cola_percent"],
+        "model_mode": model_mode,
+    }
+    ctr_rates = cache.get_assumption("ctr_rates")
+    interest_rate = cache.get_interest(incurred_dt)
+
+    ret = {
+        "record": record,
+        "model": model,
+        "incurred_dt": incurred_dt,
+        "begin_dt": max(valuation_dt, start_pay_dt),
+        "termination_dt": termination_dt,
+        "base_months": base_months,
+        "first": first,
+        "length": n_months - first,
+        "wt_bd": wt_bd,
+        "ctr_rates": ctr_rates,
+        "ctr_params": ctr_params,
+        "modifier_ctr": cache.modifier_ctr,
+        # the ultimate rates are used when the claim runs past the select period
+        "use_ultimate": n_months > SELECT_MONTHS,
+        "interest_rate": interest_rate,
+        "benefit_amount": record["benefit_amount"],
+        "cola_percent": record["cola_percent"],
+    }
+    if _model_meta(model, "coverage_id") == "RES":
+        ret["residual_benefit_percent"] = record["residual_benefit_percent"]
+    return ret
+
+
+#########################################################################################
+# Block valuation
+#########################################################################################
+
+
+def _stack(items, name, dtype=float):
+    return np.array([item[name] for item in items], dtype=dtype)
+
+
+def _calculate_ctr(items, duration_month, age_attained):
+    """Calculate the monthly CTR for a block using the compiled CTR tables."""
+    params = {
+        key: _stack([item["ctr_params"] for item in items], key, object)
+        for key in CTR_KEYS
+    }
+    return items[0]["ctr_rates"](
+        duration_month=duration_month,
+        age_attained=age_attained,
+        use_ultimate=_stack(items, "use_ultimate", bool),
+        modifier_ctr=_stack(items, "modifier_ctr"),
+        **params,
+    )
+
+
+def _calculate_exposure(date_bd, date_ed, begin_dt, end_dt):
+    """Calculate benefit exposure (as frame_add_exposure) for each duration."""
+    days_period = _days(date_ed - date_bd)
+    begin_days = np.clip(_days(date_ed - begin_dt), 0, None)
+    end_days = np.clip(_days(date_ed - end_dt), 0, None)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.select(
+            [begin_days == 0, begin_days <= days_period, end_days > 0],
+            [
+                0,
+                begin_days / days_period,
+                np.clip(1 - ((end_days - 1) / days_period), 0, 1),
+            ],
+            default=1.0,
+        )
+
+
+def _calculate_benefit(items, coverage_id, exposure, frame):
+    block = {"benefit_amount": _stack(items, "benefit_amount")}
+    block["cola_percent"] = _stack(items, "cola_percent")
+    if coverage_id == "RES":
+        block["residual_benefit_percent"] = _stack(items, "residual_benefit_percent")
+    return BENEFIT_FUNCTIONS[coverage_id](block, exposure, frame)
+
+
+def _project_block(items, coverage_id, max_width=None):
+    """Project a block of prepared records (all with the same coverage id) through
+    PVFB. When max_width is passed, the projection is cut off after max_width months.
+    """
+    n = len(items)
+    lengths = _stack(items, "length", int)
+    if max_width is not None:
+        lengths = np.minimum(lengths, max_width)
+    width = lengths.max()
+    j = np.arange(width)[None, :]
+    valid = j < lengths[:, None]
+    k = _stack(items, "first", int)[:, None] + j
+
+    # frame
+    iy, im, id_ = _split_dates(_to_days([item["incurred_dt"] for item in items]))
+    iy, im, id_ = iy[:, None], im[:, None], id_[:, None]
+    date_bd = _add_months(iy, im, id_, k)
+    date_ed = _add_months(iy, im, id_, k + 1)
+    duration_month = k + 1
+    duration_year = k // 12 + 1
+    age_attained = (_stack(items, "base_months", int)[:, None] + k) // 12
+    wt_bd = np.broadcast_to(_stack(items, "wt_bd")[:, None], (n, width))
+    wt_ed = 1 - wt_bd
+    frame = {
+        "DURATION_YEAR": duration_year,
+        "AGE_ATTAINED": age_attained,
+        "VALID": valid,
+    }
+
+    # lives
+    ctr = _calculate_ctr(items, duration_month, age_attained)
+    lives_ed = _nan_cumprod(1 - ctr)
+    lives_bd = _shift_right(lives_ed, 1.0)
+    lives_md = lives_bd * 0.5 + lives_ed * 0.5
+
+    # benefits
+    begin_dt = _to_days([item["begin_dt"] for item in items])[:, None]
+    end_dt = _to_days([item["termination_dt"] for item in items])[:, None]
+    exposure = _calculate_exposure(date_bd, date_ed, begin_dt, end_dt)
+    benefit = _calculate_benefit(items, coverage_id, exposure, frame)
+
+    # discount
+    interest_rate = np.broadcast_to(
+        (_stack(items, "interest_rate") * _stack(items, "modifier_interest"))[:, None]
+        / 12,
+        (n, width),
+    )
+    cum = np.cumprod(1 + interest_rate, axis=1)
+    cum_bd = _shift_right(cum, 1.0)
+    discount_bd = 1 / (cum_bd * (1 + interest_rate) ** 0)
+    discount_md = 1 / (cum_bd * (1 + interest_rate) ** 0.5)
+    discount_ed = 1 / cum
+
+    # pvfb (before summing)
+    pv = _nan_to_one(benefit) * _nan_to_one(lives_md) * _nan_to_one(discount_md)
+    pv = np.where(valid, pv, 0.0)
+
+    return {
+        "n": n,
+        "width": width,
+        "lengths": lengths,
+        "j": j,
+        "valid": valid,
+        "date_bd": date_bd,
+        "date_ed": date_ed,
+        "duration_month": duration_month,
+        "duration_year": duration_year,
+        "wt_bd": wt_bd,
+        "wt_ed": wt_ed,
+        "ctr": ctr,
+        "lives_bd": lives_bd,
+        "lives_md": lives_md,
+        "lives_ed": lives_ed,
+        "benefit": benefit,
+        "discount_bd": discount_bd,
+        "discount_md": discount_md,
+        "discount_ed": discount_ed,
+        "pv": pv,
+    }
+
+
+def _calculate_dlr(proj, pvfb_bd, pvfb_ed, decimals=2):
+    """Calculate the DLR as of the valuation date (as DValBasePMD._calculate_dlr). When
+    decimals is None, the DLR is not rounded."""
+    lives_vd = proj["lives_bd"] * proj["wt_bd"] + proj["lives_ed"] * proj["wt_ed"]
+    dlr = (pvfb_bd * proj["wt_bd"] + pvfb_ed * proj["wt_ed"]) / lives_vd / lives_vd
+    if decimals is None:
+        return dlr
+    return np.round(dlr, decimals)
+
+
+def _value_block(items, coverage_id, valuation_dt, time_0_only=False):
+    """Value a block of prepared records (all with the same coverage id). When
+    time_0_only is True, only the first month (the valuation date) is output."""
+    proj = _project_block(items, coverage_id)
+    n, width, j, valid = proj["n"], proj["width"], proj["j"], proj["valid"]
+    lengths = proj["lengths"]
+    pvfb_bd = _reverse_cumsum(proj["pv"])
+    pvfb_ed = _shift_left(pvfb_bd, 0.0)
+    if time_0_only:
+        valid = valid & (j == 0)
+        lengths = np.minimum(lengths, 1)
+
+    # dlr
+    vy, vm, vd = _split_dates(_to_days([valuation_dt]))
+    date_dlr = _add_months(vy, vm, vd, j)
+    dlr = _calculate_dlr(proj, pvfb_bd, pvfb_ed)
+
+    # output
+    model = items[0]["model"]
+    rows = np.repeat(np.arange(n), lengths)
+    columns = {
+        "DATE_BD": proj["date_bd"][valid].astype("datetime64[ns]"),
+        "DATE_ED": proj["date_ed"][valid].astype("datetime64[ns]"),
+        "DURATION_YEAR": pd.array(proj["duration_year"][valid], dtype="Int64"),
+        "DURATION_MONTH": pd.array(proj["duration_month"][valid], dtype="Int64"),
+        "BENEFIT_AMOUNT": pd.array(proj["benefit"][valid], dtype="Float64"),
+        "CTR": proj["ctr"][valid],
+        "LIVES_BD": proj["lives_bd"][valid],
+        "LIVES_MD": proj["lives_md"][valid],
+        "LIVES_ED": proj["lives_ed"][valid],
+        "DISCOUNT_BD": proj["discount_bd"][valid],
+        "DISCOUNT_MD": proj["discount_md"][valid],
+        "DISCOUNT_ED": proj["discount_ed"][valid],
+        "PVFB_BD": pvfb_bd[valid],
+        "PVFB_ED": pvfb_ed[valid],
+        "DATE_DLR": np.broadcast_to(date_dlr, (n, width))[valid].astype("datetime64[ns]"),
+        "DLR": dlr[valid],
+    }
+    return pd.DataFrame(
+        {
+            "MODEL_VERSION": _model_meta(model, "model_version"),
+            "LAST_COMMIT": _model_meta(model, "last_commit"),
+            "RUN_DATE_TIME": _model_meta(model, "run_date_time"),
+            "SOURCE": model.__qualname__,
+            "POLICY_ID": _stack(items, "policy_id", object)[rows],
+            "CLAIM_ID": _stack(items, "claim_id", object)[rows],
+            "COVERAGE_ID": coverage_id,
+            **columns,
+            "_POSITION": _stack(items, "position", int)[rows],
+            "_ROW": j.repeat(n, axis=0)[valid],
+        }
+    )
+
+
+#########################################################################################
+# Batch runner
+#########################################################################################
+
+
+def _error_key(record, scenario=None):
+    key = ({k: record.get(k) for k in ITERATOR_KEYS},)
+    if scenario is None:
+        return key
+    return scenario_error_key(key, scenario)
+
+
+def _value_groups(groups, valuation_dt, time_0_only, block_size, timings, scenario=None):
+    """Value prepared records grouped by coverage id in blocks of similar length.
+
+    When a block fails, its records are valued one at a time so only the failing
+    records are captured as errors (keyed by the record and the scenario if passed).
+
+    Returns
+    -------
+    tuple
+        The frames of the blocks and the errors as (position, error) pairs.
+    """
+    frames, errors = [], []
+    for coverage_id, items in groups.items():
+        items = sorted(items, key=lambda item: item["length"])
+        for start in range(0, len(items), block_size):
+            block = items[start : start + block_size]
+            block_start = perf_counter()
+            try:
+                frames.append(_value_block(block, coverage_id, valuation_dt, time_0_only))
+            except:
+                for item in block:
+                    try:
+                        frames.append(
+                            _value_block([item], coverage_id, valuation_dt, time_0_only)
+                        )
+                    except:
+                        key = _error_key(item["record"], scenario)
+                        error = Error.create(key=key, sys_info=sys.exc_info())
+                        errors.append((item["position"], error))
+            if timings is not None:
+                name = BATCH_MODELS[coverage_id].__name__
+                timings.add(name, "_value_block", perf_counter() - block_start)
+    return frames, errors
+
+
+def run_dlr_batch(
+    records: list,
+    *,
+    valuation_dt: pd.Timestamp,
+    assumption_set: str,
+    modifier_ctr: float,
+    modifier_interest: float,
+    time_0_only: bool = False,
+    block_size: int = BLOCK_SIZE,
+    time_steps: bool = False,
+    scenarios: list = None,
+):
+    """Run disabled life records through the vectorized DLR engine.
+
+    This is a drop-in alternative to running each record through its respective policy
+    model (DValBasePMD or rider children). Records are grouped by COVERAGE_ID, sorted by
+    the number of projected months and valued in blocks of `block_size` records using
+    numpy arrays. The projected frame is identical to the frames produced by the policy
+    models concatenated in record order.
+
+    Parameters
+    ----------
+    records : list
+        The list of records (as dicts with lower case keys) to value.
+    valuation_dt : pd.Timestamp
+        The valuation date which reserves are based.
+    assumption_set : str
+        The assumption set to use for running the model.
+    modifier_ctr : float
+        Modifier for CTR.
+    modifier_interest : float
+        Interest rate modifier.
+    time_0_only : bool, optional
+        Only output the first row (the valuation date) of each record, by default False.
+    block_size : int, optional
+        The maximum number of records to value at once, by default 1000.
+    time_steps : bool, optional
+        Record the time of _prepare_record and _value_block by policy model, by default
+        False.
+    scenarios : list, optional
+        Sensitivity scenarios (dicts of modifier_ctr and modifier_interest values). When
+        passed, each record is prepared once and valued under every scenario. The
+        projected rows of a record are in scenario order with a SCENARIO column and the
+        errors are keyed by the record and the scenario (see scenario_error_key).
+
+    Returns
+    -------
+    tuple
+        The projected frame and a list of any errors captured. When time_steps is True,
+        the StepTimings is returned as a third item.
+    """
+    valuation_dt = pd.Timestamp(valuation_dt)
+    cache = _AssumptionCache(assumption_set, modifier_ctr)
+    timings = StepTimings() if time_steps else None
+    # the errors are collected as (position, scenario, error) to be sorted in record order
+    groups, errors = {}, []
+    for position, record in enumerate(records):
+        start = perf_counter()
+        try:
+            model = BATCH_MODELS[record["coverage_id"]]
+            item = _prepare_record(record, model, valuation_dt, cache)
+        except:
+            for scenario in [None] if scenarios is None else range(len(scenarios)):
+                key = _error_key(record, scenario)
+                error = Error.create(key=key, sys_info=sys.exc_info())
+                errors.append((position, scenario or 0, error))
+            continue
+        finally:
+            if timings is not None:
+                name = BATCH_MODELS.get(record["coverage_id"], DValBasePMD).__name__
+                timings.add(name, "_prepare_record", perf_counter() - start)
+        item.update(
+            position=position,
+            policy_id=record["policy_id"],
+            claim_id=record["claim_id"],
+            modifier_interest=modifier_interest,
+        )
+        groups.setdefault(record["coverage_id"], []).append(item)
+
+    columns = list(DisabledLivesValOutput.columns)
+    if scenarios is None:
+        frames, value_errors = _value_groups(
+            groups, valuation_dt, time_0_only, block_size, timings
+        )
+        errors.extend((position, 0, error) for position, error in value_errors)
+    else:
+        # the prepared records do not depend on the modifiers
+        frames = []
+        columns.append("SCENARIO")
+        for scenario, values in enumerate(scenarios):
+            modifiers = {
+                "modifier_ctr": values.get("modifier_ctr", modifier_ctr),
+                "modifier_interest": values.get("modifier_interest", modifier_interest),
+            }
+            scenario_groups = {
+                coverage_id: [{**item, **modifiers} for item in items]
+                for coverage_id, items in groups.items()
+            }
+            scenario_frames, value_errors = _value_groups(
+                scenario_groups, valuation_dt, time_0_only, block_size, timings, scenario
+            )
+            frames.extend(frame.assign(SCENARIO=scenario) for frame in scenario_frames)
+            errors.extend((position, scenario, error) for position, error in value_errors)
+    if len(frames) == 0:
+        projected = pd.DataFrame(columns=columns)
+    else:
+        projected = pd.concat(frames, ignore_index=True)
+        keys = [projected["_ROW"].to_numpy(), projected["_POSITION"].to_numpy()]
+        if scenarios is not None:
+            keys.insert(1, projected["SCENARIO"].to_numpy())
+        projected = projected.take(np.lexsort(keys))
+        projected.index = projected["_ROW"].to_numpy()
+        projected = projected[columns]
+    errors = [error for *_, error in sorted(errors, key=lambda x: x[:2])]
+    if timings is not None:
+        return projected, errors, timings
+    return projected, errors
@@ -0,0 +1,562 @@
+import json
+import os
+import sys
+from functools import lru_cache
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from footings.exceptions import Error
+
+from ...outputs import DisabledLivesValOutput
+from ..timings import StepTimings
+from .disabled_deterministic_base import DValBasePMD
+from .disabled_deterministic_batch import (
+    BATCH_MODELS,
+    BLOCK_SIZE,
+    CTR_KEYS,
+    ITERATOR_KEYS,
+    _add_months,
+    _AssumptionCache,
+    _calculate_exposure,
+    _model_meta,
+    _nan_cumprod,
+    _prepare_record,
+    _split_dates,
+    _to_days,
+    _value_groups,
+)
+
+#########################################################################################
+# Reserve Factor Tables
+#
+# The DLR of a BASE or CAT claim is a deterministic function of its cell (the months from
+# birth to incurral, which set the age incurred and the ages attained, the CTR rating
+# attributes and the interest rate) and the months since incurral. The monthly benefit
+# only scales the reserve. For each cell a reserve factor table holds the monthly CTR,
+# the lives from incurral and the cumulative present value (at incurral) of $1 of
+# monthly benefit by claim duration month. The DLR per $1 of monthly benefit for any
+# valuation month and benefit end date is the difference of two cumulative values over
+# the lives and discount at the valuation month, with the partial months at the start
+# and end of the payments valued with the same exposure as the policy models.
+#
+# A table over the whole CTR domain would hold billions of cells (see CompiledCTR) so the
+# tables are built for the cells of a claims extract and stored in a .npz file. The
+# tables do not depend on the valuation date and a file can be reused for later
+# valuations. Claims without a table (new cells, riders other than CAT or claims running
+# longer than their table) are valued with the batch DLR engine.
+#########################################################################################
+
+FACTORS_VERSION = 1
+
+FACTOR_COVERAGES = ("BASE", "CAT")
+
+# the attributes of a claim setting its reserve factor table (the age incurred follows
+# from base_months and use_ultimate is whether the claim runs past the select period)
+CELL_KEYS = ["base_months", "use_ultimate", *CTR_KEYS[1:], "interest_rate"]
+
+
+def _cell_key(item):
+    params = item["ctr_params"]
+    return (
+        item["base_months"],
+        item["use_ultimate"],
+        *(params[key] for key in CTR_KEYS[1:]),
+        item["interest_rate"] * item["modifier_interest"],
+    )
+
+
+class ReserveFactors:
+    """The reserve factor tables of a set of claim cells (see build_reserve_factors).
+
+    The tables of every cell are stored one after the other in flat arrays where the
+    table of cell i starts at offsets[i] and holds lengths[i] + 1 values (durations 0 to
+    lengths[i] months since incurral).
+
+    Parameters
+    ----------
+    cells : pd.DataFrame
+        The attributes of each cell (the CELL_KEYS columns).
+    offsets : np.ndarray
+        The start of each cell's table within the flat arrays.
+    lengths : np.ndarray
+        The number of months of each cell's table.
+    ctr : np.ndarray
+        The monthly CTR by duration (the last value of each table is NaN).
+    lives : np.ndarray
+        The lives at the start of each duration (1 at incurral).
+    pv : np.ndarray
+        The present value at incurral of $1 of monthly benefit paid up to each duration.
+    assumption_set : str
+        The assumption set the tables were built with.
+    modifier_ctr : float
+        The CTR modifier the tables were built with.
+    path : str, optional
+        The file the tables were loaded from.
+    """
+
+    def __init__(
+        self,
+        cells,
+        offsets,
+        lengths,
+        ctr,
+        lives,
+        pv,
+        assumption_set,
+        modifier_ctr,
+        path=None,
+    ):
+        self.cells = cells.reset_index(drop=True)
+        self.offsets = offsets
+        self.lengths = lengths
+        self.ctr = ctr
+        self.lives = lives
+        self.pv = pv
+        self.assumption_set = assumption_set
+        self.modifier_ctr = modifier_ctr
+        self.path = path
+        self.index = {
+            key: i
+            for i, key in enumerate(zip(*(self.cells[col].tolist() for col in CELL_KEYS)))
+        }
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __reduce__(self):
+        # tables loaded from a file are sent to the workers as the path
+        if self.path is not None:
+            return (load_reserve_factors, (self.path,))
+        return super().__reduce__()
+
+    def __repr__(self):
+        return f"ReserveFactors(cells={len(self)}, assumption_set={self.assumption_set})"
+
+    def lookup(self, key):
+        """The position of a cell (None when the cell has no table)."""
+        return self.index.get(key)
+
+    def check(self, assumption_set: str, modifier_ctr: float):
+        """Raise a ValueError when the tables were built with other assumptions."""
+        if (assumption_set, modifier_ctr) != (self.assumption_set, self.modifier_ctr):
+            msg = "The reserve factors were built with assumption set "
+            msg += (
+                f"[{self.assumption_set}] and modifier_ctr [{self.modifier_ctr}] while "
+            )
+            msg += f"[{assumption_set}] and [{modifier_ctr}] are used."
+            raise ValueError(msg)
+
+    def save(self, path: str):
+        """Write the tables to a .npz file."""
+        from ...assumptions.stat_gaap.bundle import source_hash
+
+        meta = {
+            "version": FACTORS_VERSION,
+            "assumption_set": self.assumption_set,
+            "modifier_ctr": self.modifier_ctr,
+            "source_hash": source_hash(),
+        }
+        cells = {
+            f"cell_{col}": self.cells[col].to_numpy(
+                dtype=str if self.cells[col].dtype == object else None
+            )
+            for col in CELL_KEYS
+        }
+        with open(path, "wb") as file:
+            np.savez(
+                file,
+                meta=np.array(json.dumps(meta)),
+                offsets=self.offsets,
+                lengths=self.lengths,
+                ctr=self.ctr,
+                lives=self.lives,
+                pv=self.pv,
+                **cells,
+            )
+
+
+def _load(path, mtime, verify):
+    with np.load(path) as content:
+        meta = json.loads(str(content["meta"]))
+        if meta.get("version") != FACTORS_VERSION:
+            msg = f"The reserve factors at [{path}] are version [{meta.get('version')}] "
+            msg += f"while version [{FACTORS_VERSION}] is required. Rebuild the factors."
+            raise ValueError(msg)
+        if verify:
+            from ...assumptions.stat_gaap.bundle import source_hash
+
+            if meta["source_hash"] != source_hash():
+                msg = f"The reserve factors at [{path}] were built from different "
+                msg += "assumption files."
+                raise ValueError(msg)
+        cells = pd.DataFrame(
+            {
+                col: (
+                    content[f"cell_{col}"].astype(object)
+                    if content[f"cell_{col}"].dtype.kind == "U"
+                    else content[f"cell_{col}"]
+                )
+                for col in CELL_KEYS
+            }
+        )
+        return ReserveFactors(
+            cells,
+            content["offsets"],
+            content["lengths"],
+            content["ctr"],
+            content["lives"],
+            content["pv"],
+            meta["assumption_set"],
+            meta["modifier_ctr"],
+            path=path,
+        )
+
+
+_load_cached = lru_cache(maxsize=4)(_load)
+
+
+def load_reserve_factors(path: str, verify: bool = False):
+    """Load reserve factor tables written with ReserveFactors.save.
+
+    The tables are cached by path (and modification time) so each worker reads a file
+    once.
+
+    Parameters
+    ----------
+    path : str
+        The .npz file.
+    verify : bool, optional
+        Check the tables were built from the current assumption files, by default False.
+
+    Returns
+    -------
+    ReserveFactors
+    """
+    path = os.path.abspath(path)
+    return _load_cached(path, os.path.getmtime(path), verify)
+
+
+#########################################################################################
+# Build
+#########################################################################################
+
+
+def _build_block(cells, lengths, ctr_rates, modifier_ctr):
+    """Build the tables of a block of cells (a list of CELL_KEYS tuples)."""
+    n = len(cells)
+    width = int(lengths.max())
+    k = np.arange(width)[None, :]
+    values = {
+        key: np.array([cell[i] for cell in cells], dtype=object)
+        for i, key in enumerate(CELL_KEYS)
+    }
+    base_months = values.pop("base_months").astype(int)[:, None]
+    use_ultimate = values.pop("use_ultimate").astype(bool)
+    interest_rate = values.pop("interest_rate").astype(float)[:, None]
+    ctr = ctr_rates(
+        duration_month=np.broadcast_to(k + 1, (n, width)),
+        age_attained=(base_months + k) // 12,
+        use_ultimate=use_ultimate,
+        modifier_ctr=np.full(n, modifier_ctr, dtype=float),
+        age_incurred=np.round(base_months[:, 0] / 12).astype(int).astype(object),
+        **values,
+    )
+    valid = k < lengths[:, None]
+    ctr = np.where(valid, ctr, 0.0)
+    lives = np.ones((n, width + 1))
+    lives[:, 1:] = _nan_cumprod(1 - ctr)
+    rate = interest_rate / 12
+    discount_md = 1 / ((1 + rate) ** k * (1 + rate) ** 0.5)
+    pv = np.zeros((n, width + 1))
+    pv[:, 1:] = np.cumsum(
+        (lives[:, :-1] * 0.5 + lives[:, 1:] * 0.5) * discount_md, axis=1
+    )
+    complete = ~np.isnan(lives).any(axis=1)
+    ctr = np.concatenate([np.where(valid, ctr, np.nan), np.full((n, 1), np.nan)], axis=1)
+    return complete, ctr, lives, pv
+
+
+def build_reserve_factors(
+    records,
+    *,
+    assumption_set: str,
+    modifier_ctr: float = 1.0,
+    modifier_interest: float = 1.0,
+    block_size: int = BLOCK_SIZE,
+):
+    """Build the reserve factor tables for the cells of the BASE and CAT claims.
+
+    Each table runs from incurral to the longest claim of its cell. Cells with a missing
+    CTR (e.g., an age not on the tables) are left out and their claims are valued with
+    the batch DLR engine.
+
+    Parameters
+    ----------
+    records : RecordBatch or list
+        The disabled lives records (as dicts with lower case keys).
+    assumption_set : str
+        The assumption set to use.
+    modifier_ctr : float, optional
+        Modifier for CTR, by default 1.0.
+    modifier_interest : float, optional
+        Interest rate modifier, by default 1.0 (part of each cell's interest rate).
+    block_size : int, optional
+        The maximum number of cells to build at once, by default 1000.
+
+    Returns
+    -------
+    ReserveFactors
+    """
+    cache = _AssumptionCache(assumption_set, modifier_ctr)
+    lengths = {}
+    for record in records:
+        if record["coverage_id"] not in FACTOR_COVERAGES:
+            continue
+        try:
+            # valued as of incurral to get the number of months of the claim
+            model = BATCH_MODELS[record["coverage_id"]]
+            incurred_dt = pd.Timestamp(record["incurred_dt"])
+            item = _prepare_record(record, model, incurred_dt, cache)
+        except Exception:
+            continue
+        item["modifier_interest"] = modifier_interest
+        key = _cell_key(item)
+        lengths[key] = max(lengths.get(key, 0), item["first"] + item["length"])
+
+    cells = list(lengths)
+    ctr_rates = cache.get_assumption("ctr_rates") if len(cells) > 0 else None
+    kept, tables = [], []
+    for start in range(0, len(cells), block_size):
+        block = cells[start : start + block_size]
+        block_lengths = np.array([lengths[cell] for cell in block], dtype=int)
+        complete, ctr, lives, pv = _build_block(
+            block, block_lengths, ctr_rates, modifier_ctr
+        )
+        for i, cell in enumerate(block):
+            if complete[i]:
+                size = block_lengths[i] + 1
+                kept.append((cell, block_lengths[i]))
+                tables.append((ctr[i, :size], lives[i, :size], pv[i, :size]))
+
+    cell_lengths = np.array([length for _, length in kept], dtype=np.int64)
+    offsets = np.zeros(len(kept), dtype=np.int64)
+    offsets[1:] = np.cumsum(cell_lengths + 1)[:-1]
+
+    def _flat(i):
+        if len(tables) == 0:
+            return np.zeros(0)
+        return np.concatenate([table[i] for table in tables])
+
+    return ReserveFactors(
+        pd.DataFrame([cell for cell, _ in kept], columns=CELL_KEYS),
+        offsets,
+        cell_lengths,
+        _flat(0),
+        _flat(1),
+        _flat(2),
+        assumption_set,
+        modifier_ctr,
+    )
+
+
+#########################################################################################
+# Valuation
+#########################################################################################
+
+
+def _value_factors(items, cells, factors, valuation_dt):
+    """Value the time 0 row of prepared BASE and CAT records with their reserve factor
+    tables (one output row per record)."""
+    n = len(items)
+    cells = np.asarray(cells, dtype=np.intp)
+    offsets = factors.offsets[cells]
+    first = np.array([item["first"] for item in items], dtype=np.intp)
+    end = first + np.array([item["length"] for item in items], dtype=np.intp)
+    wt_bd = np.array([item["wt_bd"] for item in items])
+    benefit_amount = np.array([item["benefit_amount"] for item in items], dtype=float)
+    rate = (
+        np.array([item["interest_rate"] for item in items], dtype=float)
+        * np.array([item["modifier_interest"] for item in items], dtype=float)
+        / 12
+    )
+
+    iy, im, id_ = _split_dates(_to_days([item["incurred_dt"] for item in items]))
+    begin_dt = _to_days([item["begin_dt"] for item in items])
+    end_dt = _to_days([item["termination_dt"] for item in items])
+
+    def _exposure(month):
+        return _calculate_exposure(
+            _add_months(iy, im, id_, month),
+            _add_months(iy, im, id_, month + 1),
+            begin_dt,
+            end_dt,
+        )
+
+    def _pv(month):
+        return factors.pv[offsets + month + 1] - factors.pv[offsets + month]
+
+    # the first month paying benefits (its end date is after the benefit start date)
+    by, bm, _ = _split_dates(begin_dt)
+    begin = np.clip((by - iy) * 12 + (bm - im) - 1, first, end)
+    begin += (_add_months(iy, im, id_, begin + 1) <= begin_dt) & (begin < end)
+
+    # the months after the begin month are paid in full apart from the last two months
+    paid = factors.pv[offsets + end] - factors.pv[offsets + begin]
+    for month, include in [
+        (begin, begin < end),
+        (end - 2, end - 2 > begin),
+        (end - 1, end - 1 > begin),
+    ]:
+        month = np.clip(month, 0, end - 1)
+        paid += np.where(include, (_exposure(month) - 1) * _pv(month), 0.0)
+
+    exposure_0 = _exposure(first)
+    scale = benefit_amount * (1 + rate) ** first / factors.lives[offsets + first]
+    pvfb_bd = paid * scale
+    pvfb_ed = (paid - exposure_0 * _pv(first)) * scale
+    ctr = factors.ctr[offsets + first]
+    lives_ed = (1 - ctr) * 1.0
+    lives_vd = 1.0 * wt_bd + lives_ed * (1 - wt_bd)
+    dlr = np.round((pvfb_bd * wt_bd + pvfb_ed * (1 - wt_bd)) / lives_vd / lives_vd, 2)
+
+    model = items[0]["model"]
+    return pd.DataFrame(
+        {
+            "MODEL_VERSION": _model_meta(model, "model_version"),
+            "LAST_COMMIT": _model_meta(model, "last_commit"),
+            "RUN_DATE_TIME": _model_meta(model, "run_date_time"),
+            "SOURCE": [item["model"].__qualname__ for item in items],
+            "POLICY_ID": np.array([item["policy_id"] for item in items], dtype=object),
+            "CLAIM_ID": np.array([item["claim_id"] for item in items], dtype=object),
+            "COVERAGE_ID": [item["record"]["coverage_id"] for item in items],
+            "DATE_BD": _add_months(iy, im, id_, first).astype("datetime64[ns]"),
+            "DATE_ED": _add_months(iy, im, id_, first + 1).astype("datetime64[ns]"),
+            "DURATION_YEAR": pd.array(first // 12 + 1, dtype="Int64"),
+            "DURATION_MONTH": pd.array(first + 1, dtype="Int64"),
+            "BENEFIT_AMOUNT": pd.array(exposure_0 * benefit_amount, dtype="Float64"),
+            "CTR": ctr,
+            "LIVES_BD": np.ones(n),
+            "LIVES_MD": 1.0 * 0.5 + lives_ed * 0.5,
+            "LIVES_ED": lives_ed,
+            "DISCOUNT_BD": 1 / (1.0 * (1 + rate) ** 0),
+            "DISCOUNT_MD": 1 / (1.0 * (1 + rate) ** 0.5),
+            "DISCOUNT_ED": 1 / (1 + rate),
+            "PVFB_BD": pvfb_bd,
+            "PVFB_ED": pvfb_ed,
+            "DATE_DLR": np.full(n, np.datetime64(valuation_dt, "ns")),
+            "DLR": dlr,
+            "_POSITION": np.array([item["position"] for item in items], dtype=int),
+        }
+    )
+
+
+def run_dlr_factors(
+    records: list,
+    *,
+    valuation_dt: pd.Timestamp,
+    assumption_set: str,
+    modifier_ctr: float,
+    modifier_interest: float,
+    reserve_factors: ReserveFactors,
+    time_0_only: bool = True,
+    time_steps: bool = False,
+):
+    """Value disabled life records with reserve factor tables.
+
+    The DLR as of the valuation date of BASE and CAT claims with a table is looked up from
+    reserve_factors and scaled by the benefit amount. The other records are valued with
+    the batch DLR engine (as run_dlr_batch). Only the time 0 row of each record is output
+    (i.e., time_0_only is always True) and the values match the batch engine up to
+    floating point rounding.
+
+    Parameters
+    ----------
+    records : list
+        The list of records (as dicts with lower case keys) to value.
+    valuation_dt : pd.Timestamp
+        The valuation date which reserves are based.
+    assumption_set : str
+        The assumption set to use for running the model.
+    modifier_ctr : float
+        Modifier for CTR.
+    modifier_interest : float
+        Interest rate modifier.
+    reserve_factors : ReserveFactors
+        The reserve factor tables (see build_reserve_factors).
+    time_0_only : bool, optional
+        Not used (only the time 0 row is output), kept to match run_dlr_batch.
+    time_steps : bool, optional
+        Record the time of _prepare_record, _value_factors and the batch engine, by
+        default False.
+
+    Returns
+    -------
+    tuple
+        The projected frame and a list of any errors captured. When time_steps is True,
+        the StepTimings is returned as a third item.
+    """
+    reserve_factors.check(assumption_set, modifier_ctr)
+    valuation_dt = pd.Timestamp(valuation_dt)
+    cache = _AssumptionCache(assumption_set, modifier_ctr)
+    timings = StepTimings() if time_steps else None
+    # the errors are collected as (position, error) to be sorted in record order
+    items, cells, fallback, errors = [], [], {}, []
+    for position, record in enumerate(records):
+        start = perf_counter()
+        try:
+            model = BATCH_MODELS[record["coverage_id"]]
+            item = _prepare_record(record, model, valuation_dt, cache)
+        except:
+            key = ({k: record.get(k) for k in ITERATOR_KEYS},)
+            errors.append((position, Error.create(key=key, sys_info=sys.exc_info())))
+            continue
+        finally:
+            if timings is not None:
+                name = BATCH_MODELS.get(record["coverage_id"], DValBasePMD).__name__
+                timings.add(name, "_prepare_record", perf_counter() - start)
+        item.update(
+            position=position,
+            policy_id=record["policy_id"],
+            claim_id=record["claim_id"],
+            modifier_interest=modifier_interest,
+        )
+        cell = None
+        if record["coverage_id"] in FACTOR_COVERAGES:
+            cell = reserve_factors.lookup(_cell_key(item))
+        if cell is None or item["first"] + item["length"] > reserve_factors.lengths[cell]:
+            fallback.setdefault(record["coverage_id"], []).append(item)
+        else:
+            items.append(item)
+            cells.append(cell)
+
+    frames = []
+    if len(items) > 0:
+        start = perf_counter()
+        try:
+            frames.append(_value_factors(items, cells, reserve_factors, valuation_dt))
+        except:
+            # the batch engine captures the failing records one at a time
+            for item in items:
+                coverage_id = item["record"]["coverage_id"]
+                fallback.setdefault(coverage_id, []).append(item)
+        if timings is not None:
+            timings.add("ReserveFactors", "_value_factors", perf_counter() - start)
+    fallback_frames, fallback_errors = _value_groups(
+        fallback, valuation_dt, True, BLOCK_SIZE, timings
+    )
+    frames.extend(fallback_frames)
+    errors = [error for _, error in sorted(errors + fallback_errors, key=lambda x: x[0])]
+
+    if len(frames) == 0:
+        projected = pd.DataFrame(columns=list(DisabledLivesValOutput.columns))
+    else:
+        projected = pd.concat(frames, ignore_index=True)
+        projected = projected.take(
+            np.argsort(projected["_POSITION"].to_numpy(), kind="stable")
+        )
+        projected.index = np.zeros(len(projected), dtype=np.int64)
+        projected = projected[list(DisabledLivesValOutput.columns)]
+    if timings is not None:
+        return projected, errors, timings
+    return projected, errors
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+#########################################################################################
+# Record Batch
+#
+# The extract models hold the records as columns (a struct of arrays) instead of a list
+# of dicts. Slicing a batch into chunks takes views of the arrays and a chunk is sent to
+# a worker as a handful of arrays. The records are turned into dicts (the keyword
+# arguments of the policy models) within the worker as they are valued.
+#########################################################################################
+
+
+def _parse_dates(frame, extract):
+    for col in extract.list_columns():
+        if col.dtype is None or col.dtype.value != "datetime64[ns]":
+            continue
+        if col.name in frame.columns and not pd.api.types.is_datetime64_dtype(
+            frame[col.name]
+        ):
+            frame[col.name] = pd.to_datetime(frame[col.name])
+    return frame
+
+
+class RecordBatch:
+    """A batch of records stored as columns (numpy arrays of equal length).
+
+    Iterating a batch yields each record as a dict with lower case keys (the same as
+    convert_to_records). Optional columns (e.g., rider attributes) are left out of a
+    record when the value is missing.
+
+    Parameters
+    ----------
+    columns : dict
+        The columns (lower case names) of the batch as numpy arrays.
+    optional : tuple, optional
+        The columns left out of a record when missing.
+    """
+
+    __slots__ = ("columns", "optional", "length")
+
+    def __init__(self, columns: dict, optional: tuple = ()):
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("The columns of a record batch need to have equal length.")
+        self.columns = columns
+        self.optional = tuple(optional)
+        self.length = lengths.pop() if len(lengths) > 0 else 0
+
+    @classmethod
+    def from_extract(
+        cls,
+        extract_base: pd.DataFrame,
+        extract=None,
+        *,
+        riders: pd.DataFrame = None,
+        rider_keys: tuple = ("policy_id", "coverage_id"),
+        rider_coverages: tuple = None,
+        drop: tuple = (),
+    ):
+        """Create a record batch from an extract.
+
+        Parameters
+        ----------
+        extract_base : pd.DataFrame
+            The base extract (one row per record).
+        extract : DataDictionary, optional
+            The data dictionary of the base extract used to parse the date columns. The
+            other columns keep the dtype of the extract.
+        riders : pd.DataFrame, optional
+            The rider extract (RIDER_ATTRIBUTE and VALUE for each record). Each rider
+            attribute is joined to the records as a column.
+        rider_keys : tuple, optional
+            The (lower case) columns joining the riders to the records.
+        rider_coverages : tuple, optional
+            When passed, the rider attributes are only joined to records with these
+            coverage ids.
+        drop : tuple, optional
+            Base extract columns to leave out of the records.
+
+        Returns
+        -------
+        RecordBatch
+        """
+        frame = extract_base.drop(columns=list(drop))
+        if extract is not None:
+            frame = _parse_dates(frame, extract)
+        columns = {col.lower(): frame[col].to_numpy() for col in frame.columns}
+        optional = ()
+        if riders is not None:
+            rider_data = riders.rename(columns=str.lower).pivot(
+                index=list(rider_keys), columns="rider_attribute", values="value"
+            )
+            if len(rider_data.columns) > 0:
+                keys = pd.DataFrame({key: columns[key] for key in rider_keys})
+                joined = keys.join(rider_data.infer_objects(), on=list(rider_keys))
+                if rider_coverages is not None:
+                    exclude = ~np.isin(columns["coverage_id"], list(rider_coverages))
+                    joined.loc[exclude, list(rider_data.columns)] = np.nan
+                for attribute in rider_data.columns:
+                    columns[attribute] = joined[attribute].to_numpy()
+                optional = tuple(rider_data.columns)
+        return cls(columns, optional)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # basic slicing returns views of the arrays (no copy)
+            return RecordBatch(
+                {k: v[index] for k, v in self.columns.items()}, self.optional
+            )
+        if isinstance(index, (int, np.integer)):
+            return self[index : index + 1 or None].to_records()[0]
+        return self.take(index)
+
+    def take(self, positions):
+        """A batch of the records at positions (in the order passed)."""
+        positions = np.asarray(positions, dtype=np.intp)
+        return RecordBatch(
+            {k: v.take(positions) for k, v in self.columns.items()}, self.optional
+        )
+
+    def deduplicate(self, exclude: tuple = ()):
+        """The distinct records ignoring the columns in exclude (e.g., the policy id).
+
+        Values are compared exactly (missing values are equal to each other).
+
+        Returns
+        -------
+        tuple
+            A batch of the first record of each distinct key (in record order) and an
+            array with the position of each record's key within that batch.
+        """
+        keys = [col for col in self.columns if col not in exclude]
+        if len(self) == 0:
+            return self, np.zeros(0, dtype=np.intp)
+        frame = pd.DataFrame({col: self.columns[col] for col in keys})
+        inverse = frame.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+        _, first = np.unique(inverse, return_index=True)
+        return self.take(first), inverse.astype(np.intp)
+
+    def column(self, name: str):
+        """The values of a column (a numpy array)."""
+        return self.columns[name]
+
+    def to_frame(self, columns: list = None):
+        """The batch as a DataFrame (missing columns are filled with None)."""
+        if columns is None:
+            columns = list(self.columns)
+        return pd.DataFrame(
+            {
+                col: self.columns[col] if col in self.columns else [None] * len(self)
+                for col in columns
+            },
+            columns=columns,
+        )
+
+    def to_records(self):
+        """The records as a list of dicts (lower case keys)."""
+        records = self.to_frame().to_dict(orient="records")
+        if len(self.optional) == 0:
+            return records
+        return [
+            {k: v for k, v in record.items() if k not in self.optional or not pd.isna(v)}
+            for record in records
+        ]
+
+    def to_audit_json(self):
+        """The records as a list of dicts when auditing a model (see to_records)."""
+        return self.to_records()
+
+    def to_audit_xlsx(self):
+        """The records as a list of dicts when auditing a model (see to_records)."""
+        return self.to_records()
+
+    def __iter__(self):
+        return iter(self.to_records())
+
+    def __repr__(self):
+        return f"RecordBatch(records={len(self)}, columns={list(self.columns)})"
@@ -0,0 +1,136 @@
+import sys
+from copy import copy
+
+import pandas as pd
+from footings.exceptions import Error
+
+from .timings import run_step
+
+#########################################################################################
+# Sensitivity Scenarios
+#
+# A sensitivity pack values every record under a list of scenarios which only differ in
+# their modifiers (e.g., modifier_interest). Most steps of a policy model do not read
+# any modifier (e.g., the frame and ages) and the steps reading a modifier are often
+# late in the model (e.g., modifier_interest is first read in _calculate_discount for
+# the disabled lives). run_scenarios runs the steps of a model once for all the
+# scenarios and only splits the scenarios (copying the model) at the first step reading
+# a modifier the scenarios disagree on. The later steps are ran once for each group of
+# scenarios sharing the modifiers read so far.
+#
+# The modifiers read by a step are those named in the step's uses, so a step reading a
+# modifier (including through get_kws or the claim cost model) needs to list it.
+#########################################################################################
+
+SENSITIVITIES = (
+    "modifier_ctr",
+    "modifier_incidence",
+    "modifier_interest",
+    "modifier_lapse",
+    "modifier_mortality",
+)
+
+
+def validate_scenarios(instance, attribute, value):
+    """Validator for the scenarios parameter of the extract models."""
+    if value is None:
+        return
+    sensitivities = instance.__model_sensitivities__
+    for scenario in value:
+        unknown = [name for name in scenario if name not in sensitivities]
+        if len(unknown) > 0:
+            msg = f"The scenario modifiers {unknown} are not known. Options are "
+            msg += f"{list(sensitivities)}."
+            raise ValueError(msg)
+
+
+def scenario_error_key(key: tuple, scenario: int):
+    """The key of an error captured for a scenario (the record key and the scenario)."""
+    return key + ({"scenario": scenario},)
+
+
+def step_sensitivities(model, step: str):
+    """The sensitivities read by a step of a model (named in the step's uses)."""
+    uses = getattr(type(model), step).uses
+    # the uses are qualified by the attribute type (e.g., sensitivity.modifier_ctr)
+    names = [name.split(".")[-1] for name in uses]
+    return tuple(name for name in names if name in model.__model_sensitivities__)
+
+
+def _branch(model):
+    """A copy of a model (the intermediate and return attributes are copied so the
+    steps of the copy do not change the model)."""
+    ret = copy(model)
+    for name in model.__model_intermediates__ + model.__model_returns__:
+        value = getattr(model, name, None)
+        if isinstance(value, (pd.DataFrame, pd.Series, dict, list)):
+            setattr(ret, name, value.copy())
+    return ret
+
+
+def _copy_return(ret):
+    if isinstance(ret, tuple):
+        return tuple(_copy_return(value) for value in ret)
+    if isinstance(ret, (pd.DataFrame, pd.Series, dict, list)):
+        return ret.copy()
+    return ret
+
+
+def run_scenarios(model, scenarios: list, *, error_key=None, timings=None):
+    """Run a model instance (as Model.run) for each scenario sharing the steps which do
+    not depend on the scenario modifiers.
+
+    Parameters
+    ----------
+    model : Model
+        The model instance (the modifiers left out of a scenario use its values).
+    scenarios : list
+        The scenarios as dicts of modifier values (e.g., {"modifier_interest": 0.9}).
+    error_key : tuple, optional
+        The key of the errors captured (see scenario_error_key).
+    timings : StepTimings, optional
+        When passed, the time of each step is recorded (a shared step once).
+
+    Returns
+    -------
+    list
+        The returns of the model for each scenario or an Error when the scenario failed.
+    """
+    base = {name: getattr(model, name) for name in model.__model_sensitivities__}
+    results = [None] * len(scenarios)
+    groups = [(model, list(range(len(scenarios))))]
+    for step in model.__model_steps__:
+        names = step_sensitivities(model, step)
+        next_groups = []
+        for group_model, members in groups:
+            splits = {}
+            for member in members:
+                values = tuple(scenarios[member].get(name, base[name]) for name in names)
+                splits.setdefault(values, []).append(member)
+            for i, (values, split) in enumerate(splits.items()):
+                # the last split keeps the model of the group
+                split_model = (
+                    group_model if i == len(splits) - 1 else _branch(group_model)
+                )
+                for name, value in zip(names, values):
+                    # the sensitivities are frozen attributes
+                    object.__setattr__(split_model, name, value)
+                try:
+                    run_step(split_model, step, timings)
+                except:
+                    for member in split:
+                        key = scenario_error_key(error_key or (), member)
+                        results[member] = Error.create(key=key, sys_info=sys.exc_info())
+                    continue
+                next_groups.append((split_model, split))
+        groups = next_groups
+
+    returns = model.__model_returns__
+    for group_model, members in groups:
+        if len(returns) > 1:
+            ret = tuple(getattr(group_model, name) for name in returns)
+        else:
+            ret = getattr(group_model, returns[0])
+        for i, member in enumerate(members):
+            results[member] = ret if i == 0 else _copy_return(ret)
+    return results
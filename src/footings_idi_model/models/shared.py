@@ -1,17 +1,21 @@
-import git
 import pandas as pd
+from attr import Factory
 from footings.model import def_meta, def_parameter, def_sensitivity
 from footings.validators import isin
 
-try:
-    import importlib.metadata as importlib_metadata
-except ModuleNotFoundError:
-    import importlib_metadata
+from ..metadata import get_git_revision, get_model_version
+from ..outputs.policy import OutputPolicy
+from .executors import validate_executor
+from .sensitivities import validate_scenarios
 
-MOD_VERSION = importlib_metadata.version("footings_idi_model")
 
-repo = git.Repo(search_parent_directories=True)
-GIT_REVISION = repo.head.object.hexsha
+def __getattr__(name):
+    # MOD_VERSION and GIT_REVISION are resolved on first access (see metadata)
+    if name == "MOD_VERSION":
+        return get_model_version()
+    if name == "GIT_REVISION":
+        return get_git_revision()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 param_n_simulations = def_parameter(
@@ -67,12 +71,98 @@ param_as_of_dt = def_parameter(
     dtype=pd.Timestamp, description="The as of date which birth date will be based.",
 )
 
+param_executor = def_parameter(
+    description="""The executor used to run the chunks of records. Options are :
+
+        * `dask` - run each chunk as a dask delayed task
+        * `process` - run the chunks on a pool of worker processes
+        * `serial` - run the chunks in the current process
+    """,
+    dtype=str,
+    default="dask",
+    validator=validate_executor,
+)
+
+param_n_workers = def_parameter(
+    description="The number of workers to use (defaults to the number of CPUs).",
+    dtype=int,
+    default=None,
+)
+
+param_chunk_size = def_parameter(
+    description="The average number of records per chunk (defaults to 4 chunks per worker).",
+    dtype=int,
+    default=None,
+)
+
+param_aggregate_by = def_parameter(
+    description="""The keys to sum the projected reserves by within each worker (e.g.,
+    COVERAGE_ID, IDI_CONTRACT, IDI_BENEFIT_PERIOD, IDI_OCCUPATION_CLASS and the projected
+    valuation date). Keys can be projected columns or extract columns. When set,
+    projected holds the sums by the keys and time_0 the sums of the time 0 rows. If None
+    every projected row is returned.
+    """,
+    dtype=list,
+    default=None,
+)
+
+param_output_policy = def_parameter(
+    description="""The dtypes of the projected and time_0 frames (see OutputPolicy). For
+    example, OutputPolicy(float_dtype="float32", categorical=True, run_metadata="attrs")
+    stores the measures as float32, the string columns as categoricals and the run
+    metadata once in frame.attrs. If None the frames are returned as is.
+    """,
+    dtype=OutputPolicy,
+    default=None,
+)
+
+param_time_0_only = def_parameter(
+    description="""Only calculate the reserve as of the valuation date. The projected
+    dates, interpolations and output columns after the first row are skipped so
+    projected only holds the time 0 row of each record.
+    """,
+    dtype=bool,
+    default=False,
+)
+
+param_deduplicate = def_parameter(
+    description="""Value records which only differ in their identifiers (POLICY_ID and
+    CLAIM_ID) once and copy the projected rows to each record. The output is the same as
+    valuing every record. Not used when aggregate_by is set.
+    """,
+    dtype=bool,
+    default=False,
+)
+
+param_scenarios = def_parameter(
+    description="""Sensitivity scenarios valued in the same run as a list of dicts of
+    modifier values (e.g., [{"modifier_interest": 0.9}, {"modifier_interest": 1.1}]).
+    The policy model steps which do not read a modifier the scenarios differ on are ran
+    once for all the scenarios. The modifiers left out of a scenario use the value set on
+    the model. The projected and time_0 frames hold a SCENARIO column (the position of the
+    scenario in the list). If None the model is ran once.
+    """,
+    dtype=list,
+    default=None,
+    validator=validate_scenarios,
+)
+
+param_time_steps = def_parameter(
+    description="""Record the wall time and number of calls of each policy model step
+    (summed across the workers) in the step_timings intermediate (see StepTimings).
+    """,
+    dtype=bool,
+    default=False,
+)
+
 meta_model_version = def_meta(
-    meta=MOD_VERSION, dtype=str, description="The model version generated by versioneer."
+    meta=Factory(get_model_version),
+    dtype=str,
+    description="The model version generated by versioneer.",
 )
 
 meta_last_commit = def_meta(
-    meta=GIT_REVISION, dtype=str, description="The last git commit."
+    meta=Factory(get_git_revision), dtype=str, description="The last git commit."
 )
 
 meta_run_date_time = def_meta(
@@ -0,0 +1,119 @@
+import sys
+from inspect import signature
+from time import perf_counter
+from traceback import extract_tb, format_list
+
+import pandas as pd
+from footings.exceptions import ModelRunError
+
+#########################################################################################
+# Step Timings
+#
+# Opt-in instrumentation recording the wall time and number of calls of each step by
+# model class (e.g., AValBasePMD._model_claim_cost). When a chunk runner is called with
+# time_steps=True it runs the policy models step by step (see TimedModel) and returns
+# the timings of the chunk as a third item. run_chunked sums the timings returned by the
+# workers and the extract models hold the total as the step_timings intermediate.
+#########################################################################################
+
+
+class StepTimings:
+    """The wall time (seconds) and number of calls of each step by model class.
+
+    Picklable so the timings of each chunk can be returned from the workers and summed
+    with update.
+    """
+
+    __slots__ = ("timings",)
+
+    def __init__(self, timings: dict = None):
+        self.timings = {} if timings is None else dict(timings)
+
+    def add(self, model: str, step: str, seconds: float, calls: int = 1):
+        """Add the time of calls to a step of a model."""
+        key = (model, step)
+        total_calls, total_seconds = self.timings.get(key, (0, 0.0))
+        self.timings[key] = (total_calls + calls, total_seconds + seconds)
+
+    def update(self, other):
+        """Add the timings of other (e.g., the timings of a chunk)."""
+        for (model, step), (calls, seconds) in other.timings.items():
+            self.add(model, step, seconds, calls)
+
+    def __len__(self):
+        return len(self.timings)
+
+    def to_frame(self):
+        """The timings as a DataFrame sorted by seconds (largest first).
+
+        The columns are MODEL, STEP, CALLS, SECONDS, SECONDS_PER_CALL and PERCENT (the
+        share of the total seconds).
+        """
+        columns = ["MODEL", "STEP", "CALLS", "SECONDS", "SECONDS_PER_CALL", "PERCENT"]
+        if len(self.timings) == 0:
+            return pd.DataFrame(columns=columns)
+        frame = pd.DataFrame(
+            [
+                (model, step, calls, seconds)
+                for (model, step), (calls, seconds) in self.timings.items()
+            ],
+            columns=columns[:4],
+        )
+        frame["SECONDS_PER_CALL"] = frame["SECONDS"] / frame["CALLS"]
+        frame["PERCENT"] = 100 * frame["SECONDS"] / frame["SECONDS"].sum()
+        return frame.sort_values("SECONDS", ascending=False, ignore_index=True)
+
+    def __repr__(self):
+        return f"StepTimings(steps={len(self)})"
+
+
+def run_step(model, step: str, timings: StepTimings = None):
+    """Run a step of a model instance raising a ModelRunError on failure (as Model.run).
+    When timings is passed, the time of the step is recorded."""
+    start = perf_counter()
+    try:
+        getattr(model, step)()
+    except:
+        exc_type, exc_value, exc_trace = sys.exc_info()
+        msg = f"At step [{step}], an error occured.\n"
+        msg += f"  Error Type = {exc_type.__name__}\n"
+        msg += f"  Error Message = {exc_value}\n"
+        msg += f"  Error Trace = {format_list(extract_tb(exc_trace))}\n"
+        raise ModelRunError(msg)
+    finally:
+        if timings is not None:
+            timings.add(type(model).__name__, step, perf_counter() - start)
+
+
+def run_timed(model, timings: StepTimings):
+    """Run a model instance (as Model.run) recording the time of each step in timings."""
+    for step in model.__model_steps__:
+        run_step(model, step, timings)
+    returns = model.__model_returns__
+    if len(returns) > 1:
+        return tuple(getattr(model, ret) for ret in returns)
+    return getattr(model, returns[0])
+
+
+class _TimedRun:
+    __slots__ = ("model", "timings")
+
+    def __init__(self, model, timings):
+        self.model = model
+        self.timings = timings
+
+    def run(self):
+        return run_timed(self.model, self.timings)
+
+
+class TimedModel:
+    """Wrap a model class so calling model(**kwargs).run() records the time of each
+    step in timings (used in place of the policy models within the foreach jig)."""
+
+    def __init__(self, model, timings: StepTimings):
+        self.model = model
+        self.timings = timings
+        self.__signature__ = signature(model)
+
+    def __call__(self, **kwargs):
+        return _TimedRun(self.model(**kwargs), self.timings)
@@ -1,2 +1,4 @@
 from .active_lives import ActiveLivesValOutput
 from .disabled_lives import DisabledLivesValOutput
+from .policy import COMPACT_OUTPUT, OutputPolicy
+from .sinks import CSVSink, OutputSink, ParquetSink
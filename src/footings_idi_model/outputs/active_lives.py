@@ -26,50 +26,50 @@ class ActiveLivesValOutput:
     )
     DURATION_YEAR = def_column(dtype="int", description="Projected policy duration year.")
     LIVES_BD = def_column(
-        dtype="float16",
+        dtype="float64",
         description="Projected average lives inforce begining policy duration.",
     )
     LIVES_MD = def_column(
-        dtype="float16",
+        dtype="float64",
         description="Projected average lives inforce mid-point of policy duration.",
     )
     LIVES_ED = def_column(
-        dtype="float16",
+        dtype="float64",
         description="Projected average lives inforce ending policy duration.",
     )
     DISCOUNT_BD = def_column(
-        dtype="float16", description="Discount factor used begining policy duration."
+        dtype="float64", description="Discount factor used begining policy duration."
     )
     DISCOUNT_MD = def_column(
-        dtype="float16", description="Discount factor used mid-point of policy duration."
+        dtype="float64", description="Discount factor used mid-point of policy duration."
     )
     DISCOUNT_ED = def_column(
-        dtype="float16", description="Discount factor used ending policy duration."
+        dtype="float64", description="Discount factor used ending policy duration."
     )
-    BENEFIT_AMOUNT = def_column(dtype="float16", description="Projected benefit amount.")
+    BENEFIT_AMOUNT = def_column(dtype="float64", description="Projected benefit amount.")
     INCIDENCE_RATE = def_column(
-        dtype="float16",
+        dtype="float64",
         description="Final incidence rate with margin and sensitivites applied.",
     )
     BENEFIT_COST = def_column(
-        dtype="float16",
+        dtype="float64",
         description="Projected benefit cost (PV future benefits x incidence rate).",
     )
-    PVFB = def_column(dtype="float16", description="Present value of future benefits.",)
+    PVFB = def_column(dtype="float64", description="Present value of future benefits.",)
     PVFNB = def_column(
-        dtype="float16", description="Present value of future bet benefits.",
+        dtype="float64", description="Present value of future bet benefits.",
     )
     ALR_BD = def_column(
-        dtype="float16", description="Projected ALR amount at begining policy duration.",
+        dtype="float64", description="Projected ALR amount at begining policy duration.",
     )
     ALR_ED = def_column(
-        dtype="float16", description="Projected ALR amount at ending policy duration.",
+        dtype="float64", description="Projected ALR amount at ending policy duration.",
     )
     ALR_DATE = def_column(
         dtype="datetime64[ns]",
         description="Projected valuation dates using val date as base.",
     )
     ALR = def_column(
-        dtype="float16",
+        dtype="float64",
         description="Projected ALR amount as of projected valuation date.",
     )
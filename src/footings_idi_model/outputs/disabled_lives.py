@@ -29,38 +29,38 @@ class DisabledLivesValOutput:
     DURATION_MONTH = def_column(
         dtype="int", description="Projected claim duration month."
     )
-    BENEFIT_AMOUNT = def_column(dtype="float16", description="Projected benefit amount.")
+    BENEFIT_AMOUNT = def_column(dtype="float64", description="Projected benefit amount.")
     CTR = def_column(
-        dtype="float16",
+        dtype="float64",
         description="Final claim termination rate with margin and sensitivites applied.",
     )
     LIVES_BD = def_column(
-        dtype="float16",
+        dtype="float64",
         description="Projected average lives inforce begining claim duration.",
     )
     LIVES_MD = def_column(
-        dtype="float16",
+        dtype="float64",
         description="Projected average lives inforce mid-point of claim duration.",
     )
     LIVES_ED = def_column(
-        dtype="float16",
+        dtype="float64",
         description="Projected average lives inforce ending claim duration.",
     )
     DISCOUNT_BD = def_column(
-        dtype="float16", description="Discount factor used begining claim duration."
+        dtype="float64", description="Discount factor used begining claim duration."
     )
     DISCOUNT_MD = def_column(
-        dtype="float16", description="Discount factor used mid-point of claim duration."
+        dtype="float64", description="Discount factor used mid-point of claim duration."
     )
     DISCOUNT_ED = def_column(
-        dtype="float16", description="Discount factor used ending claim duration."
+        dtype="float64", description="Discount factor used ending claim duration."
     )
     PVFB_BD = def_column(
-        dtype="float16",
+        dtype="float64",
         description="Present value of future benefits begining claim duration.",
     )
     PVFB_ED = def_column(
-        dtype="float16",
+        dtype="float64",
         description="Present value of future benefit ending claim duration.",
     )
     DATE_DLR = def_column(
@@ -68,6 +68,6 @@ class DisabledLivesValOutput:
         description="Projected valuation dates using val date as base.",
     )
     DLR = def_column(
-        dtype="float16",
+        dtype="float64",
         description="Projected DLR amount as of projected valuation date.",
     )
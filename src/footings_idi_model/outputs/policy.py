@@ -0,0 +1,64 @@
+import pandas as pd
+from attr import attrib, attrs
+from attr.validators import in_, instance_of
+
+#########################################################################################
+# Output Policy
+#
+# The projected output repeats the same strings (policy, coverage, source and run
+# metadata) on every row. An output policy sets the dtypes of the output frames so the
+# repeated strings can be dictionary encoded and the run metadata stored once.
+#########################################################################################
+
+# the metadata that is the same for every row of a run
+RUN_COLUMNS = ["MODEL_VERSION", "LAST_COMMIT", "RUN_DATE_TIME"]
+
+
+@attrs(frozen=True, slots=True)
+class OutputPolicy:
+    """The dtypes of the output frames of the extract models.
+
+    Parameters
+    ----------
+    float_dtype : str, optional
+        The dtype of the measure (float) columns, float64 (default) or float32. Note
+        float32 holds about 7 significant digits (i.e., reserves over 100,000 lose cents).
+    categorical : bool, optional
+        Store the string columns (e.g., POLICY_ID, COVERAGE_ID and SOURCE) as
+        categoricals (dictionary encoded), by default False.
+    run_metadata : str, optional
+        How the run metadata (MODEL_VERSION, LAST_COMMIT and RUN_DATE_TIME) is stored.
+        Options are `column` (default) to repeat it on every row or `attrs` to store it
+        once in frame.attrs["run_metadata"] (written to run.json by the output sinks).
+    """
+
+    float_dtype = attrib(default="float64", validator=in_(["float32", "float64"]))
+    categorical = attrib(default=False, validator=instance_of(bool))
+    run_metadata = attrib(default="column", validator=in_(["column", "attrs"]))
+
+    def apply(self, frame: pd.DataFrame):
+        """Apply the policy to an output frame (returns a new frame)."""
+        frame = frame.copy()
+        if self.run_metadata == "attrs":
+            columns = [col for col in RUN_COLUMNS if col in frame.columns]
+            if len(frame) > 0:
+                metadata = {col: frame[col].iat[0] for col in columns}
+            else:
+                metadata = {col: None for col in columns}
+            frame = frame.drop(columns=columns)
+            frame.attrs["run_metadata"] = metadata
+        for col in frame.columns:
+            dtype = frame[col].dtype
+            if pd.api.types.is_float_dtype(dtype):
+                frame[col] = frame[col].astype(self.float_dtype)
+            elif self.categorical and (
+                pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+            ):
+                frame[col] = frame[col].astype("category")
+        return frame
+
+
+# float64 measures, dictionary encoded strings and the run metadata stored once
+COMPACT_OUTPUT = OutputPolicy(
+    float_dtype="float64", categorical=True, run_metadata="attrs"
+)
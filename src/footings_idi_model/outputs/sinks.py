@@ -0,0 +1,263 @@
+import glob
+import json
+import os
+
+import pandas as pd
+from attr import asdict
+
+#########################################################################################
+# Output Sinks
+#
+# A sink receives the results of an extract model one chunk of records at a time so the
+# full output never has to be held in memory.
+#########################################################################################
+
+
+def errors_to_frame(errors):
+    """Convert a list of errors (footings Error objects) to a DataFrame."""
+    columns = ["key", "error_type", "error_value", "error_stacktrace"]
+    return pd.DataFrame([asdict(error) for error in errors], columns=columns)
+
+
+def write_run_metadata(directory, frame):
+    """Write the run metadata stored once on a frame (see OutputPolicy) to run.json."""
+    metadata = frame.attrs.get("run_metadata", None)
+    file = os.path.join(directory, "run.json")
+    if metadata is not None and not os.path.exists(file):
+        with open(file, "w") as f:
+            json.dump({k: str(v) for k, v in metadata.items()}, f, indent=2)
+
+
+class OutputSink:
+    """Base class for output sinks.
+
+    Subclasses implement write (called once for each chunk of records in chunk order)
+    and optionally close (called once all chunks have been written). A sink can be used
+    as a context manager which calls close on exit.
+
+    Sinks that can be used with checkpointed runs also implement checkpoint and resume.
+    """
+
+    def write(self, chunk: int, projected: pd.DataFrame, time_0: pd.DataFrame, errors):
+        """Write the results for a chunk of records.
+
+        Parameters
+        ----------
+        chunk : int
+            The chunk number (starting at 0).
+        projected : pd.DataFrame
+            The projected frame for the chunk.
+        time_0 : pd.DataFrame
+            The time 0 frame for the chunk.
+        errors : list
+            Any errors captured for the chunk.
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """Finish writing (e.g., close files)."""
+        pass
+
+    def checkpoint(self):
+        """Get the state of the output after the last written chunk (must be JSON
+        serializable)."""
+        raise NotImplementedError(f"{type(self).__name__} does not support checkpoints.")
+
+    def resume(self, state):
+        """Restore the output to a state returned by checkpoint (discarding anything
+        written after it) so a run can continue. A state of None starts over."""
+        raise NotImplementedError(f"{type(self).__name__} does not support checkpoints.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CSVSink(OutputSink):
+    """Append the results of each chunk to CSV files within a directory.
+
+    Writes projected.csv, time_0.csv and errors.csv.
+
+    Parameters
+    ----------
+    directory : str
+        The directory to write to (created if it does not exist).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._written = set()
+
+    def _append(self, name, frame):
+        file = os.path.join(self.directory, f"{name}.csv")
+        header = name not in self._written
+        frame.to_csv(file, mode="w" if header else "a", header=header, index=False)
+        self._written.add(name)
+
+    def write(self, chunk, projected, time_0, errors):
+        write_run_metadata(self.directory, projected)
+        self._append("projected", projected)
+        self._append("time_0", time_0)
+        self._append("errors", errors_to_frame(errors))
+
+    def checkpoint(self):
+        # the size of each file (a resumed run truncates anything written after)
+        return {
+            name: os.path.getsize(os.path.join(self.directory, f"{name}.csv"))
+            for name in sorted(self._written)
+        }
+
+    def resume(self, state):
+        self._written = set()
+        for name, size in (state or {}).items():
+            with open(os.path.join(self.directory, f"{name}.csv"), "r+b") as file:
+                file.truncate(size)
+            self._written.add(name)
+
+
+# parquet has no half precision floats so all floats are written as double
+ARROW_TYPES = {
+    "string": "string",
+    "object": "string",
+    "datetime64[ns]": "timestamp[ns]",
+    "int32": "int32",
+    "int64": "int64",
+    "float16": "float64",
+    "float32": "float64",
+    "float64": "float64",
+    "bool": "bool",
+}
+
+
+def arrow_schema(output, columns, dtypes=None):
+    """Create a pyarrow schema for columns using the dtypes of an output data
+    dictionary (columns not on the data dictionary are left to pyarrow to infer).
+
+    When the pandas dtypes of the columns are passed, categorical columns are dictionary
+    encoded and float32 columns are kept as float32 (see OutputPolicy).
+    """
+    import pyarrow as pa
+
+    dtypes = {} if dtypes is None else dtypes
+    fields = []
+    for name in columns:
+        column = getattr(output, name, None)
+        dtype = None if column is None or column.dtype is None else column.dtype.value
+        if dtype not in ARROW_TYPES:
+            return None
+        arrow_type = pa.type_for_alias(ARROW_TYPES[dtype])
+        if isinstance(dtypes.get(name, None), pd.CategoricalDtype):
+            arrow_type = pa.dictionary(pa.int32(), arrow_type)
+        elif dtypes.get(name, None) == "float32":
+            arrow_type = pa.float32()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+class ParquetSink(OutputSink):
+    """Write the results of each chunk to partitioned Parquet files within a directory.
+
+    Projected rows are written as they arrive to a hive style partitioned dataset under
+    directory/projected (i.e., projected/COVERAGE_ID=BASE/chunk-00000.parquet) so a
+    single coverage can be read without loading everything. The time 0 rows and errors
+    of each chunk are staged under directory/_parts and combined into
+    directory/time_0.parquet and directory/errors.parquet on close. Requires pyarrow.
+
+    Parameters
+    ----------
+    directory : str
+        The directory to write to (created if it does not exist).
+    output : DataDictionary, optional
+        The output data dictionary (e.g., DisabledLivesValOutput) used as the schema. If
+        not passed the schema is inferred from each frame.
+    partition_cols : tuple, optional
+        The columns to partition the projected rows by, by default COVERAGE_ID.
+    """
+
+    def __init__(self, directory, output=None, partition_cols=("COVERAGE_ID",)):
+        self.directory = directory
+        self.output = output
+        self.partition_cols = tuple(partition_cols)
+        os.makedirs(os.path.join(directory, "_parts"), exist_ok=True)
+        self._chunks = []
+        self._closed = False
+
+    def _to_table(self, frame):
+        import pyarrow as pa
+
+        schema = None
+        if self.output is not None:
+            schema = arrow_schema(self.output, frame.columns, frame.dtypes.to_dict())
+        return pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+
+    def _part(self, name, chunk):
+        return os.path.join(self.directory, "_parts", f"{name}-{chunk:05d}.parquet")
+
+    def write(self, chunk, projected, time_0, errors):
+        import pyarrow.parquet as pq
+
+        write_run_metadata(self.directory, projected)
+        if len(projected) > 0:
+            groups = projected.groupby(
+                list(self.partition_cols), sort=False, observed=True
+            )
+            for keys, frame in groups:
+                if not isinstance(keys, tuple):
+                    keys = (keys,)
+                partition = [
+                    f"{col}={key}" for col, key in zip(self.partition_cols, keys)
+                ]
+                path = os.path.join(self.directory, "projected", *partition)
+                os.makedirs(path, exist_ok=True)
+                table = self._to_table(frame.drop(columns=list(self.partition_cols)))
+                pq.write_table(table, os.path.join(path, f"chunk-{chunk:05d}.parquet"))
+        pq.write_table(self._to_table(time_0), self._part("time_0", chunk))
+        pq.write_table(
+            self._to_table(errors_to_frame(errors)), self._part("errors", chunk)
+        )
+        self._chunks.append(chunk)
+
+    def close(self):
+        import pyarrow.parquet as pq
+
+        if self._closed:
+            return
+        for name in ["time_0", "errors"]:
+            parts = [self._part(name, chunk) for chunk in self._chunks]
+            if len(parts) > 0:
+                frames = [pd.read_parquet(part) for part in parts]
+                frame = pd.concat(frames).reset_index(drop=True)
+                # concat drops categoricals when the categories differ between chunks
+                for col, dtype in frames[0].dtypes.items():
+                    if isinstance(dtype, pd.CategoricalDtype):
+                        frame[col] = frame[col].astype("category")
+                pq.write_table(
+                    self._to_table(frame),
+                    os.path.join(self.directory, f"{name}.parquet"),
+                )
+            for part in parts:
+                os.remove(part)
+        self._closed = True
+
+    def checkpoint(self):
+        return {"chunks": list(self._chunks)}
+
+    def resume(self, state):
+        chunks = [] if state is None else state["chunks"]
+        keep = {f"chunk-{chunk:05d}.parquet" for chunk in chunks}
+        keep.update(
+            os.path.basename(self._part(name, chunk))
+            for name in ["time_0", "errors"]
+            for chunk in chunks
+        )
+        files = glob.glob(
+            os.path.join(self.directory, "projected", "**", "*.parquet"), recursive=True
+        )
+        files += glob.glob(os.path.join(self.directory, "_parts", "*.parquet"))
+        for file in files:
+            if os.path.basename(file) not in keep:
+                os.remove(file)
+        self._chunks = list(chunks)
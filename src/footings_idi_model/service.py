@@ -0,0 +1,336 @@
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from .assumptions import compile_assumptions
+from .extracts import (
+    ActiveLivesBaseExtract,
+    ActiveLivesROPRiderExtract,
+    DisabledLivesBaseExtract,
+    DisabledLivesRiderExtract,
+)
+from .models import ActiveLivesValEMD, DisabledLivesValEMD
+from .models.executors import _error_key
+from .outputs.sinks import errors_to_frame
+
+#########################################################################################
+# Valuation Service
+#
+# A long running process that holds the assumption tables in memory and values policies
+# sent over HTTP. Requests that arrive within a short window of each other are valued
+# together as one extract (i.e., with the vectorized engines) and the time 0 reserves
+# are split back out to each request.
+#########################################################################################
+
+# the extract model, extracts and default parameters for each endpoint (a request can
+# override the defaults, e.g., execution_mode)
+SERVICE_MODELS = {
+    "active-lives": {
+        "model": ActiveLivesValEMD,
+        "extract_base": ActiveLivesBaseExtract,
+        "extract_riders": ActiveLivesROPRiderExtract,
+        "parameters": {"executor": "serial"},
+    },
+    "disabled-lives": {
+        "model": DisabledLivesValEMD,
+        "extract_base": DisabledLivesBaseExtract,
+        "extract_riders": DisabledLivesRiderExtract,
+        "parameters": {"executor": "serial", "execution_mode": "batch"},
+    },
+}
+
+BATCH_WAIT = 0.005
+MAX_BATCH_SIZE = 256
+
+
+def _to_frame(rows, extract):
+    """Create an extract frame from a list of rows (dicts) parsing the date columns."""
+    columns = [col.name for col in extract.list_columns()]
+    frame = pd.DataFrame(rows, columns=columns if len(rows) == 0 else None)
+    for col in extract.list_columns():
+        if col.dtype is not None and col.dtype.value == "datetime64[ns]":
+            if col.name in frame.columns:
+                frame[col.name] = pd.to_datetime(frame[col.name])
+    return frame
+
+
+def _to_records(frame):
+    return json.loads(frame.to_json(orient="records", date_format="iso"))
+
+
+class ValuationRequest:
+    """A request to value a set of policies with one of the SERVICE_MODELS.
+
+    Parameters
+    ----------
+    name : str
+        The name of the model (a key of SERVICE_MODELS).
+    extract_base : list
+        The rows of the base extract (dicts keyed by column name).
+    extract_riders : list, optional
+        The rows of the rider extract.
+    parameters
+        The remaining parameters of the extract model (e.g., valuation_dt). These take
+        precedence over the default parameters of the model in SERVICE_MODELS.
+    """
+
+    def __init__(self, name, extract_base, extract_riders=None, **parameters):
+        if name not in SERVICE_MODELS:
+            raise ValueError(f"The model [{name}] is not one of {list(SERVICE_MODELS)}.")
+        service_model = SERVICE_MODELS[name]
+        self.name = name
+        self.extract_base = _to_frame(extract_base, service_model["extract_base"])
+        self.extract_riders = _to_frame(
+            extract_riders or [], service_model["extract_riders"]
+        )
+        if "valuation_dt" in parameters:
+            parameters["valuation_dt"] = pd.Timestamp(parameters["valuation_dt"])
+        self.parameters = parameters
+        self.policy_ids = set(self.extract_base["POLICY_ID"])
+        self.error_keys = {
+            _error_key(record)
+            for record in self.extract_base.rename(columns=str.lower).to_dict("records")
+        }
+        self._done = threading.Event()
+        self._result = None
+        self._exception = None
+
+    @property
+    def batch_key(self):
+        """Requests with the same batch key can be valued together."""
+        return (self.name,) + tuple(
+            (k, str(v)) for k, v in sorted(self.parameters.items())
+        )
+
+    def set_result(self, time_0, errors):
+        self._result = (time_0, errors)
+        self._done.set()
+
+    def set_exception(self, exception):
+        self._exception = exception
+        self._done.set()
+
+    def result(self, timeout=None):
+        """Wait for the time 0 reserves and errors of the request."""
+        if not self._done.wait(timeout):
+            raise TimeoutError("The valuation request did not finish in time.")
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+
+def _group_requests(requests):
+    """Group requests that can be valued together (the same model and parameters and
+    no policy in more than one request)."""
+    groups = []
+    for request in requests:
+        for group in groups:
+            if group[0].batch_key == request.batch_key and not any(
+                request.policy_ids & other.policy_ids for other in group
+            ):
+                group.append(request)
+                break
+        else:
+            groups.append([request])
+    return groups
+
+
+class ValuationService:
+    """Value policies in a warm process batching requests that arrive together.
+
+    Requests are submitted from any thread and valued one batch at a time on a single
+    background thread. Once a request arrives, the service waits up to batch_wait seconds
+    (or until max_batch_size requests are waiting) for more requests before valuing them.
+
+    Parameters
+    ----------
+    batch_wait : float, optional
+        The seconds to wait for more requests before valuing a batch.
+    max_batch_size : int, optional
+        The maximum number of requests in a batch.
+    """
+
+    def __init__(self, batch_wait=BATCH_WAIT, max_batch_size=MAX_BATCH_SIZE):
+        self.batch_wait = batch_wait
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        """Compile the assumption tables and start valuing requests."""
+        compile_assumptions()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop valuing requests (once the requests already submitted are valued)."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def submit(self, request: ValuationRequest):
+        """Submit a request to be valued (see ValuationRequest.result)."""
+        self._queue.put(request)
+        return request
+
+    def value(self, name, extract_base, extract_riders=None, **parameters):
+        """Value policies and wait for the result.
+
+        Returns
+        -------
+        tuple
+            The time 0 reserves (pd.DataFrame) and errors (list) for the policies.
+        """
+        request = ValuationRequest(name, extract_base, extract_riders, **parameters)
+        return self.submit(request).result()
+
+    def _next_batch(self):
+        request = self._queue.get()
+        if request is None:
+            return None
+        batch = [request]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                # value what is waiting then stop
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            for group in _group_requests(batch):
+                self._value_group(group)
+            self.batches += 1
+
+    def _value_group(self, group):
+        service_model = SERVICE_MODELS[group[0].name]
+        parameters = {**service_model["parameters"], **group[0].parameters}
+        try:
+            _, time_0, errors = service_model["model"](
+                extract_base=pd.concat([r.extract_base for r in group]),
+                extract_riders=pd.concat([r.extract_riders for r in group]),
+                **parameters,
+            ).run()
+        except Exception as exc:
+            if len(group) == 1:
+                group[0].set_exception(exc)
+            else:
+                # value each request on its own so one bad request does not fail the rest
+                for request in group:
+                    self._value_group([request])
+            return
+        for request in group:
+            request.set_result(
+                time_0[time_0["POLICY_ID"].isin(request.policy_ids)].reset_index(
+                    drop=True
+                ),
+                [error for error in errors if error.key in request.error_keys],
+            )
+
+
+#########################################################################################
+# HTTP Server
+#########################################################################################
+
+
+class ValuationHandler(BaseHTTPRequestHandler):
+    """Handle HTTP requests to the valuation service.
+
+    * GET /health - check the service is up.
+    * POST /active-lives or /disabled-lives - value policies. The body is a JSON object
+      with extract_base (a list of rows), extract_riders (optional) and the parameters
+      of the extract model (e.g., valuation_dt and assumption_set). The response is a
+      JSON object with the time_0 reserves and errors.
+    """
+
+    service = None
+
+    def _send(self, status, content):
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            self._send(200, {"status": "ok", "models": list(SERVICE_MODELS)})
+        else:
+            self._send(404, {"error": f"Unknown path [{self.path}]."})
+
+    def do_POST(self):
+        name = self.path.strip("/")
+        if name not in SERVICE_MODELS:
+            self._send(404, {"error": f"Unknown path [{self.path}]."})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            content = json.loads(self.rfile.read(length))
+            request = ValuationRequest(name, **content)
+        except Exception as exc:
+            self._send(400, {"error": str(exc)})
+            return
+        try:
+            time_0, errors = self.service.submit(request).result()
+        except Exception as exc:
+            self._send(500, {"error": str(exc)})
+            return
+        self._send(
+            200,
+            {
+                "time_0": _to_records(time_0),
+                "errors": _to_records(errors_to_frame(errors)),
+            },
+        )
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(service: ValuationService, host="127.0.0.1", port=8765):
+    """Create an HTTP server for a (started) valuation service."""
+    handler = type("Handler", (ValuationHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(
+    host="127.0.0.1", port=8765, batch_wait=BATCH_WAIT, max_batch_size=MAX_BATCH_SIZE
+):
+    """Start the valuation service and serve HTTP requests until interrupted."""
+    with ValuationService(
+        batch_wait=batch_wait, max_batch_size=max_batch_size
+    ) as service:
+        server = make_server(service, host, port)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from footings_idi_model.assumptions import (
+    build_bundle,
+    get_compiled_ctr,
+    get_compiled_mortality,
+    load_bundle,
+)
+from footings_idi_model.assumptions.stat_gaap import bundle as bundle_module
+
+
+def test_assumption_bundle(tmp_path):
+    manifest = build_bundle(str(tmp_path))
+    assert set(manifest["tables"]) == {"ctr", "incidence", "lapse", "mortality"}
+    bundle = load_bundle(str(tmp_path), verify=True)
+
+    # the arrays are memory mapped read-only
+    ctr = bundle["ctr"]
+    assert isinstance(ctr.base_select, np.memmap)
+    assert not ctr.base_select.flags.writeable
+    assert ctr.occupation_index == get_compiled_ctr().occupation_index
+
+    kwargs = {
+        "idi_benefit_period": "TO65",
+        "idi_contract": "AS",
+        "idi_diagnosis_grp": "LOW",
+        "idi_occupation_class": "M",
+        "gender": "F",
+        "elimination_period": 90,
+        "age_incurred": 45,
+        "cola_percent": 0.0,
+        "model_mode": "DLR",
+        "modifier_ctr": 1.0,
+        "duration_month": np.arange(1, 241)[None, :],
+        "age_attained": (45 + np.arange(240) // 12)[None, :],
+        "use_ultimate": True,
+    }
+    np.testing.assert_array_equal(
+        ctr.monthly_ctr(**kwargs), get_compiled_ctr().monthly_ctr(**kwargs)
+    )
+    ages = np.arange(20, 100)
+    np.testing.assert_array_equal(
+        bundle["mortality"].mortality_rates("01CSO", "M", ages, 1.0),
+        get_compiled_mortality().mortality_rates("01CSO", "M", ages, 1.0),
+    )
+    assert bundle["interest"][2015] == manifest["interest"]["2015"]
+
+
+def test_assumption_bundle_env(tmp_path, monkeypatch):
+    build_bundle(str(tmp_path))
+    monkeypatch.setattr(bundle_module, "_BUNDLES", {})
+    monkeypatch.setenv(bundle_module.BUNDLE_ENV, str(tmp_path))
+    assert isinstance(bundle_module.get_bundled("lapse").rates, np.memmap)
+    monkeypatch.delenv(bundle_module.BUNDLE_ENV)
+    assert bundle_module.get_bundled("lapse") is None
+
+
+def test_assumption_bundle_stale(tmp_path):
+    build_bundle(str(tmp_path))
+    array = tmp_path / "mortality.rates.npy"
+    rates = np.load(array)
+    rates[0, 0, 50] = 1.0
+    np.save(array, rates)
+    with pytest.raises(ValueError):
+        load_bundle(str(tmp_path), verify=True)
@@ -0,0 +1,21 @@
+import pytest
+
+from footings_idi_model.assumptions.stat_gaap.incidence import get_incidence_rates
+
+PARAMETERS = {
+    "idi_contract": "AS",
+    "idi_occupation_class": "M",
+    "idi_market": "INDV",
+    "idi_benefit_period": "TO65",
+    "tobacco_usage": "N",
+    "elimination_period": 90,
+    "gender": "M",
+    "modifier_incidence": 1.0,
+}
+
+
+def test_incidence_rates_missing_modifier():
+    with pytest.raises(IndexError, match="CONTRACT_MODIFIER .* idi_contract='XX'"):
+        get_incidence_rates(**{**PARAMETERS, "idi_contract": "XX"})
+    with pytest.raises(IndexError, match="MARKET_MODIFIER .* idi_market='XX'"):
+        get_incidence_rates(**{**PARAMETERS, "idi_market": "XX"})
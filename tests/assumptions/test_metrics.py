@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from footings_idi_model.assumptions import (
+    disable_metrics,
+    enable_metrics,
+    export_metrics,
+    get_metrics,
+)
+from footings_idi_model.assumptions.stat_gaap.metrics import (
+    METRICS,
+    lru_cache,
+    metered,
+    once,
+)
+from footings_idi_model.models import DisabledLivesValEMD
+
+
+@pytest.fixture
+def metrics():
+    enable_metrics()
+    yield METRICS
+    disable_metrics()
+    METRICS.reset()
+
+
+@lru_cache(maxsize=2)
+def square(x):
+    return x * x
+
+
+@once
+def read_table():
+    return {"A": 1}
+
+
+@metered
+def lookup(table, key):
+    return table[key]
+
+
+def test_assumption_metrics(metrics, tmp_path):
+    for x in [1, 1, 2, 3, 1]:
+        square(x)
+    for _ in range(3):
+        lookup(read_table(), "A")
+
+    frame = get_metrics().set_index("ASSUMPTION")
+    square_metrics = frame.loc["test_metrics.square"]
+    counts = ["CALLS", "HITS", "MISSES", "EVICTIONS"]
+    assert square_metrics[counts].tolist() == [5, 1, 4, 2]
+    assert square_metrics["MAXSIZE"] == 2
+    assert square_metrics["HIT_RATE"] == 0.2
+    once_metrics = frame.loc["test_metrics.read_table"]
+    assert once_metrics[["CALLS", "HITS", "MISSES"]].tolist() == [3, 2, 1]
+    assert frame.loc["test_metrics.lookup", "CALLS"] == 3
+    assert np.isnan(frame.loc["test_metrics.lookup", "HIT_RATE"])
+    assert (frame["SECONDS"] >= 0).all()
+
+    exported = export_metrics(str(tmp_path / "metrics.json"))
+    with open(tmp_path / "metrics.json") as file:
+        assert len(json.load(file)) == len(exported) == 3
+
+    # nothing is recorded when disabled
+    disable_metrics()
+    square(4)
+    assert get_metrics().set_index("ASSUMPTION").loc["test_metrics.square", "CALLS"] == 5
+
+
+def test_assumption_metrics_workers(metrics, disabled_lives_sample):
+    extract_base, extract_riders = disabled_lives_sample
+    kwargs = {
+        "extract_base": extract_base,
+        "extract_riders": extract_riders,
+        "valuation_dt": pd.Timestamp("2020-03-31"),
+        "assumption_set": "STAT",
+        "n_workers": 2,
+        "chunk_size": 2,
+    }
+    # load the tables so neither run records the (once) table reads
+    DisabledLivesValEMD(executor="serial", **kwargs).run()
+    calls = {}
+    for executor in ["serial", "process"]:
+        metrics.reset()
+        _, _, errors = DisabledLivesValEMD(executor=executor, **kwargs).run()
+        assert len(errors) == 0
+        calls[executor] = get_metrics().set_index("ASSUMPTION")["CALLS"].sort_index()
+
+    # the metrics recorded by the worker processes are added to the metrics of the run
+    assert calls["serial"]["idi_assumptions.ctr"] > 0
+    pd.testing.assert_series_equal(calls["process"], calls["serial"])
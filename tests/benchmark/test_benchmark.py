@@ -0,0 +1,52 @@
+import os
+
+import pandas as pd
+
+from footings_idi_model.benchmark import make_portfolio, read_samples, run_case
+
+directory, filename = os.path.split(__file__)
+root = os.path.dirname(os.path.dirname(directory))
+volume_tbl_file = os.path.join(root, "docs", "volume-tbl.csv")
+samples = os.path.join(root, "docs", "models", "extract_models")
+valuation_dt = pd.Timestamp("2020-03-31")
+
+
+def test_make_portfolio():
+    volume_tbl = pd.read_csv(volume_tbl_file)
+    sample_base, sample_riders = read_samples("disabled-lives", samples)
+    extract_base, extract_riders = make_portfolio(
+        "disabled-lives", 100, volume_tbl, sample_base, sample_riders, valuation_dt
+    )
+    assert len(extract_base) == 100
+    assert list(extract_base.columns) == list(sample_base.columns)
+    assert set(extract_base["COVERAGE_ID"]) <= set(sample_base["COVERAGE_ID"])
+    assert set(extract_base["IDI_BENEFIT_PERIOD"]) <= set(
+        volume_tbl["IDI_BENEFIT_PERIOD"]
+    )
+    assert (extract_base["INCURRED_DT"] <= valuation_dt).all()
+    assert (extract_base["TERMINATION_DT"] > valuation_dt).all()
+    res = extract_base[extract_base["COVERAGE_ID"] == "RES"]
+    assert len(extract_riders) == len(res)
+    assert list(extract_riders["CLAIM_ID"]) == list(res["CLAIM_ID"])
+
+    # the same seed generates the same portfolio
+    extract_base_2, _ = make_portfolio(
+        "disabled-lives", 100, volume_tbl, sample_base, sample_riders, valuation_dt
+    )
+    pd.testing.assert_frame_equal(extract_base, extract_base_2)
+
+
+def test_run_case():
+    result = run_case(
+        "active-lives",
+        10,
+        volume_tbl_file,
+        samples,
+        valuation_dt=valuation_dt,
+        assumption_set="STAT",
+        executor="serial",
+    )
+    assert result["records"] == 10
+    assert result["records_per_second"] > 0
+    assert sum(coverage["records"] for coverage in result["coverages"].values()) == 10
+    assert all("seconds" in coverage for coverage in result["coverages"].values())
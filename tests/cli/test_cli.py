@@ -0,0 +1,156 @@
+import pstats
+
+import pandas as pd
+from click.testing import CliRunner
+
+from footings_idi_model.__main__ import main
+from footings_idi_model.assumptions import disable_metrics
+from footings_idi_model.models import DisabledLivesValEMD
+
+DROP_COLS = ["MODEL_VERSION", "LAST_COMMIT", "RUN_DATE_TIME"]
+
+
+def test_cli_run(tmpdir, disabled_lives_sample, disabled_lives_sample_files):
+    extract_base, extract_riders = disabled_lives_sample
+    _, expected, _ = DisabledLivesValEMD(
+        extract_base=extract_base,
+        extract_riders=extract_riders,
+        valuation_dt=pd.Timestamp("2020-03-31"),
+        assumption_set="STAT",
+    ).run()
+
+    output = tmpdir.join("output")
+    profile = tmpdir.join("run.prof")
+    args = [
+        "run",
+        "disabled-lives",
+        *disabled_lives_sample_files,
+        "--valuation-dt=2020-03-31",
+        "--executor=serial",
+        "--chunk-size=5",
+        "--stream-chunk-size=10",
+        f"--output={output}",
+        f"--profile={profile}",
+    ]
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+    assert result.output.strip().endswith(
+        f"Valued {len(extract_base)} records in {-(-len(extract_base) // 10)} chunks "
+        "with 0 errors."
+    )
+
+    time_0 = pd.read_csv(output.join("time_0.csv"), parse_dates=["DATE_DLR"])
+    pd.testing.assert_frame_equal(
+        time_0.drop(columns=DROP_COLS),
+        expected.drop(columns=DROP_COLS).reset_index(drop=True),
+        check_dtype=False,
+    )
+    assert pstats.Stats(str(profile)).total_calls > 0
+
+
+def test_cli_build_assumptions(tmpdir):
+    bundle = tmpdir.join("bundle")
+    result = CliRunner().invoke(main, ["build-assumptions", str(bundle)])
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith("Built assumption bundle")
+    assert bundle.join("manifest.json").check()
+    assert bundle.join("ctr.base_select.npy").check()
+
+
+def test_cli_run_time_steps(tmpdir, disabled_lives_sample_files):
+    args = [
+        "run",
+        "disabled-lives",
+        *disabled_lives_sample_files,
+        "--valuation-dt=2020-03-31",
+        "--executor=serial",
+        "--stream-chunk-size=10",
+        f"--output={tmpdir.join('output')}",
+        "--time-steps",
+    ]
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+    lines = result.output.strip().splitlines()
+    assert lines[1].split() == [
+        "MODEL",
+        "STEP",
+        "CALLS",
+        "SECONDS",
+        "SECONDS_PER_CALL",
+        "PERCENT",
+    ]
+    assert any(line.split()[:2] == ["DValBasePMD", "_calculate_dlr"] for line in lines)
+
+
+def test_cli_run_assumption_metrics(tmpdir, disabled_lives_sample_files):
+    metrics_file = tmpdir.join("metrics.csv")
+    args = [
+        "run",
+        "disabled-lives",
+        *disabled_lives_sample_files,
+        "--valuation-dt=2020-03-31",
+        "--executor=serial",
+        f"--output={tmpdir.join('output')}",
+        f"--assumption-metrics={metrics_file}",
+    ]
+    try:
+        result = CliRunner().invoke(main, args)
+    finally:
+        disable_metrics()
+    assert result.exit_code == 0, result.output
+    metrics = pd.read_csv(str(metrics_file)).set_index("ASSUMPTION")
+    assert metrics.loc["idi_assumptions.ctr", "CALLS"] > 0
+    assert metrics.loc["termination.get_compiled_ctr", "CACHE"] == "once"
+
+
+def test_cli_build_reserve_factors(
+    tmpdir, disabled_lives_sample, disabled_lives_sample_files
+):
+    extract_base_file, _ = disabled_lives_sample_files
+    factors = tmpdir.join("factors.npz")
+    result = CliRunner().invoke(
+        main, ["build-reserve-factors", extract_base_file, str(factors)]
+    )
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith("Built reserve factors")
+
+    output = tmpdir.join("output")
+    args = [
+        "run",
+        "disabled-lives",
+        *disabled_lives_sample_files,
+        "--valuation-dt=2020-03-31",
+        "--executor=serial",
+        "--execution-mode=factors",
+        f"--reserve-factors={factors}",
+        f"--output={output}",
+    ]
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+    extract_base, extract_riders = disabled_lives_sample
+    _, expected, _ = DisabledLivesValEMD(
+        extract_base=extract_base,
+        extract_riders=extract_riders,
+        valuation_dt=pd.Timestamp("2020-03-31"),
+        assumption_set="STAT",
+    ).run()
+    time_0 = pd.read_csv(output.join("time_0.csv"), parse_dates=["DATE_DLR"])
+    pd.testing.assert_frame_equal(
+        time_0.drop(columns=DROP_COLS),
+        expected.drop(columns=DROP_COLS).reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_cli_unknown_executor(tmpdir, disabled_lives_sample_files):
+    args = [
+        "run",
+        "disabled-lives",
+        *disabled_lives_sample_files,
+        "--valuation-dt=2020-03-31",
+        "--executor=threads",
+        f"--output={tmpdir.join('output')}",
+    ]
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 2
+    assert "Invalid value for '--executor'" in result.output
@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+import pytest
+
+directory, filename = os.path.split(__file__)
+extract_directory = os.path.join(directory, "models", "extract_models")
+
+SAMPLE_DT_COLS = {
+    "active_lives": ["BIRTH_DT", "POLICY_START_DT", "PREMIUM_PAY_TO_DT", "POLICY_END_DT"],
+    "disabled_lives": ["BIRTH_DT", "INCURRED_DT", "TERMINATION_DT"],
+}
+
+
+def sample_files(name):
+    """The paths to the sample base and rider extracts of an extract model."""
+    prefix = os.path.join(extract_directory, name, name.replace("_", "-"))
+    return f"{prefix}-sample-base.csv", f"{prefix}-sample-riders.csv"
+
+
+def read_sample(name):
+    """The sample base (with the dates parsed) and rider extracts of an extract model."""
+    base_file, riders_file = sample_files(name)
+    extract_base = pd.read_csv(base_file, parse_dates=SAMPLE_DT_COLS[name])
+    extract_riders = pd.read_csv(riders_file)
+    return extract_base, extract_riders
+
+
+@pytest.fixture(scope="session")
+def active_lives_sample():
+    """The active lives sample extracts (base and riders). Tests are not to change them."""
+    return read_sample("active_lives")
+
+
+@pytest.fixture(scope="session")
+def disabled_lives_sample():
+    """The disabled lives sample extracts (base and riders). Tests are not to change
+    them."""
+    return read_sample("disabled_lives")
+
+
+@pytest.fixture(scope="session")
+def disabled_lives_sample_files():
+    """The paths to the disabled lives sample extracts (base and riders)."""
+    return sample_files("disabled_lives")
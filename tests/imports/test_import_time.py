@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import sys
+
+import footings_idi_model
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(footings_idi_model.__file__))
+
+CODE = """
+import json, sys
+import {module}
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def _import(module, cwd):
+    """Import module in a new process (from cwd) returning the modules imported."""
+    env = {**os.environ, "PYTHONPATH": PACKAGE_DIRECTORY}
+    result = subprocess.run(
+        [sys.executable, "-c", CODE.format(module=module)],
+        capture_output=True,
+        check=True,
+        cwd=cwd,
+        env=env,
+        text=True,
+    )
+    return set(json.loads(result.stdout.strip().splitlines()[-1]))
+
+
+def test_import_package(tmpdir):
+    modules = _import("footings_idi_model", tmpdir)
+    assert not {"pandas", "dask", "git", "footings"} & modules
+
+
+def test_import_extract_model(tmpdir):
+    # imported outside of a git repository (e.g., a deployment) only the disabled lives
+    # policy models are imported and dask and git are left until used
+    modules = _import("footings_idi_model.models.extract_models.disabled_lives", tmpdir)
+    assert not {"dask", "git"} & modules
+    policy_models = {
+        module.split(".")[-1]
+        for module in modules
+        if module.startswith("footings_idi_model.models.policy_models.")
+    }
+    assert all(module.startswith("disabled") for module in policy_models)
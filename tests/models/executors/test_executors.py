@@ -0,0 +1,56 @@
+import sys
+
+import pytest
+from footings.exceptions import Error
+
+from footings_idi_model.models.executors import (
+    _error_keys,
+    error_record_key,
+    make_chunks,
+    schedule_chunks,
+)
+
+
+def test_make_chunks():
+    records = list(range(10))
+    assert make_chunks(records, n_workers=1, chunk_size=4) == [
+        [0, 1, 2, 3],
+        [4, 5, 6, 7],
+        [8, 9],
+    ]
+    assert make_chunks([], n_workers=2) == []
+
+
+@pytest.mark.parametrize("n_chunks", [1, 2, 3, 5])
+def test_schedule_chunks(n_chunks):
+    costs = [100, 1, 1, 50, 50, 2, 3, 1, 90, 5]
+    chunks = schedule_chunks(costs, n_chunks)
+    positions = sorted(p for chunk in chunks for p in chunk)
+    assert positions == list(range(len(costs)))
+    assert all(chunk == sorted(chunk) for chunk in chunks)
+    totals = [sum(costs[p] for p in chunk) for chunk in chunks]
+    assert totals == sorted(totals, reverse=True)
+    # LPT bound
+    assert max(totals) <= sum(costs) / len(chunks) + max(costs)
+
+
+def test_schedule_chunks_balanced():
+    costs = [480, 12, 12, 12, 360, 24, 12, 240, 12, 12, 120, 12]
+    chunks = schedule_chunks(costs, 3)
+    totals = [sum(costs[p] for p in chunk) for chunk in chunks]
+    assert totals == [480, 420, 408]
+
+
+@pytest.mark.parametrize("n_scenarios", [None, 2])
+def test_error_record_key(n_scenarios):
+    # the coverage id is read from the key even when the policy id contains another
+    record = {"policy_id": "M1'COLA'", "coverage_id": "COLA2", "claim_id": "C1"}
+    for key in _error_keys(record, n_scenarios):
+        try:
+            raise ValueError("error")
+        except ValueError:
+            error = Error.create(key=key, sys_info=sys.exc_info())
+        assert error_record_key(error) == {
+            "policy_id": "M1'COLA'",
+            "coverage_id": "COLA2",
+        }
@@ -74,3 +74,23 @@ def test_active_lives_model(case, tempdir, shutdown_only):
         "*LAST_COMMIT",
     ]
     assert_footings_files_equal(test_file, expected_file, exclude_keys=exlcude_list)
+
+
+@pytest.mark.parametrize("executor", ["serial", "process"])
+def test_active_lives_executors(executor):
+    parameters = CASES[0][1]
+    expected, _, expected_errors = ActiveLivesValEMD(**parameters).run()
+    projected, _, errors = ActiveLivesValEMD(
+        **parameters, executor=executor, n_workers=2, chunk_size=3
+    ).run()
+    pd.testing.assert_frame_equal(projected, expected)
+    assert len(errors) == len(expected_errors)
+
+
+def test_active_lives_time_0_only():
+    parameters = CASES[0][1]
+    _, expected, expected_errors = ActiveLivesValEMD(**parameters).run()
+    projected, time_0, errors = ActiveLivesValEMD(**parameters, time_0_only=True).run()
+    pd.testing.assert_frame_equal(time_0, expected)
+    assert len(projected) == len(time_0)
+    assert len(errors) == len(expected_errors)
@@ -6,6 +6,8 @@ from footings.audit import AuditConfig, AuditStepConfig
 from footings.testing import assert_footings_files_equal
 
 from footings_idi_model.models import DisabledLivesValEMD
+from footings_idi_model.outputs import OutputPolicy
+from footings_idi_model.outputs.policy import RUN_COLUMNS
 
 # import ray
 
@@ -72,3 +74,94 @@ def test_disabled_lives_deterministic(case, tempdir, shutdown_only):
         "*LAST_COMMIT",
     ]
     assert_footings_files_equal(test_file, expected_file, exclude_keys=exlcude_list)
+
+
+@pytest.mark.parametrize("executor", ["serial", "process"])
+def test_disabled_lives_executors(executor):
+    parameters = CASES[0][1]
+    expected, _, expected_errors = DisabledLivesValEMD(**parameters).run()
+    projected, _, errors = DisabledLivesValEMD(
+        **parameters, executor=executor, n_workers=2, chunk_size=5
+    ).run()
+    pd.testing.assert_frame_equal(projected, expected)
+    assert len(errors) == len(expected_errors)
+
+
+def test_disabled_lives_aggregate():
+    parameters = CASES[0][1]
+    by = ["COVERAGE_ID", "IDI_CONTRACT", "IDI_BENEFIT_PERIOD", "DATE_DLR"]
+    projected, time_0, _ = DisabledLivesValEMD(**parameters).run()
+    records = extract_base[["POLICY_ID", "CLAIM_ID", "COVERAGE_ID"] + by[1:3]]
+    keys = ["POLICY_ID", "CLAIM_ID", "COVERAGE_ID"]
+    expected = projected.merge(records, on=keys).groupby(by, as_index=False)["DLR"].sum()
+    expected_time_0 = (
+        time_0.merge(records, on=keys)
+        .groupby(by, as_index=False)["DLR"]
+        .sum()
+        .reset_index(drop=True)
+    )
+
+    aggregated, aggregated_time_0, _ = DisabledLivesValEMD(
+        **parameters, aggregate_by=by, executor="process", n_workers=2, chunk_size=5
+    ).run()
+    pd.testing.assert_frame_equal(aggregated, expected, check_dtype=False)
+    pd.testing.assert_frame_equal(aggregated_time_0, expected_time_0, check_dtype=False)
+
+
+@pytest.mark.parametrize("execution_mode", ["foreach", "batch"])
+def test_disabled_lives_deduplicate(execution_mode):
+    # every record twice (the copies differ only in POLICY_ID and CLAIM_ID)
+    copies = extract_base.assign(
+        POLICY_ID=extract_base["POLICY_ID"] + "-2",
+        CLAIM_ID=extract_base["CLAIM_ID"] + "-2",
+    )
+    rider_copies = extract_riders.assign(
+        POLICY_ID=extract_riders["POLICY_ID"] + "-2",
+        CLAIM_ID=extract_riders["CLAIM_ID"] + "-2",
+    )
+    parameters = {
+        **CASES[0][1],
+        "extract_base": pd.concat([extract_base, copies], ignore_index=True),
+        "extract_riders": pd.concat([extract_riders, rider_copies], ignore_index=True),
+        "execution_mode": execution_mode,
+        "executor": "process",
+        "n_workers": 2,
+        "chunk_size": 5,
+    }
+    expected, expected_time_0, expected_errors = DisabledLivesValEMD(**parameters).run()
+    projected, time_0, errors = DisabledLivesValEMD(**parameters, deduplicate=True).run()
+    pd.testing.assert_frame_equal(projected, expected)
+    pd.testing.assert_frame_equal(time_0, expected_time_0)
+    assert [e.key for e in errors] == [e.key for e in expected_errors]
+
+
+@pytest.mark.parametrize("execution_mode", ["foreach", "batch"])
+def test_disabled_lives_time_0_only(execution_mode):
+    parameters = {**CASES[0][1], "execution_mode": execution_mode}
+    _, expected, expected_errors = DisabledLivesValEMD(**parameters).run()
+    projected, time_0, errors = DisabledLivesValEMD(**parameters, time_0_only=True).run()
+    pd.testing.assert_frame_equal(time_0, expected)
+    assert len(projected) == len(time_0)
+    assert len(errors) == len(expected_errors)
+
+
+def test_disabled_lives_output_policy():
+    parameters = CASES[0][1]
+    expected, expected_time_0, _ = DisabledLivesValEMD(**parameters).run()
+    policy = OutputPolicy(float_dtype="float32", categorical=True, run_metadata="attrs")
+    projected, time_0, _ = DisabledLivesValEMD(**parameters, output_policy=policy).run()
+
+    for frame, expected_frame in [(projected, expected), (time_0, expected_time_0)]:
+        assert frame.attrs["run_metadata"] == {
+            col: expected_frame[col].iat[0] for col in RUN_COLUMNS
+        }
+        assert frame["POLICY_ID"].dtype == "category"
+        assert frame["DLR"].dtype == "float32"
+        pd.testing.assert_frame_equal(
+            frame,
+            expected_frame.drop(columns=RUN_COLUMNS),
+            check_dtype=False,
+            check_categorical=False,
+            check_exact=False,
+            rtol=1e-6,
+        )
@@ -0,0 +1,256 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from footings_idi_model.models import DisabledLivesValEMD, run_extract_stream
+from footings_idi_model.outputs import (
+    COMPACT_OUTPUT,
+    CSVSink,
+    DisabledLivesValOutput,
+    ParquetSink,
+)
+
+PARAMETERS = {
+    "valuation_dt": pd.Timestamp("2020-03-31"),
+    "assumption_set": "STAT",
+    "execution_mode": "batch",
+}
+DROP_COLS = ["MODEL_VERSION", "LAST_COMMIT", "RUN_DATE_TIME"]
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000])
+def test_run_extract_stream(
+    chunk_size, tmpdir, disabled_lives_sample, disabled_lives_sample_files
+):
+    extract_base_file, extract_riders_file = disabled_lives_sample_files
+    extract_base, extract_riders = disabled_lives_sample
+    _, expected, _ = DisabledLivesValEMD(
+        extract_base=extract_base, extract_riders=extract_riders, **PARAMETERS
+    ).run()
+
+    summary = run_extract_stream(
+        DisabledLivesValEMD,
+        extract_base_file,
+        extract_riders_file,
+        CSVSink(str(tmpdir)),
+        stream_chunk_size=chunk_size,
+        **PARAMETERS,
+    )
+    assert summary == {
+        "chunks": -(-len(extract_base) // chunk_size),
+        "records": len(extract_base),
+        "errors": 0,
+    }
+
+    time_0 = pd.read_csv(tmpdir.join("time_0.csv"), parse_dates=["DATE_DLR"])
+    expected = expected.drop(columns=DROP_COLS).reset_index(drop=True)
+    pd.testing.assert_frame_equal(
+        time_0.drop(columns=DROP_COLS), expected, check_dtype=False
+    )
+    projected = pd.read_csv(tmpdir.join("projected.csv"))
+    assert projected.groupby(["POLICY_ID", "CLAIM_ID", "COVERAGE_ID"]).ngroups == len(
+        expected
+    )
+
+
+def test_run_extract_stream_parquet(tmpdir, disabled_lives_sample):
+    pytest.importorskip("pyarrow")
+    extract_base, extract_riders = disabled_lives_sample
+    expected_projected, expected, _ = DisabledLivesValEMD(
+        extract_base=extract_base, extract_riders=extract_riders, **PARAMETERS
+    ).run()
+
+    extract_base_parquet = str(tmpdir.join("extract-base.parquet"))
+    extract_base.to_parquet(extract_base_parquet)
+    output = str(tmpdir.join("output"))
+    sink = ParquetSink(output, output=DisabledLivesValOutput)
+    run_extract_stream(
+        DisabledLivesValEMD,
+        extract_base_parquet,
+        extract_riders,
+        sink,
+        stream_chunk_size=7,
+        **PARAMETERS,
+    )
+
+    time_0 = pd.read_parquet(os.path.join(output, "time_0.parquet"))
+    pd.testing.assert_frame_equal(
+        time_0.drop(columns=DROP_COLS),
+        expected.drop(columns=DROP_COLS).reset_index(drop=True),
+        check_dtype=False,
+    )
+    assert sorted(os.listdir(os.path.join(output, "projected"))) == sorted(
+        f"COVERAGE_ID={coverage_id}"
+        for coverage_id in extract_base["COVERAGE_ID"].unique()
+    )
+    base = pd.read_parquet(os.path.join(output, "projected", "COVERAGE_ID=BASE"))
+    assert len(base) == (expected_projected["COVERAGE_ID"] == "BASE").sum()
+
+
+def test_run_extract_stream_parquet_compact(tmpdir, disabled_lives_sample):
+    pytest.importorskip("pyarrow")
+    extract_base, extract_riders = disabled_lives_sample
+    _, expected, _ = DisabledLivesValEMD(
+        extract_base=extract_base, extract_riders=extract_riders, **PARAMETERS
+    ).run()
+
+    output = str(tmpdir.join("output"))
+    run_extract_stream(
+        DisabledLivesValEMD,
+        extract_base,
+        extract_riders,
+        ParquetSink(output, output=DisabledLivesValOutput),
+        stream_chunk_size=7,
+        output_policy=COMPACT_OUTPUT,
+        **PARAMETERS,
+    )
+
+    with open(os.path.join(output, "run.json")) as file:
+        assert sorted(json.load(file)) == sorted(DROP_COLS)
+    time_0 = pd.read_parquet(os.path.join(output, "time_0.parquet"))
+    assert time_0["POLICY_ID"].dtype == "category"
+    pd.testing.assert_frame_equal(
+        time_0,
+        expected.drop(columns=DROP_COLS).reset_index(drop=True),
+        check_dtype=False,
+        check_categorical=False,
+    )
+    projected = pd.read_parquet(os.path.join(output, "projected"))
+    assert "MODEL_VERSION" not in projected.columns
+
+
+class FailingSink(CSVSink):
+    """A CSV sink that fails (after writing) on a chunk to mimic a crash."""
+
+    def __init__(self, directory, fail_on=None):
+        super().__init__(directory)
+        self.fail_on = fail_on
+        self.chunks = []
+
+    def write(self, chunk, projected, time_0, errors):
+        super().write(chunk, projected, time_0, errors)
+        self.chunks.append(chunk)
+        if chunk == self.fail_on:
+            raise RuntimeError("crash")
+
+
+def test_run_extract_stream_checkpoint(tmpdir, disabled_lives_sample_files):
+    extract_base_file, extract_riders_file = disabled_lives_sample_files
+    output = str(tmpdir.join("output"))
+    checkpoint = str(tmpdir.join("manifest.json"))
+    kwargs = {"stream_chunk_size": 4, "checkpoint": checkpoint, **PARAMETERS}
+
+    sink = FailingSink(output, fail_on=2)
+    with pytest.raises(RuntimeError):
+        run_extract_stream(
+            DisabledLivesValEMD, extract_base_file, extract_riders_file, sink, **kwargs
+        )
+    assert sink.chunks == [0, 1, 2]
+
+    sink = FailingSink(output)
+    summary = run_extract_stream(
+        DisabledLivesValEMD, extract_base_file, extract_riders_file, sink, **kwargs
+    )
+    assert sink.chunks == [2, 3]
+    assert summary == {"chunks": 4, "records": 15, "errors": 0}
+
+    # a finished run is not ran again
+    sink = FailingSink(output)
+    run_extract_stream(
+        DisabledLivesValEMD, extract_base_file, extract_riders_file, sink, **kwargs
+    )
+    assert sink.chunks == []
+
+    expected = str(tmpdir.join("expected"))
+    run_extract_stream(
+        DisabledLivesValEMD,
+        extract_base_file,
+        extract_riders_file,
+        CSVSink(expected),
+        stream_chunk_size=4,
+        **PARAMETERS,
+    )
+    for name in ["projected", "time_0"]:
+        pd.testing.assert_frame_equal(
+            pd.read_csv(os.path.join(output, f"{name}.csv")).drop(columns=DROP_COLS),
+            pd.read_csv(os.path.join(expected, f"{name}.csv")).drop(columns=DROP_COLS),
+        )
+
+
+def test_run_extract_stream_checkpoint_workers(tmpdir, disabled_lives_sample_files):
+    # a rerun with fewer workers (e.g., after running out of memory) resumes the run
+    extract_base_file, extract_riders_file = disabled_lives_sample_files
+    output = str(tmpdir.join("output"))
+    checkpoint = str(tmpdir.join("manifest.json"))
+    kwargs = {"stream_chunk_size": 4, "checkpoint": checkpoint, **PARAMETERS}
+
+    sink = FailingSink(output, fail_on=1)
+    with pytest.raises(RuntimeError):
+        run_extract_stream(
+            DisabledLivesValEMD,
+            extract_base_file,
+            extract_riders_file,
+            sink,
+            executor="serial",
+            n_workers=4,
+            **kwargs,
+        )
+
+    sink = FailingSink(output)
+    run_extract_stream(
+        DisabledLivesValEMD,
+        extract_base_file,
+        extract_riders_file,
+        sink,
+        executor="process",
+        n_workers=2,
+        chunk_size=2,
+        **kwargs,
+    )
+    assert sink.chunks == [1, 2, 3]
+
+
+def test_run_extract_stream_checkpoint_time_steps(tmpdir, disabled_lives_sample_files):
+    extract_base_file, extract_riders_file = disabled_lives_sample_files
+    output = str(tmpdir.join("output"))
+    checkpoint = str(tmpdir.join("manifest.json"))
+    kwargs = {"stream_chunk_size": 4, "checkpoint": checkpoint, **PARAMETERS}
+
+    sink = FailingSink(output, fail_on=1)
+    with pytest.raises(RuntimeError):
+        run_extract_stream(
+            DisabledLivesValEMD,
+            extract_base_file,
+            extract_riders_file,
+            sink,
+            time_steps=True,
+            **kwargs,
+        )
+
+    # the chunks completed before the crash are counted but not timed
+    summary = run_extract_stream(
+        DisabledLivesValEMD,
+        extract_base_file,
+        extract_riders_file,
+        FailingSink(output),
+        time_steps=True,
+        **kwargs,
+    )
+    assert {k: summary[k] for k in ["chunks", "records", "errors"]} == {
+        "chunks": 4,
+        "records": 15,
+        "errors": 0,
+    }
+    full = run_extract_stream(
+        DisabledLivesValEMD,
+        extract_base_file,
+        extract_riders_file,
+        CSVSink(str(tmpdir.join("full"))),
+        stream_chunk_size=4,
+        time_steps=True,
+        **PARAMETERS,
+    )
+    calls = summary["step_timings"].to_frame()["CALLS"].sum()
+    assert 0 < calls < full["step_timings"].to_frame()["CALLS"].sum()
@@ -0,0 +1,126 @@
+import pandas as pd
+import pytest
+
+from footings_idi_model.models.policy_models.active_deterministic_base import (
+    ActiveLifeBaseClaimCostModel,
+)
+from footings_idi_model.models.policy_models.active_deterministic_base import (
+    claim_cost_model as base_claim_cost_model,
+)
+from footings_idi_model.models.policy_models.active_deterministic_claim_cost import (
+    CacheInfo,
+    ClaimCostCache,
+    ClaimCostModel,
+)
+from footings_idi_model.models.policy_models.active_deterministic_cola import (
+    claim_cost_model as cola_claim_cost_model,
+)
+
+PARAMETERS = {
+    "assumption_set": "STAT",
+    "gender": "M",
+    "birth_dt": pd.Timestamp("1970-02-10"),
+    "elimination_period": 90,
+    "idi_contract": "AS",
+    "idi_benefit_period": "TO67",
+    "idi_occupation_class": "M",
+    "cola_percent": 0.03,
+    "benefit_amount": 200.0,
+    "modifier_ctr": 1.0,
+    "modifier_interest": 1.0,
+}
+
+CASES = [
+    ("base", base_claim_cost_model, pd.Timestamp("2020-02-10")),
+    ("base_leap_day", base_claim_cost_model, pd.Timestamp("2020-02-29")),
+    ("cola", cola_claim_cost_model, pd.Timestamp("2020-02-10")),
+]
+
+
+@pytest.mark.parametrize("case", CASES, ids=[x[0] for x in CASES])
+def test_active_deterministic_claim_cost(case):
+    name, claim_cost_model, policy_start_dt = case
+    termination_dt = pd.Timestamp("2037-02-10")
+    incurred_dts = pd.date_range(policy_start_dt, periods=17, freq=pd.DateOffset(years=1))
+    termination_dts = [termination_dt] * len(incurred_dts)
+
+    test = claim_cost_model(
+        incurred_dt=incurred_dts,
+        termination_dt=termination_dts,
+        idi_diagnosis_grp="AG",
+        **PARAMETERS,
+    )
+
+    expected = [
+        claim_cost_model.model(
+            policy_id="M1",
+            claim_id="NA",
+            idi_diagnosis_grp="AG",
+            incurred_dt=incurred_dt,
+            valuation_dt=incurred_dt,
+            termination_dt=termination_dt,
+            **PARAMETERS,
+        )
+        .run()["DLR"]
+        .iat[0]
+        for incurred_dt in incurred_dts
+    ]
+    pd.testing.assert_series_equal(pd.Series(test), pd.Series(expected), atol=0.01)
+
+
+def test_claim_cost_cache():
+    cache = ClaimCostCache(maxsize=2)
+    claim_cost_model = ClaimCostModel(ActiveLifeBaseClaimCostModel, cache=cache)
+    incurred_dts = pd.to_datetime(["2020-02-10", "2021-02-10", "2022-02-10"])
+    kwargs = {
+        "termination_dt": [pd.Timestamp("2023-05-10")] * 2,
+        "idi_diagnosis_grp": "AG",
+        **{**PARAMETERS, "idi_benefit_period": "24M"},
+    }
+
+    first = claim_cost_model(incurred_dt=incurred_dts[:2], **kwargs)
+    assert cache.cache_info() == CacheInfo(0, 2, 0, 2, 2)
+
+    second = claim_cost_model(incurred_dt=incurred_dts[:2], **kwargs)
+    assert cache.cache_info() == CacheInfo(2, 2, 0, 2, 2)
+    pd.testing.assert_series_equal(pd.Series(first), pd.Series(second))
+
+    claim_cost_model(incurred_dt=incurred_dts[1:], **kwargs)
+    assert cache.cache_info() == CacheInfo(3, 3, 1, 2, 2)
+
+    cache.cache_clear()
+    assert cache.cache_info() == CacheInfo(0, 0, 0, 2, 0)
+
+
+def test_claim_cost_cache_shared():
+    cache = ClaimCostCache(maxsize=10)
+    claim_cost_model = ClaimCostModel(ActiveLifeBaseClaimCostModel, cache=cache)
+    kwargs = {**PARAMETERS, "idi_diagnosis_grp": "AG"}
+    first = claim_cost_model(
+        incurred_dt=[pd.Timestamp("2021-03-10")],
+        termination_dt=[pd.Timestamp("2037-02-09")],
+        **kwargs,
+    )
+
+    # a policy incurred 5 days later with the same age, claim months and partial months
+    # (2 of 31 days paid in the first month) and twice the benefit
+    second = claim_cost_model(
+        incurred_dt=[pd.Timestamp("2021-03-15")],
+        termination_dt=[pd.Timestamp("2037-02-14")],
+        **{**kwargs, "birth_dt": pd.Timestamp("1970-02-15"), "benefit_amount": 400.0},
+    )
+    assert cache.cache_info() == CacheInfo(1, 1, 0, 10, 1)
+    expected = (
+        ActiveLifeBaseClaimCostModel(
+            policy_id="M1",
+            claim_id="NA",
+            incurred_dt=pd.Timestamp("2021-03-15"),
+            valuation_dt=pd.Timestamp("2021-03-15"),
+            termination_dt=pd.Timestamp("2037-02-14"),
+            **{**kwargs, "birth_dt": pd.Timestamp("1970-02-15"), "benefit_amount": 400.0},
+        )
+        .run()["DLR"]
+        .iat[0]
+    )
+    assert second[0] == pytest.approx(expected, abs=0.01)
+    assert second[0] == pytest.approx(2 * first[0], abs=0.01)
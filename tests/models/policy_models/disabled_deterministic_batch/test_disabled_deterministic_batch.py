@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from footings_idi_model.models import DisabledLivesValEMD
+
+CASES = [
+    ("month_end", pd.Timestamp("2020-03-31")),
+    ("mid_month", pd.Timestamp("2020-03-15")),
+    ("leap_day", pd.Timestamp("2020-02-29")),
+]
+
+
+@pytest.mark.parametrize("case", CASES, ids=[x[0] for x in CASES])
+def test_disabled_deterministic_batch(case, disabled_lives_sample):
+    name, valuation_dt = case
+    extract_base, extract_riders = disabled_lives_sample
+    parameters = {
+        "extract_base": extract_base,
+        "extract_riders": extract_riders,
+        "valuation_dt": valuation_dt,
+        "assumption_set": "STAT",
+        "modifier_ctr": 1.1,
+        "modifier_interest": 0.9,
+    }
+    foreach = DisabledLivesValEMD(**parameters, execution_mode="foreach").run()
+    batch = DisabledLivesValEMD(**parameters, execution_mode="batch").run()
+    for test, expected in zip(batch[:2], foreach[:2]):
+        pd.testing.assert_frame_equal(test, expected)
+    assert [error.key for error in batch[2]] == [error.key for error in foreach[2]]
+
+
+@pytest.mark.parametrize("execution_mode", ["batch", "factors"])
+def test_disabled_deterministic_batch_errors(execution_mode, disabled_lives_sample):
+    # a record failing while valued only fails itself (as the policy models)
+    extract_base, extract_riders = disabled_lives_sample
+    base = extract_base.astype({"BENEFIT_AMOUNT": object})
+    base.loc[3, "BENEFIT_AMOUNT"] = "abc"
+    parameters = {
+        "extract_base": base,
+        "extract_riders": extract_riders,
+        "valuation_dt": pd.Timestamp("2020-03-31"),
+        "assumption_set": "STAT",
+    }
+    _, expected, expected_errors = DisabledLivesValEMD(
+        **parameters, execution_mode="foreach"
+    ).run()
+    _, time_0, errors = DisabledLivesValEMD(
+        **parameters, execution_mode=execution_mode
+    ).run()
+    assert len(expected_errors) == 1
+    assert [error.key for error in errors] == [error.key for error in expected_errors]
+    pd.testing.assert_frame_equal(time_0, expected)
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+from footings.exceptions import ModelRunError
+
+from footings_idi_model.extracts import DisabledLivesBaseExtract
+from footings_idi_model.models import DisabledLivesValEMD
+from footings_idi_model.models.policy_models import (
+    build_reserve_factors,
+    load_reserve_factors,
+)
+from footings_idi_model.models.records import RecordBatch
+
+CASES = [
+    ("month_end", pd.Timestamp("2020-03-31")),
+    ("mid_month", pd.Timestamp("2020-03-15")),
+    ("leap_day", pd.Timestamp("2020-02-29")),
+]
+
+PARAMETERS = {"assumption_set": "STAT", "modifier_ctr": 1.1, "modifier_interest": 0.9}
+
+
+@pytest.fixture(scope="module")
+def parameters(disabled_lives_sample):
+    extract_base, extract_riders = disabled_lives_sample
+    return {**PARAMETERS, "extract_base": extract_base, "extract_riders": extract_riders}
+
+
+@pytest.fixture(scope="module")
+def records(disabled_lives_sample):
+    extract_base, _ = disabled_lives_sample
+    return RecordBatch.from_extract(
+        extract_base, DisabledLivesBaseExtract, drop=("IDI_MARKET", "TOBACCO_USAGE")
+    )
+
+
+@pytest.mark.parametrize("case", CASES, ids=[x[0] for x in CASES])
+def test_disabled_deterministic_factors(case, parameters, records, tmpdir):
+    name, valuation_dt = case
+    parameters = {**parameters, "valuation_dt": valuation_dt}
+    batch = DisabledLivesValEMD(**parameters, execution_mode="batch", time_0_only=True)
+    expected, expected_time_0, expected_errors = batch.run()
+
+    factors = build_reserve_factors(
+        records, assumption_set="STAT", modifier_ctr=1.1, modifier_interest=0.9
+    )
+    path = str(tmpdir.join("factors.npz"))
+    factors.save(path)
+    assert len(load_reserve_factors(path)) == len(factors)
+
+    projected, time_0, errors = DisabledLivesValEMD(
+        **parameters, execution_mode="factors", reserve_factors=path
+    ).run()
+    pd.testing.assert_frame_equal(projected, expected, check_exact=False, rtol=1e-9)
+    pd.testing.assert_frame_equal(time_0, expected_time_0)
+    assert [error.key for error in errors] == [error.key for error in expected_errors]
+
+
+def test_disabled_deterministic_factors_assumptions(parameters, records):
+    parameters = {**parameters, "valuation_dt": pd.Timestamp("2020-03-31")}
+    factors = build_reserve_factors(records, assumption_set="STAT")
+    with pytest.raises(ModelRunError, match="modifier_ctr"):
+        DisabledLivesValEMD(
+            **parameters, execution_mode="factors", reserve_factors=factors
+        ).run()
@@ -0,0 +1,103 @@
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from footings_idi_model.extracts import DisabledLivesBaseExtract
+from footings_idi_model.models import ActiveLivesValEMD, DisabledLivesValEMD
+from footings_idi_model.models.records import RecordBatch
+
+extract_base = pd.DataFrame(
+    {
+        "POLICY_ID": ["M1", "M1", "M2"],
+        "CLAIM_ID": ["M1C1", "M1C1", "M2C1"],
+        "COVERAGE_ID": ["BASE", "RES", "RES"],
+        "INCURRED_DT": ["2015-01-01", "2015-01-01", "2016-06-01"],
+        "BENEFIT_AMOUNT": [100.0, 50.0, 75.0],
+        "IDI_MARKET": ["INDV", "INDV", "INDV"],
+    }
+)
+extract_riders = pd.DataFrame(
+    {
+        "POLICY_ID": ["M1", "M1"],
+        "CLAIM_ID": ["M1C1", "M1C1"],
+        "COVERAGE_ID": ["BASE", "RES"],
+        "RIDER_ATTRIBUTE": ["residual_benefit_percent", "residual_benefit_percent"],
+        "VALUE": [0.1, 0.5],
+    }
+)
+
+
+def test_record_batch_from_extract():
+    records = RecordBatch.from_extract(
+        extract_base,
+        DisabledLivesBaseExtract,
+        riders=extract_riders,
+        rider_keys=("policy_id", "claim_id", "coverage_id"),
+        rider_coverages=("RES",),
+        drop=("IDI_MARKET",),
+    )
+    assert len(records) == 3
+    assert records.column("incurred_dt").dtype == np.dtype("datetime64[ns]")
+    assert records.column("residual_benefit_percent").dtype == np.dtype("float64")
+    rows = records.to_records()
+    # the rider attributes are only on the RES record with a rider
+    assert "residual_benefit_percent" not in rows[0]
+    assert rows[1]["residual_benefit_percent"] == 0.5
+    assert "residual_benefit_percent" not in rows[2]
+    assert "idi_market" not in rows[0]
+    assert rows[2]["incurred_dt"] == pd.Timestamp("2016-06-01")
+    assert list(records) == rows
+    assert records[1] == rows[1]
+
+
+def test_record_batch_chunks():
+    records = RecordBatch.from_extract(extract_base)
+    chunk = records[1:3]
+    assert len(chunk) == 2
+    # slices are views of the columns
+    assert np.shares_memory(
+        chunk.column("benefit_amount"), records.column("benefit_amount")
+    )
+    assert [r["policy_id"] for r in records.take([2, 0])] == ["M2", "M1"]
+    assert pickle.loads(pickle.dumps(chunk)).to_records() == chunk.to_records()
+
+
+def test_record_batch_deduplicate():
+    records = RecordBatch.from_extract(
+        pd.concat([extract_base, extract_base.assign(POLICY_ID="M4")], ignore_index=True)
+    )
+    unique, inverse = records.deduplicate(("policy_id",))
+    assert len(unique) == 3
+    assert inverse.tolist() == [0, 1, 2, 0, 1, 2]
+    assert unique.to_records() == records[:3].to_records()
+    unique, inverse = records.deduplicate()
+    assert len(unique) == 6
+
+
+AUDIT_CASES = [
+    (ActiveLivesValEMD, "active_lives", {"net_benefit_method": "NLP"}),
+    (DisabledLivesValEMD, "disabled_lives", {}),
+]
+
+
+@pytest.mark.parametrize("case", AUDIT_CASES, ids=[x[1] for x in AUDIT_CASES])
+def test_record_batch_audit(case, request, tmp_path):
+    model, name, parameters = case
+    base, riders = request.getfixturevalue(f"{name}_sample")
+    test_file = os.path.join(tmp_path, "audit.json")
+    model(
+        extract_base=base,
+        extract_riders=riders,
+        valuation_dt=pd.Timestamp("2020-03-31"),
+        assumption_set="STAT",
+        **parameters,
+    ).audit(test_file)
+    with open(test_file) as file:
+        audit = json.load(file)
+    records = audit["steps"]["_create_records"]["output"]["intermediate.records"]
+    # the records are audited as a list of dicts (one for each row of the extract)
+    assert [record["policy_id"] for record in records] == base["POLICY_ID"].tolist()
@@ -0,0 +1,117 @@
+import pandas as pd
+import pytest
+from footings.exceptions import Error
+
+from footings_idi_model.models import (
+    ActiveLivesValEMD,
+    DisabledLivesValEMD,
+    DValBasePMD,
+)
+from footings_idi_model.models.sensitivities import run_scenarios, step_sensitivities
+
+POLICY = {
+    "valuation_dt": pd.Timestamp("2005-02-10"),
+    "assumption_set": "STAT",
+    "policy_id": "M1",
+    "claim_id": "M1C1",
+    "gender": "M",
+    "birth_dt": pd.Timestamp("1970-02-10"),
+    "incurred_dt": pd.Timestamp("2005-02-10"),
+    "termination_dt": pd.Timestamp("2037-02-10"),
+    "elimination_period": 90,
+    "idi_contract": "AS",
+    "idi_benefit_period": "TO67",
+    "idi_diagnosis_grp": "AG",
+    "idi_occupation_class": "M",
+    "cola_percent": 0.0,
+    "benefit_amount": 100.0,
+}
+
+SCENARIOS = [
+    {},
+    {"modifier_interest": 0.9},
+    {"modifier_ctr": 1.1},
+    {"modifier_ctr": 1.1, "modifier_interest": 0.9},
+]
+
+
+def test_step_sensitivities():
+    model = DValBasePMD(**POLICY)
+    assert step_sensitivities(model, "_get_ctr_table") == ("modifier_ctr",)
+    assert step_sensitivities(model, "_calculate_discount") == ("modifier_interest",)
+    assert step_sensitivities(model, "_create_frame") == ()
+
+
+def test_run_scenarios():
+    results = run_scenarios(DValBasePMD(**POLICY), SCENARIOS)
+    for scenario, result in zip(SCENARIOS, results):
+        expected = DValBasePMD(**POLICY, **scenario).run()
+        pd.testing.assert_frame_equal(result, expected)
+
+
+def test_run_scenarios_errors():
+    scenarios = [{}, {"modifier_ctr": "error"}]
+    key = ({"policy_id": "M1"},)
+    result, error = run_scenarios(DValBasePMD(**POLICY), scenarios, error_key=key)
+    pd.testing.assert_frame_equal(result, DValBasePMD(**POLICY).run())
+    assert isinstance(error, Error)
+    assert error.key == str(({"policy_id": "M1"}, {"scenario": 1}))
+
+
+@pytest.mark.parametrize("execution_mode", ["foreach", "batch"])
+def test_disabled_lives_scenarios(execution_mode, disabled_lives_sample):
+    extract_base, extract_riders = disabled_lives_sample
+    parameters = {
+        "extract_base": extract_base,
+        "extract_riders": extract_riders,
+        "valuation_dt": pd.Timestamp("2020-03-31"),
+        "assumption_set": "STAT",
+        "execution_mode": execution_mode,
+        "executor": "process",
+        "n_workers": 2,
+        "chunk_size": 5,
+    }
+    projected, time_0, errors = DisabledLivesValEMD(
+        **parameters, scenarios=SCENARIOS
+    ).run()
+    for i, scenario in enumerate(SCENARIOS):
+        expected, expected_time_0, expected_errors = DisabledLivesValEMD(
+            **parameters, **scenario
+        ).run()
+        frame = projected[projected["SCENARIO"] == i].drop(columns="SCENARIO")
+        pd.testing.assert_frame_equal(frame, expected)
+        frame = time_0[time_0["SCENARIO"] == i].drop(columns="SCENARIO")
+        pd.testing.assert_frame_equal(frame, expected_time_0)
+    assert len(errors) == len(SCENARIOS) * len(expected_errors)
+
+
+def test_active_lives_scenarios(active_lives_sample):
+    extract_base, extract_riders = active_lives_sample
+    parameters = {
+        "extract_base": extract_base,
+        "extract_riders": extract_riders,
+        "valuation_dt": pd.Timestamp("2020-03-31"),
+        "assumption_set": "STAT",
+        "net_benefit_method": "NLP",
+        "executor": "serial",
+    }
+    scenarios = [{"modifier_interest": 0.9}, {"modifier_lapse": 1.2}]
+    projected, time_0, _ = ActiveLivesValEMD(**parameters, scenarios=scenarios).run()
+    for i, scenario in enumerate(scenarios):
+        expected, expected_time_0, _ = ActiveLivesValEMD(**parameters, **scenario).run()
+        frame = projected[projected["SCENARIO"] == i].drop(columns="SCENARIO")
+        pd.testing.assert_frame_equal(frame, expected)
+        frame = time_0[time_0["SCENARIO"] == i].drop(columns="SCENARIO")
+        pd.testing.assert_frame_equal(frame, expected_time_0)
+
+
+def test_scenarios_unknown_modifier(disabled_lives_sample):
+    extract_base, extract_riders = disabled_lives_sample
+    with pytest.raises(ValueError):
+        DisabledLivesValEMD(
+            extract_base=extract_base,
+            extract_riders=extract_riders,
+            valuation_dt=pd.Timestamp("2020-03-31"),
+            assumption_set="STAT",
+            scenarios=[{"modifier_lapse": 1.2}],
+        )
@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+from footings_idi_model.models import DisabledLivesValEMD
+from footings_idi_model.models.policy_models.disabled_deterministic_base import STEPS
+from footings_idi_model.models.timings import StepTimings
+
+
+def test_step_timings():
+    timings = StepTimings()
+    timings.add("DValBasePMD", "_create_frame", 1.0)
+    other = StepTimings()
+    other.add("DValBasePMD", "_create_frame", 2.0, calls=2)
+    other.add("DValCatRPMD", "_create_frame", 1.0)
+    timings.update(other)
+    frame = timings.to_frame()
+    assert list(frame["MODEL"]) == ["DValBasePMD", "DValCatRPMD"]
+    assert list(frame["CALLS"]) == [3, 1]
+    assert list(frame["SECONDS_PER_CALL"]) == [1.0, 1.0]
+    assert list(frame["PERCENT"]) == [75.0, 25.0]
+
+
+@pytest.mark.parametrize("execution_mode", ["foreach", "batch"])
+def test_extract_model_step_timings(execution_mode, disabled_lives_sample):
+    extract_base, extract_riders = disabled_lives_sample
+    kwargs = {
+        "extract_base": extract_base,
+        "extract_riders": extract_riders,
+        "valuation_dt": pd.Timestamp("2020-03-31"),
+        "assumption_set": "STAT",
+        "execution_mode": execution_mode,
+        "executor": "serial",
+        "n_workers": 2,
+    }
+    model = DisabledLivesValEMD(time_steps=True, **kwargs)
+    projected, _, errors = model.run()
+    assert len(errors) == 0
+    timings = model.step_timings.to_frame()
+    calls = timings.groupby("MODEL")["CALLS"].max()
+    assert calls["DValBasePMD"] == (extract_base["COVERAGE_ID"] == "BASE").sum()
+    if execution_mode == "foreach":
+        base_steps = timings.loc[timings["MODEL"] == "DValBasePMD", "STEP"]
+        assert set(base_steps) == set(STEPS)
+
+    # timing the steps does not change the output
+    expected, _, _ = DisabledLivesValEMD(**kwargs).run()
+    pd.testing.assert_frame_equal(
+        projected.drop(columns="RUN_DATE_TIME"), expected.drop(columns="RUN_DATE_TIME")
+    )
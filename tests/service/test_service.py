@@ -0,0 +1,109 @@
+import json
+import threading
+from urllib.request import Request, urlopen
+
+import pandas as pd
+import pytest
+
+from footings_idi_model.models import DisabledLivesValEMD
+from footings_idi_model.service import ValuationRequest, ValuationService, make_server
+
+PARAMETERS = {"valuation_dt": "2020-03-31", "assumption_set": "STAT"}
+DROP_COLS = ["MODEL_VERSION", "LAST_COMMIT", "RUN_DATE_TIME"]
+
+
+def get_expected(extract_base, extract_riders):
+    _, time_0, _ = DisabledLivesValEMD(
+        extract_base=extract_base,
+        extract_riders=extract_riders,
+        valuation_dt=pd.Timestamp(PARAMETERS["valuation_dt"]),
+        assumption_set="STAT",
+    ).run()
+    return time_0.drop(columns=DROP_COLS).reset_index(drop=True)
+
+
+def to_rows(frame):
+    return json.loads(frame.to_json(orient="records", date_format="iso"))
+
+
+def policy_requests(extract_base, extract_riders):
+    for policy_id, base in extract_base.groupby("POLICY_ID", sort=False):
+        riders = extract_riders[extract_riders["POLICY_ID"] == policy_id]
+        yield to_rows(base), to_rows(riders)
+
+
+def test_valuation_service(disabled_lives_sample):
+    expected = get_expected(*disabled_lives_sample)
+    with ValuationService(batch_wait=0.5) as service:
+        requests = [
+            service.submit(ValuationRequest("disabled-lives", base, riders, **PARAMETERS))
+            for base, riders in policy_requests(*disabled_lives_sample)
+        ]
+        results = [request.result(timeout=60) for request in requests]
+        # the requests arrived together so are valued in one batch
+        assert service.batches == 1
+
+    time_0 = pd.concat([time_0 for time_0, _ in results], ignore_index=True)
+    pd.testing.assert_frame_equal(
+        time_0.drop(columns=DROP_COLS), expected, check_dtype=False
+    )
+    assert all(errors == [] for _, errors in results)
+
+
+@pytest.mark.parametrize(
+    "parameters",
+    [{"executor": "serial"}, {"execution_mode": "foreach"}],
+    ids=["executor", "execution_mode"],
+)
+def test_valuation_service_parameters(parameters, disabled_lives_sample):
+    # parameters sent with a request take precedence over the service defaults
+    extract_base, extract_riders = disabled_lives_sample
+    expected = get_expected(extract_base, extract_riders)
+    with ValuationService() as service:
+        time_0, errors = service.value(
+            "disabled-lives",
+            to_rows(extract_base),
+            to_rows(extract_riders),
+            **PARAMETERS,
+            **parameters,
+        )
+    pd.testing.assert_frame_equal(
+        time_0.drop(columns=DROP_COLS), expected, check_dtype=False
+    )
+    assert errors == []
+
+
+def test_valuation_service_http(disabled_lives_sample):
+    extract_base, extract_riders = disabled_lives_sample
+    expected = get_expected(extract_base, extract_riders)
+    with ValuationService() as service:
+        server = make_server(service, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with urlopen(f"{url}/health") as response:
+                assert json.loads(response.read())["status"] == "ok"
+            content = {
+                "extract_base": to_rows(extract_base),
+                "extract_riders": to_rows(extract_riders),
+                **PARAMETERS,
+            }
+            request = Request(
+                f"{url}/disabled-lives",
+                data=json.dumps(content).encode(),
+                headers={"Content-Type": "application/json"},
+            )
+            with urlopen(request) as response:
+                result = json.loads(response.read())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    time_0 = pd.DataFrame(result["time_0"]).assign(
+        DATE_DLR=lambda df: pd.to_datetime(df["DATE_DLR"])
+    )
+    pd.testing.assert_frame_equal(
+        time_0.drop(columns=DROP_COLS), expected, check_dtype=False
+    )
+    assert result["errors"] == []